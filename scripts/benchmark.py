@@ -0,0 +1,358 @@
+"""Benchmark statements2csv on synthetic statement PDFs of each supported bank."""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import importlib
+import itertools
+import json
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Generator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+from click.testing import CliRunner
+
+from statements2csv.__main__ import main as statements2csv
+from statements2csv.extract import (
+    ExtractionTask,
+    TaskExtraction,
+    _extract_table,
+    _is_duplicate_extraction,
+    _read_tables_uncached,
+    flavors_to_try,
+    select_extractions,
+)
+from statements2csv.extractors import _date_column_parse, _maybe_date_parse
+from taxes.paths import cache_path
+from taxes.pdfs import content_pdf
+
+DEFAULT_PAGES = 2
+DEFAULT_ROWS_PER_PAGE = 30
+DEFAULT_STATEMENTS = 1
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.2
+STATEMENT_YEAR = 2021
+
+_MERCHANTS = (
+    "Amazon.com",
+    "Blue Bottle Coffee",
+    "Chevron",
+    "Costco Whse",
+    "Netflix.com",
+    "Output Inc.",
+    "Trader Joe's",
+    "Walgreens",
+)
+
+_Row = Callable[[random.Random, datetime.date], tuple[str, ...]]
+
+
+class Layout(NamedTuple):
+    """Where a bank's statements put their transaction table's columns, and what's in them."""
+
+    column_xs: tuple[int, ...]
+    header: tuple[str, ...]
+    row: _Row
+
+
+def _description(rng: random.Random) -> str:
+    return f"{rng.choice(_MERCHANTS)} {rng.randrange(10000):04}"
+
+
+def _cents(rng: random.Random) -> str:
+    return f"{rng.randrange(100, 100000) / 100:,.2f}"
+
+
+LAYOUTS = {
+    "Apple": Layout(
+        (40, 120, 330, 420),
+        ("Date", "Description", "Daily Cash", "Amount"),
+        lambda rng, date: (
+            date.strftime("%m/%d/%Y"),
+            _description(rng),
+            f"{rng.choice((1, 2, 3))}%",
+            f"${_cents(rng)}",
+        ),
+    ),
+    "BankOfAmerica": Layout(
+        (30, 80, 130, 330, 420, 520),
+        (
+            "Date",
+            "Date",
+            "Description",
+            "Reference Number",
+            "Account Number",
+            "Amount",
+        ),
+        lambda rng, date: (
+            date.strftime("%m/%d"),
+            date.strftime("%m/%d"),
+            _description(rng),
+            f"{rng.randrange(10**8):08}",
+            "1234",
+            f"-{_cents(rng)}",
+        ),
+    ),
+    "CapitalOne": Layout(
+        (40, 110, 420, 500),
+        ("Date", "Description", "AMOUNT", "BALANCE"),
+        lambda rng, date: (
+            date.strftime("%b %d"),
+            _description(rng),
+            f"${_cents(rng)}",
+            f"${_cents(rng)}",
+        ),
+    ),
+    "Chase": Layout(
+        (40, 110, 480),
+        (
+            "Date of Transaction",
+            "Merchant Name or Transaction Description",
+            "$ Amount",
+        ),
+        lambda rng, date: (date.strftime("%m/%d"), _description(rng), _cents(rng)),
+    ),
+    "WellsFargo": Layout(
+        (30, 80, 140, 360, 440, 520),
+        ("Date", "Check Number", "Description", "Additions", "Subtractions", "Balance"),
+        lambda rng, date: (
+            f"{date.month}/{date.day}",
+            str(rng.randrange(1000, 2000)) if rng.random() < 0.2 else "",
+            _description(rng),
+            "",
+            _cents(rng),
+            _cents(rng),
+        ),
+    ),
+}
+
+
+class BenchmarkParams(NamedTuple):
+    """What was benchmarked. Timings are only comparable for the same params."""
+
+    layouts: list[str]
+    statements: int
+    pages: int
+    rows_per_page: int
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Time statements2csv's stages, and compare them to a saved baseline."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--layout",
+        dest="layouts",
+        action="append",
+        choices=list(LAYOUTS),
+        help="bank layouts to generate statements for, defaulting to all",
+    )
+    parser.add_argument("--statements", type=int, default=DEFAULT_STATEMENTS)
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES)
+    parser.add_argument("--rows-per-page", type=int, default=DEFAULT_ROWS_PER_PAGE)
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="keep each stage's fastest time of this many runs",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=cache_path("statements2csv", "benchmark-baseline.json"),
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="save this run's timings as the baseline, instead of comparing",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="fail if a stage is slower than the baseline by this fraction",
+    )
+    args = parser.parse_args(argv)
+
+    params = BenchmarkParams(
+        args.layouts or list(LAYOUTS),
+        args.statements,
+        args.pages,
+        args.rows_per_page,
+    )
+    # statements2csv imports its PDF parser on first use. Import it up front,
+    # so the first run's read stage doesn't include it.
+    importlib.import_module("camelot")
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = generate_statements(Path(directory), params)
+        timings: dict[str, float] = {}
+        for _ in range(args.repeat):
+            for stage, seconds in time_stages(files).items():
+                timings[stage] = min(seconds, timings.get(stage, seconds))
+
+    results = {"params": params._asdict(), "timings": timings}
+    for stage, seconds in timings.items():
+        print(f"{stage:>14}: {seconds * 1000:8.1f} ms")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f'Saved baseline "{args.baseline}"')
+        return 0
+
+    try:
+        baseline = json.loads(args.baseline.read_text())
+    except FileNotFoundError:
+        print("No baseline to compare to. Save one with --save-baseline.")
+        return 0
+    if baseline["params"] != results["params"]:
+        print("Baseline was run with different params. Not comparing.")
+        return 0
+
+    regressions = find_regressions(timings, baseline["timings"], args.threshold)
+    for regression in regressions:
+        print(regression)
+    return 1 if regressions else 0
+
+
+def generate_statements(directory: Path, params: BenchmarkParams) -> list[Path]:
+    """Write synthetic statement PDFs, where statements2csv expects each bank's."""
+    files = []
+    for layout_name in params.layouts:
+        for statement_i in range(params.statements):
+            path = (
+                directory
+                / layout_name
+                / str(STATEMENT_YEAR)
+                / f"statement-{statement_i}.pdf"
+            )
+            seed = f"{layout_name}-{statement_i}"
+            files.append(
+                write_statement(
+                    path,
+                    LAYOUTS[layout_name],
+                    params.pages,
+                    params.rows_per_page,
+                    seed,
+                )
+            )
+    return files
+
+
+def write_statement(
+    path: Path, layout: Layout, pages: int, rows_per_page: int, seed: str
+) -> Path:
+    """Write a PDF with a table of random transactions on each page, in the given layout."""
+    rng = random.Random(seed)
+    date = datetime.date(STATEMENT_YEAR, 1, 1)
+
+    page_contents = []
+    for _ in range(pages):
+        rows = [layout.header]
+        for _ in range(rows_per_page):
+            rows.append(layout.row(rng, date))
+            date = min(
+                date + datetime.timedelta(days=rng.choice((0, 1))),
+                datetime.date(STATEMENT_YEAR, 12, 31),
+            )
+        page_contents.append(_table_content(layout.column_xs, rows))
+
+    return content_pdf(path, page_contents)
+
+
+def _table_content(column_xs: Sequence[int], rows: Sequence[Sequence[str]]) -> str:
+    line_height = 14
+    top = 740
+    return "\n".join(
+        f"BT /F1 8 Tf {x} {top - row_i * line_height} Td ({_escape(cell)}) Tj ET"
+        for row_i, row in enumerate(rows)
+        for x, cell in zip(column_xs, row, strict=True)
+        if cell
+    )
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def time_stages(files: Sequence[Path]) -> dict[str, float]:
+    """Time each stage of extracting the given statements, then the whole pipeline.
+
+    Stages run serially, in this process, without the table cache. Date
+    parsing is also part of table extraction, but is timed on its own too.
+    Parsed dates are cached in memory, so the cache is cleared before each
+    stage, for each to parse its dates again, like a fresh run.
+    """
+    timings: dict[str, float] = dict.fromkeys(
+        ("read", "extract_table", "parse_dates", "dedupe", "csv"), 0.0
+    )
+
+    for fil in files:
+        task_extractions = []
+        for flavor in flavors_to_try(fil, None):
+            with _timed(timings, "read"):
+                tables = _read_tables_uncached(fil, flavor, "all")
+
+            with _timed(timings, "parse_dates"):
+                for table in tables:
+                    _date_column_parse(STATEMENT_YEAR, table[0])
+
+            extractions = []
+            with _timed(timings, "extract_table"):
+                for table in tables:
+                    maybe_extraction, _ = _extract_table(fil, STATEMENT_YEAR, table)
+                    if maybe_extraction:
+                        extractions.append(maybe_extraction[1])
+            # Compare each table to the one before it, like parsing does, even
+            # if they aren't duplicates
+            with _timed(timings, "dedupe"):
+                for prev, next_extraction in itertools.pairwise(extractions):
+                    _is_duplicate_extraction(prev, next_extraction)
+            task = ExtractionTask(fil, flavor, "all")
+            task_extractions.append(TaskExtraction(task, extractions, []))
+
+        with _timed(timings, "dedupe"):
+            selected = select_extractions(fil, task_extractions)
+
+        with _timed(timings, "csv"):
+            for extraction in selected:
+                extraction.df.to_csv(index=False)
+
+    with _timed(timings, "main"):
+        result = CliRunner().invoke(statements2csv, ["--no-cache", *map(str, files)])
+    if result.exit_code != 0:
+        raise RuntimeError(f"statements2csv failed: {result.output}")
+
+    return timings
+
+
+def find_regressions(
+    timings: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Describe each stage slower than its baseline by more than the given fraction."""
+    return [
+        f"{stage}: {seconds * 1000:.1f} ms, "
+        f"{seconds / baseline[stage] - 1:+.0%} vs. baseline {baseline[stage] * 1000:.1f} ms"
+        for stage, seconds in timings.items()
+        if stage in baseline and seconds > baseline[stage] * (1 + threshold)
+    ]
+
+
+@contextmanager
+def _timed(timings: dict[str, float], stage: str) -> Generator[None]:
+    _maybe_date_parse.cache_clear()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Benchmark the CLIs' startup time, and which imports it goes to."""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Generator, Mapping, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+from taxes.paths import CACHE_ROOT_ENV_VAR, DECRYPTED_ROOT_ENV_VAR
+
+# Quick invocations. gt runs a query through its installed entry point,
+# against a warm store of generated transactions.
+COMMANDS = {
+    "gt": (
+        "-c",
+        "from greptransactions.client import main; main()",
+        "--year",
+        "2022",
+        "(?i)amazon",
+    ),
+    "statements2csv": ("-m", "statements2csv", "--help"),
+}
+DEFAULT_BUDGET_MS = 200.0
+# Transactions in the snapshot gt queries
+SNAPSHOT_TRANSACTIONS = 5000
+DEFAULT_RUNS = 10
+DEFAULT_TOP_IMPORTS = 10
+
+
+class ImportTime(NamedTuple):
+    """How long importing a module took, including its own imports."""
+
+    module: str
+    cumulative_us: int
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Time each command's startup, failing if any is over budget."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "commands",
+        nargs="*",
+        help=f"commands to benchmark, of {', '.join(COMMANDS)}, defaulting to all",
+    )
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help="fail if a command's median startup is slower",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=DEFAULT_TOP_IMPORTS,
+        help="how many of the slowest imports to report",
+    )
+    args = parser.parse_args(argv)
+    for name in args.commands:
+        if name not in COMMANDS:
+            parser.error(f"unknown command: {name}")
+
+    over_budget = False
+    with _snapshot_env() as env:
+        for name in args.commands or COMMANDS:
+            command = (sys.executable, *COMMANDS[name])
+            # Warm the store, and the OS's file cache
+            _time_ms(command, env)
+            median_ms = statistics.median(
+                _time_ms(command, env) for _ in range(args.runs)
+            )
+            print(f"{name}: {median_ms:.0f} ms median of {args.runs} runs")
+            for import_time in slowest_imports(_import_times(command, env), args.top):
+                print(
+                    f"  {import_time.cumulative_us / 1000:7.1f} ms  {import_time.module}"
+                )
+
+            if median_ms > args.budget_ms:
+                print(f"{name}: over the {args.budget_ms:.0f} ms budget")
+                over_budget = True
+
+    return 1 if over_budget else 0
+
+
+def parse_import_times(text: str) -> list[ImportTime]:
+    """Parse the output of `python -X importtime`, in import order."""
+    import_times = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, module = line.removeprefix("import time:").split("|")
+        if not cumulative.strip().isdigit():
+            # The column headings
+            continue
+        import_times.append(ImportTime(module.strip(), int(cumulative)))
+    return import_times
+
+
+def slowest_imports(import_times: Sequence[ImportTime], n: int) -> list[ImportTime]:
+    """Return the n slowest top-level packages imported, slowest first."""
+    packages = [
+        import_time for import_time in import_times if "." not in import_time.module
+    ]
+    return sorted(packages, key=lambda import_time: -import_time.cumulative_us)[:n]
+
+
+def write_snapshot(path: Path, num_transactions: int) -> None:
+    """Write a `statements2csv` snapshot of generated transactions, for gt to query."""
+    start = datetime.date(2021, 1, 1)
+    descriptions = ("Amazon.com", "AMAZON MKTP", "Coffee", "Books, used")
+    lines = [
+        f'  {start + datetime.timedelta(days=i % 730)},"{descriptions[i % 4]}",{i % 97}.{i % 100:02}'
+        for i in range(num_transactions)
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "# name: test_statements2csv_all_files\n"
+        "  '''\n"
+        "  Date,Description,Amount\n" + "\n".join(lines) + "\n\n  '''\n# ---\n",
+        encoding="utf-8",
+    )
+
+
+@contextmanager
+def _snapshot_env() -> Generator[dict[str, str]]:
+    """Yield an environment with a generated snapshot, and its own cache."""
+    with tempfile.TemporaryDirectory() as root:
+        write_snapshot(
+            Path(
+                root,
+                "tests",
+                "__snapshots__",
+                "secrets",
+                "all",
+                "test_integration.ambr",
+            ),
+            SNAPSHOT_TRANSACTIONS,
+        )
+        yield {
+            **os.environ,
+            DECRYPTED_ROOT_ENV_VAR: root,
+            CACHE_ROOT_ENV_VAR: str(Path(root, "cache")),
+        }
+
+
+def _time_ms(command: Sequence[str], env: Mapping[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, check=True, env=env, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def _import_times(command: Sequence[str], env: Mapping[str, str]) -> list[ImportTime]:
+    result = subprocess.run(
+        (command[0], "-X", "importtime", *command[1:]),
+        check=True,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return parse_import_times(result.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
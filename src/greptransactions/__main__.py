@@ -1,34 +1,54 @@
 """CLI for this package."""
 
+import contextlib
 import csv
 import datetime
-import subprocess
+import decimal
+import io
+import os
+import re
 import sys
-from decimal import Decimal
-from io import StringIO
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 import click
 
+from taxes.amounts import amount_cents
 from taxes.paths import decrypted_path
 
-SortOption = str
+from .aggregate import GroupByOption, format_totals, totals
+from .client import default_socket_path
+from .patterns import PatternSet, tagged_rows
+from .search import (
+    SORT_KEYS,
+    SortOption,
+    highlight,
+    matching_rows,
+    order_matches,
+    row_lines,
+)
+from .store import TransactionStore
+from .trigrams import (
+    TrigramIndex,
+    candidate_descriptions,
+    descriptions_containing,
+    pattern_literals,
+)
 
+# Every file git-crypt encrypts starts with this
+GIT_CRYPT_HEADER = b"\0GITCRYPT\0"
 
-def is_encrypted(file: Path) -> bool:
-    """Read the first bit of a file to check for typical signs of encryption."""
-    try:
-        with open(file, encoding="utf-8") as fil:
-            sample_size = 1024 * 1024  # 1MB
-            fil.read(sample_size)
-        return False
-    except UnicodeDecodeError:
-        return True
+# A POSIX class, like `[:digit:]` in `[[:digit:]]`, which Python reads as a set
+# of the characters `[:digt` followed by `]`
+_POSIX_CLASS = re.compile(r"\[:\^?[a-z]+:\]")
+
+DateRange = tuple[datetime.date | None, datetime.date | None]
 
 
-def parse_amount(amount: str) -> Decimal:
-    """Parse transaction amount text into a sortable decimal value."""
-    return Decimal(amount.translate(str.maketrans("", "", "$,+ ")))
+def is_encrypted(file: Path) -> bool:
+    """Check for git-crypt's header at the start of a file."""
+    with open(file, "rb") as fil:
+        return fil.read(len(GIT_CRYPT_HEADER)) == GIT_CRYPT_HEADER
 
 
 def csv_to_tsv(
@@ -38,18 +58,13 @@ def csv_to_tsv(
     reverse: bool = False,
 ) -> str:
     """Convert CSV text to tab-delimited text."""
-    output = StringIO()
+    output = io.StringIO()
     rows = list(csv.reader(input_text.splitlines()))
-    sort_keys = {
-        "date": lambda row: row[0],
-        "description": lambda row: row[1],
-        "amount": lambda row: parse_amount(row[2]),
-    }
     if sort is None:
         if reverse:
             rows.reverse()
     else:
-        rows.sort(key=sort_keys[sort], reverse=reverse)
+        rows.sort(key=SORT_KEYS[sort], reverse=reverse)
 
     writer = csv.writer(output, dialect="excel-tab", lineterminator="\n")
 
@@ -59,15 +74,76 @@ def csv_to_tsv(
     return output.getvalue()
 
 
+def date_ranges(
+    years: list[int],
+    months: list[datetime.date],
+    from_date: datetime.date | None,
+    to_date: datetime.date | None,
+) -> list[DateRange]:
+    """Convert date options to ranges of dates, including start and excluding end.
+
+    Each year, each month, and the from and to dates together, are a range.
+    Without any, defaults to the previous calendar year.
+    """
+    result: list[DateRange] = [
+        (datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)) for year in years
+    ]
+    result.extend(
+        (
+            month.replace(day=1),
+            datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1),
+        )
+        for month in months
+    )
+    if from_date or to_date:
+        result.append(
+            (from_date, to_date and to_date + datetime.timedelta(days=1)),
+        )
+
+    if not result:
+        return date_ranges([datetime.date.today().year - 1], [], None, None)
+    return result
+
+
+def _amount_cents_option(
+    ctx: click.Context, param: click.Parameter, value: str | None
+) -> int | None:
+    """Parse an amount option into whole cents."""
+    if value is None:
+        return None
+    try:
+        return amount_cents(value)
+    except decimal.InvalidOperation as err:
+        raise click.BadParameter(f"{value!r} is not an amount.") from err
+
+
 @click.command()
 @click.option(
     "-y",
     "--year",
-    default=lambda: [datetime.date.today().year - 1],
-    help="""Include transactions from the given year(s). Defaults to the previous calendar year.""",
+    help="""Include transactions from the given year(s). Without any date options, defaults to the previous calendar year.""",
     multiple=True,
     type=int,
 )
+@click.option(
+    "-m",
+    "--month",
+    help="""Include transactions from the given month(s), like 2022-03.""",
+    multiple=True,
+    type=click.DateTime(formats=["%Y-%m"]),
+)
+@click.option(
+    "--from",
+    "from_datetime",
+    help="""Include transactions on or after the given date, like 2022-03-15. Combine with --to for a range.""",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+)
+@click.option(
+    "--to",
+    "to_datetime",
+    help="""Include transactions on or before the given date, like 2022-04-15. Combine with --from for a range.""",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+)
 @click.option(
     "--sort",
     "sort_option",
@@ -79,20 +155,151 @@ def csv_to_tsv(
     is_flag=True,
     help="Reverse the selected sort order.",
 )
-@click.argument("pattern")
+@click.option(
+    "--min-amount",
+    "min_cents",
+    callback=_amount_cents_option,
+    help="""Include only transactions with amounts of at least this much, like -50 or 1,000.00.""",
+)
+@click.option(
+    "--max-amount",
+    "max_cents",
+    callback=_amount_cents_option,
+    help="""Include only transactions with amounts of at most this much, like -50 or 1,000.00.""",
+)
+@click.option(
+    "--top",
+    help="""Output only this many matching transactions with the largest amounts, largest first. With --reverse, the smallest, smallest first.""",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--sum",
+    "amount_sum",
+    is_flag=True,
+    help="Output the sum of matching transactions' amounts, instead of the transactions.",
+)
+@click.option(
+    "--count",
+    is_flag=True,
+    help="Output the number of matching transactions, instead of the transactions.",
+)
+@click.option(
+    "--group-by",
+    type=click.Choice(["month", "year", "description"]),
+    help="""Output the number and sum of matching transactions per group, in group order. Combine with --count or --sum for only one.""",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["python", "rg"]),
+    default="python",
+    show_default=True,
+    help="""Search in this process with Python regexes, or pipe through ripgrep with PCRE2 regexes. Patterns that only PCRE2 supports, like `\\p{L}mazon` or POSIX classes like `[[:digit:]]`, fall back to ripgrep when it's installed. Otherwise, Python reads `[[:digit:]]` as a set of characters.""",
+)
+@click.option(
+    "--patterns",
+    "patterns_path",
+    help="""Instead of PATTERN, match the named patterns in this file, 1 per line, like `charity (?i)red cross|unicef`. Each matching transaction is output once, prefixed by the names of the patterns it matched.""",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--index",
+    "use_index",
+    is_flag=True,
+    help="""Narrow down transactions with a trigram index of their descriptions first. Only plain text patterns, like `(?i)(output|tulip)`, can be narrowed down.""",
+)
+@click.option(
+    "--fuzzy",
+    is_flag=True,
+    help="""Match PATTERN as plain text, loosely, against descriptions, ignoring case. For example, `AMZN Mktp` matches variants like `AMZN MKTP US*2K3`.""",
+)
+@click.option(
+    "--serve",
+    is_flag=True,
+    help="""Instead of searching, run a daemon that answers later `gt` commands, keeping transactions loaded in memory between them. The daemon reloads transactions when their snapshot changes.""",
+)
+@click.argument("pattern", required=False)
 def main(
     year: list[int],
+    month: list[datetime.datetime],
+    from_datetime: datetime.datetime | None,
+    to_datetime: datetime.datetime | None,
     sort_option: SortOption | None,
     reverse: bool,
-    pattern: str,
+    min_cents: int | None,
+    max_cents: int | None,
+    top: int | None,
+    amount_sum: bool,
+    count: bool,
+    group_by: GroupByOption | None,
+    engine: str,
+    patterns_path: Path | None,
+    use_index: bool,
+    fuzzy: bool,
+    serve: bool,
+    pattern: str | None,
 ) -> None:
-    """Grep CSV transactions for the given year and pattern.
+    """Grep CSV transactions for the given dates and pattern.
 
     Executes the given regex pattern against a pre-existing snapshot of
-    `statements2csv`, across all bank statements.
+    `statements2csv`, across all bank statements. The snapshot's transactions
+    are parsed into a columnar store once, and again whenever the snapshot
+    changes.
 
-    This pipes transactions through ripgrep so matches are highlighted.
+    Matches are streamed to stdout as they're found, highlighted in a
+    terminal. With --patterns, many named patterns are matched in 1 pass.
+    Or, with --sum, --count, or --group-by, only their totals are output.
+    Exits 1 if nothing matched.
     """
+    if serve:
+        from . import server
+
+        server.serve(main, default_socket_path())
+        return
+
+    if (pattern is None) == (patterns_path is None):
+        raise click.UsageError("Pass either PATTERN or --patterns.")
+    is_aggregate = amount_sum or count or group_by is not None
+    _check_options(sort_option, top, is_aggregate, fuzzy, patterns_path, engine)
+    engine = _fallback_engine(engine, pattern, is_aggregate or top is not None or fuzzy)
+
+    store = _open_store()
+    rows = store.date_rows(
+        date_ranges(
+            year,
+            [dt.date() for dt in month],
+            from_datetime and from_datetime.date(),
+            to_datetime and to_datetime.date(),
+        )
+    )
+    if min_cents is not None or max_cents is not None:
+        rows = list(store.amount_rows(rows, min_cents, max_cents))
+
+    if engine == "rg":
+        if pattern is None:
+            raise click.UsageError("--patterns requires the python engine.")
+        date_lines = (store.line(row) for row in rows)
+        sys.exit(_rg(date_lines, pattern, sort_option, reverse))
+
+    index = TrigramIndex.open(store) if use_index or fuzzy else None
+    matches, regex = _matches(store, rows, pattern, patterns_path, index, fuzzy)
+
+    if is_aggregate:
+        row_totals = totals(store, (row for row, _ in matches), group_by)
+        if reverse:
+            row_totals.reverse()
+        if not (count or amount_sum):
+            count = amount_sum = True
+        _echo_lines(format_totals(row_totals, count=count, amount_sum=amount_sum))
+        sys.exit(0 if any(total.num_transactions for total in row_totals) else 1)
+
+    lines = order_matches(store, matches, sort=sort_option, reverse=reverse, top=top)
+    if regex is not None:
+        lines = (highlight(line, regex) for line in lines)
+    sys.exit(0 if _echo_lines(lines) else 1)
+
+
+def _open_store() -> TransactionStore:
+    """Open the store of the `statements2csv` snapshot's transactions."""
     file = decrypted_path(
         "tests",
         "__snapshots__",
@@ -106,33 +313,154 @@ def main(
             "Can't grep encrypted transaction data. Decrypt input data first."
         ) from None
 
-    year_pattern = "|".join(str(y) for y in year)
-    year_result = subprocess.run(
-        [
-            "rg",
-            "--no-line-number",
-            "--no-filename",
-            rf"^\s*({year_pattern})-",
-            file,
-        ],
-        check=False,
-        stdout=subprocess.PIPE,
-        text=True,
-    )
+    return TransactionStore.open(file)
+
+
+def _matches(
+    store: TransactionStore,
+    rows: Iterable[int],
+    pattern: str | None,
+    patterns_path: Path | None,
+    index: TrigramIndex | None,
+    fuzzy: bool,
+) -> tuple[Iterator[tuple[int, str]], re.Pattern[str] | None]:
+    """Match rows against the PATTERN argument, or the --patterns file.
+
+    Returns the matching rows and their lines, and the regex to highlight
+    them with, if any.
+    """
+    pattern = pattern or ""
+    if fuzzy and index is not None:
+        description_ids = index.similar(pattern)
+        if description_ids is None:
+            # Too short to be similar to anything, so only match it exactly
+            description_ids = descriptions_containing(store, pattern)
+        rows = store.description_rows(rows, description_ids)
+        return row_lines(store, rows), None
+
+    if patterns_path is not None:
+        try:
+            pattern_set = PatternSet.read(patterns_path)
+        except ValueError as err:
+            raise click.BadParameter(str(err), param_hint="--patterns") from err
+        return tagged_rows(store, rows, pattern_set), None
+
+    try:
+        regex = re.compile(pattern)
+    except re.error as err:
+        raise click.BadParameter(str(err), param_hint="PATTERN") from err
+
+    literals = pattern_literals(pattern)
+    if index is not None and literals is not None:
+        description_ids = candidate_descriptions(index, literals)
+        if description_ids is not None:
+            rows = store.description_rows(rows, description_ids)
+    return matching_rows(store, rows, regex), regex
+
+
+def _fallback_engine(engine: str, pattern: str | None, needs_python: bool) -> str:
+    r"""Fall back to ripgrep for a pattern that Python can't compile, or compiles differently, if installed.
+
+    Like `foo|(?i)bar`, or `\p{L}mazon`, which are valid PCRE2, or
+    `[[:digit:]]`, a POSIX class in PCRE2. Not if other options need the
+    python engine.
+    """
+    if engine != "python" or pattern is None or needs_python:
+        return engine
+    if _is_python_regex(pattern):
+        return engine
 
+    import shutil
+
+    return "rg" if shutil.which("rg") is not None else engine
+
+
+def _is_python_regex(pattern: str) -> bool:
+    if _POSIX_CLASS.search(pattern):
+        return False
+    try:
+        re.compile(pattern)
+    except re.error:
+        return False
+    return True
+
+
+def _check_options(
+    sort_option: SortOption | None,
+    top: int | None,
+    is_aggregate: bool,
+    fuzzy: bool,
+    patterns_path: Path | None,
+    engine: str,
+) -> None:
+    """Reject combinations of options that can't all be honored."""
+    if top is not None and sort_option is not None:
+        raise click.UsageError("--top always sorts by amount. Drop --sort.")
+    if top is not None and engine == "rg":
+        raise click.UsageError("--top requires the python engine.")
+    if is_aggregate and (sort_option is not None or top is not None):
+        raise click.UsageError("Totals can't be combined with --sort or --top.")
+    if is_aggregate and engine == "rg":
+        raise click.UsageError("Totals require the python engine.")
+    if fuzzy and (patterns_path is not None or engine == "rg"):
+        raise click.UsageError("--fuzzy requires PATTERN and the python engine.")
+
+
+def _echo_lines(lines: Iterable[str]) -> bool:
+    """Write lines to stdout as they come, returning whether there were any."""
+    is_any = False
+    try:
+        for line in lines:
+            click.echo(line)
+            is_any = True
+    except BrokenPipeError:
+        # The reader, like `head`, has all it needs. Point stdout elsewhere, so
+        # flushing it on exit doesn't fail again.
+        # Under `gt --serve`, stdout is the client's, which has no file.
+        with contextlib.suppress(io.UnsupportedOperation):
+            stdout_fileno = sys.stdout.fileno()
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, stdout_fileno)
+    return is_any
+
+
+def _rg(
+    csv_lines: Iterable[str],
+    pattern: str,
+    sort_option: SortOption | None,
+    reverse: bool,
+) -> int:
+    """Pipe transactions through ripgrep, returning its exit code."""
     formatted_transactions = csv_to_tsv(
-        year_result.stdout,
+        "\n".join(csv_lines),
         sort=sort_option,
         reverse=reverse,
     )
 
-    pattern_result = subprocess.run(
-        ["rg", "--pcre2", f"({pattern})"],
-        check=False,
-        input=formatted_transactions,
-        text=True,
-    )
-    sys.exit(pattern_result.returncode)
+    import subprocess
+
+    # Under `gt --serve`, stdout is the client's, which ripgrep can't inherit
+    try:
+        sys.stdout.fileno()
+        stdout = None
+    except io.UnsupportedOperation:
+        stdout = subprocess.PIPE
+
+    try:
+        pattern_result = subprocess.run(
+            ["rg", "--pcre2", f"({pattern})"],
+            check=False,
+            input=formatted_transactions,
+            stdout=stdout,
+            text=True,
+        )
+    except FileNotFoundError as err:
+        raise click.ClickException(
+            "Can't find ripgrep. Install it, or use the python engine."
+        ) from err
+    if pattern_result.stdout:
+        click.echo(pattern_result.stdout, nl=False)
+    return pattern_result.returncode
 
 
 if __name__ == "__main__":  # pragma: no cover
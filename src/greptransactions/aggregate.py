@@ -0,0 +1,100 @@
+"""Totals of transactions, optionally grouped."""
+
+import datetime
+from collections.abc import Callable, Iterable, Iterator
+from typing import NamedTuple
+
+from taxes.amounts import format_cents
+
+from .search import tsv_lines
+from .store import INVALID_AMOUNT, TransactionStore
+
+GroupByOption = str
+
+
+class Total(NamedTuple):
+    """The number and sum of some transactions."""
+
+    group: str | None
+    num_transactions: int
+    cents: int
+
+
+def totals(
+    store: TransactionStore,
+    rows: Iterable[int],
+    group_by: GroupByOption | None = None,
+) -> list[Total]:
+    """Count and sum the amounts of the given store rows, in total, or per group in order.
+
+    Rows are grouped by their store column values, like the description ID,
+    so each group's label is only formatted once. Rows with invalid amounts
+    are counted, but left out of sums.
+    """
+    amounts = store.amounts
+    if group_by is None:
+        count = 0
+        cents = 0
+        for row in rows:
+            count += 1
+            if amounts[row] != INVALID_AMOUNT:
+                cents += amounts[row]
+        return [Total(None, count, cents)]
+
+    group_key, group_label = _GROUPINGS[group_by](store)
+    counts: dict[int, int] = {}
+    sums: dict[int, int] = {}
+    for row in rows:
+        key = group_key(row)
+        counts[key] = counts.get(key, 0) + 1
+        amount = amounts[row]
+        sums[key] = sums.get(key, 0) + (0 if amount == INVALID_AMOUNT else amount)
+
+    return sorted(
+        (Total(group_label(key), counts[key], sums[key]) for key in counts),
+        key=lambda total: total.group or "",
+    )
+
+
+def format_totals(
+    group_totals: Iterable[Total], *, count: bool, amount_sum: bool
+) -> Iterator[str]:
+    """Format totals as tab-delimited lines, without line endings, of the group, count, and sum."""
+    rows = (
+        [
+            *([] if total.group is None else [total.group]),
+            *([str(total.num_transactions)] if count else []),
+            *([format_cents(total.cents)] if amount_sum else []),
+        ]
+        for total in group_totals
+    )
+    yield from (line for _, line in tsv_lines(rows))
+
+
+_Grouping = tuple[Callable[[int], int], Callable[[int], str]]
+
+
+def _group_by_month(store: TransactionStore) -> _Grouping:
+    def key(row: int) -> int:
+        date = datetime.date.fromordinal(store.dates[row])
+        return date.year * 100 + date.month
+
+    return key, lambda key: f"{key // 100:04}-{key % 100:02}"
+
+
+def _group_by_year(store: TransactionStore) -> _Grouping:
+    return (
+        lambda row: datetime.date.fromordinal(store.dates[row]).year,
+        lambda key: f"{key:04}",
+    )
+
+
+def _group_by_description(store: TransactionStore) -> _Grouping:
+    return store.description_ids.__getitem__, store.description
+
+
+_GROUPINGS: dict[GroupByOption, Callable[[TransactionStore], _Grouping]] = {
+    "month": _group_by_month,
+    "year": _group_by_year,
+    "description": _group_by_description,
+}
@@ -0,0 +1,78 @@
+"""Entry point for `gt`, forwarding queries to a running `gt --serve` daemon.
+
+Only imports what forwarding needs, so a query answered by the daemon skips
+importing, and loading, everything else. Without a daemon, runs the query in
+this process instead.
+"""
+
+import json
+import os
+import pathlib
+import socket
+import sys
+
+from taxes.paths import CACHE_ROOT_ENV_VAR, DECRYPTED_ROOT_ENV_VAR, cache_path
+
+# Environment variables that change a query's results
+FORWARDED_ENV_VARS = (CACHE_ROOT_ENV_VAR, DECRYPTED_ROOT_ENV_VAR)
+
+
+def default_socket_path() -> pathlib.Path:
+    """Return where the daemon listens."""
+    return cache_path("greptransactions", "gt.sock")
+
+
+def main() -> None:
+    """Run `gt` with the command line's arguments, in the daemon if there is one."""
+    args = sys.argv[1:]
+    if "--serve" not in args:
+        sock = _connect(default_socket_path())
+        if sock is not None:
+            with sock:
+                sys.exit(forward(sock, args))
+
+    from .__main__ import main as run_in_process
+
+    run_in_process(prog_name="gt")
+
+
+def forward(sock: socket.socket, args: list[str]) -> int:
+    """Send a query to the daemon, writing its output as it comes, and return its exit code."""
+    request = {
+        "args": args,
+        "color": sys.stdout.isatty(),
+        "cwd": os.getcwd(),
+        "env": {name: os.environ.get(name) for name in FORWARDED_ENV_VARS},
+    }
+    sock.sendall(json.dumps(request).encode() + b"\n")
+
+    streams = {"stdout": sys.stdout, "stderr": sys.stderr}
+    try:
+        with sock.makefile("rb") as responses:
+            for response in responses:
+                message = json.loads(response)
+                if "exit" in message:
+                    return int(message["exit"])
+                for name, text in message.items():
+                    streams[name].write(text)
+                    streams[name].flush()
+    except BrokenPipeError:
+        # The reader, like `head`, has all it needs. Point stdout elsewhere,
+        # so flushing it on exit doesn't fail again.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 0
+
+    sys.stderr.write("gt daemon hung up before finishing the query.\n")
+    return 1
+
+
+def _connect(socket_path: pathlib.Path) -> socket.socket | None:
+    """Connect to the daemon, if it's running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
@@ -0,0 +1,68 @@
+"""Files of memory-mapped columns, like the transaction store's."""
+
+import array
+import mmap
+import os
+import pathlib
+import struct
+from collections.abc import Sequence
+from typing import Literal
+
+_ALIGNMENT = 8
+
+
+def map_file(path: pathlib.Path) -> mmap.mmap:
+    """Memory-map the given file, read only."""
+    with open(path, "rb") as fil:
+        return mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_sections(
+    path: pathlib.Path,
+    header: bytes,
+    sections: Sequence["bytes | bytearray | array.array[int]"],
+) -> None:
+    """Write a header, then consecutive sections, each aligned for reading as a column."""
+    # Only imported when rebuilding, off the path of most queries
+    import tempfile
+
+    # Write to a temporary file first, so concurrent queries never see a
+    # partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as stream:
+            stream.write(header)
+            offset = len(header)
+            for section in sections:
+                padding = -offset % _ALIGNMENT
+                stream.write(b"\0" * padding)
+                stream.write(section)
+                offset += padding + len(memoryview(section).cast("B"))
+        os.replace(tmp, path)
+    except BaseException:
+        pathlib.Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class SectionReader:
+    """Reader of consecutive, aligned sections, in the order they were written."""
+
+    def __init__(self, buffer: memoryview, offset: int) -> None:
+        """Start reading the given buffer at the given offset, like past a header."""
+        self.buffer = buffer
+        self.offset = offset
+
+    def column(self, typecode: Literal["i", "q"], length: int) -> "memoryview[int]":
+        """Read the next section as a column of integers."""
+        size = struct.calcsize(typecode) * length
+        return self.blob(size).cast(typecode)
+
+    def blob(self, size: int) -> memoryview:
+        """Read the next section as bytes."""
+        self.offset += -self.offset % _ALIGNMENT
+        section = self.buffer[self.offset : self.offset + size]
+        if len(section) != size:
+            raise ValueError("Truncated file")
+        self.offset += size
+        return section
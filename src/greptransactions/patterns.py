@@ -0,0 +1,93 @@
+"""Named regex patterns, matched against transactions together."""
+
+import pathlib
+import re
+from collections.abc import Iterable, Iterator
+
+from .search import row_lines
+from .store import TransactionStore
+
+_NAME_RE = re.compile(r"[\w-]+")
+_GLOBAL_FLAGS_RE = re.compile(r"\(\?([aiLmsux]+)\)")
+_BACKREFERENCE_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+class PatternSet:
+    """Named regexes, each matched against every transaction, in 1 pass.
+
+    All the regexes are also combined into 1 alternation, which rules out
+    most transactions, those matching none of the patterns, in a single
+    search. Only the remaining transactions are searched pattern by pattern,
+    to tell which ones they match.
+    """
+
+    def __init__(self, patterns: dict[str, re.Pattern[str]]) -> None:
+        """Initialize."""
+        self.patterns = patterns
+        self._any = _alternation(patterns.values())
+
+    @classmethod
+    def read(cls, path: pathlib.Path) -> "PatternSet":
+        """Read patterns from a file, 1 per line, as a name, whitespace, then a regex.
+
+        Names are letters, digits, underscores, and dashes. Whitespace around
+        regexes, blank lines, and lines starting with `#` are ignored.
+        """
+        patterns = {}
+        with open(path, encoding="utf-8") as fil:
+            for line_number, line in enumerate(fil, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+
+                parts = line.split(maxsplit=1)
+                if len(parts) != 2 or not _NAME_RE.fullmatch(parts[0]):
+                    raise ValueError(
+                        f'Line {line_number}: expected a name and a pattern, got "{line}"'
+                    )
+                name, pattern = parts
+                try:
+                    patterns[name] = re.compile(pattern)
+                except re.error as err:
+                    raise ValueError(f"Line {line_number}: {err}") from err
+
+        return cls(patterns)
+
+    def names(self, line: str) -> list[str]:
+        """Return the names of the patterns the given line matches, in file order."""
+        if self._any is not None and not self._any.search(line):
+            return []
+        return [name for name, regex in self.patterns.items() if regex.search(line)]
+
+
+def tagged_rows(
+    store: TransactionStore, rows: Iterable[int], pattern_set: PatternSet
+) -> Iterator[tuple[int, str]]:
+    """Yield each of the given store rows matching any pattern, and its tab-delimited line, prefixed by the names of the patterns."""
+    for row, line in row_lines(store, rows):
+        names = pattern_set.names(line)
+        if names:
+            yield row, f"{','.join(names)}\t{line}"
+
+
+def _alternation(regexes: Iterable[re.Pattern[str]]) -> re.Pattern[str] | None:
+    """Combine the given regexes into 1, matching wherever any of them match.
+
+    Each regex's leading global flags, like `(?i)`, are scoped to its own
+    alternative. Returns `None` if the regexes can't be combined, like if
+    they have backreferences, whose group numbers would shift.
+    """
+    alternatives = []
+    for regex in regexes:
+        if _BACKREFERENCE_RE.search(regex.pattern):
+            return None
+        alternatives.append(
+            _GLOBAL_FLAGS_RE.sub(r"(?\1:", regex.pattern, count=1) + ")"
+            if _GLOBAL_FLAGS_RE.match(regex.pattern)
+            else f"(?:{regex.pattern})"
+        )
+
+    try:
+        return re.compile("|".join(alternatives))
+    except re.error:
+        return None
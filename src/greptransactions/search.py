@@ -0,0 +1,128 @@
+"""In-process search of transactions, streamed one row at a time."""
+
+import csv
+import heapq
+import itertools
+import re
+from collections.abc import Callable, Iterable, Iterator
+from io import StringIO
+from typing import Any
+
+import click
+
+from taxes.amounts import parse_amount
+
+from .store import TransactionStore
+
+SortOption = str
+
+SORT_KEYS: dict[SortOption, Callable[[list[str]], Any]] = {
+    "date": lambda row: row[0],
+    "description": lambda row: row[1],
+    "amount": lambda row: parse_amount(row[2]),
+}
+
+
+def tsv_lines(rows: Iterable[list[str]]) -> Iterator[tuple[list[str], str]]:
+    """Format each CSV row as a line of tab-delimited text, without a line ending."""
+    output = StringIO()
+    writer = csv.writer(output, dialect="excel-tab", lineterminator="")
+    for row in rows:
+        writer.writerow(row)
+        yield row, output.getvalue()
+        output.seek(0)
+        output.truncate()
+
+
+def order_matches(
+    store: TransactionStore,
+    matches: Iterable[tuple[int, str]],
+    *,
+    sort: SortOption | None = None,
+    reverse: bool = False,
+    top: int | None = None,
+) -> Iterator[str]:
+    """Yield the lines of the given matching store rows, in the requested order.
+
+    Without a sort, or reverse, matches stream through in the given order.
+    Only sorting waits for all matches, and sorts them by the store's
+    columns.
+
+    If given a top number of rows, yields only that many matches with the
+    largest amounts, largest first, or with reverse, the smallest, smallest
+    first. This only keeps that many matches in memory, without sorting all
+    of them.
+
+    Matches with invalid amounts are left out of the top, and sorted last
+    by amount, either way.
+    """
+    if top is not None:
+        select = heapq.nsmallest if reverse else heapq.nlargest
+        yield from (
+            line
+            for _, line in select(
+                top,
+                (match for match in matches if store.has_amount(match[0])),
+                key=lambda match: store.amounts[match[0]],
+            )
+        )
+        return
+
+    if sort is None and not reverse:
+        yield from (line for _, line in matches)
+        return
+
+    sorted_matches = list(matches)
+    if sort is None:
+        sorted_matches.reverse()
+    else:
+        sort_key = _store_sort_key(store, sort)
+        sorted_matches.sort(key=lambda match: sort_key(match[0]), reverse=reverse)
+        if sort == "amount":
+            sorted_matches = [
+                match for match in sorted_matches if store.has_amount(match[0])
+            ] + [match for match in sorted_matches if not store.has_amount(match[0])]
+    yield from (line for _, line in sorted_matches)
+
+
+def row_lines(
+    store: TransactionStore, rows: Iterable[int]
+) -> Iterator[tuple[int, str]]:
+    """Yield each of the given store rows, and its tab-delimited line without a line ending.
+
+    Rows are read and formatted 1 at a time, so results stream.
+    """
+    rows, line_rows = itertools.tee(rows)
+    csv_rows = csv.reader(store.line(row) for row in line_rows)
+    for row, (_, line) in zip(rows, tsv_lines(csv_rows), strict=True):
+        yield row, line
+
+
+def matching_rows(
+    store: TransactionStore,
+    rows: Iterable[int],
+    regex: re.Pattern[str],
+) -> Iterator[tuple[int, str]]:
+    """Yield each of the given store rows, and its tab-delimited line, if the line matches the given regex."""
+    for row, line in row_lines(store, rows):
+        if regex.search(line):
+            yield row, line
+
+
+def _store_sort_key(store: TransactionStore, sort: SortOption) -> Callable[[int], Any]:
+    """Return a function of a store row, sorting the same as its CSV row's SORT_KEYS."""
+    if sort == "date":
+        return store.dates.__getitem__
+    if sort == "description":
+        return lambda row: store.description(store.description_ids[row])
+    return store.amounts.__getitem__
+
+
+def highlight(line: str, regex: re.Pattern[str]) -> str:
+    """Style the given line's matches of the given regex, for a terminal."""
+    return regex.sub(
+        lambda match: (
+            click.style(match.group(), fg="red", bold=True) if match.group() else ""
+        ),
+        line,
+    )
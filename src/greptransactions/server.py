@@ -0,0 +1,146 @@
+"""Long-lived `gt` daemon, answering queries over a local Unix socket.
+
+The daemon keeps transaction stores and indexes open between queries, so a
+query only pays for the search itself, not Python startup, imports, or
+loading data. Requests and responses are JSON lines. A request is a `gt`
+invocation's arguments, working directory, and environment. Responses are
+its stdout and stderr, as written, then its exit code.
+"""
+
+import contextlib
+import io
+import json
+import os
+import pathlib
+import socket
+import socketserver
+import traceback
+from collections.abc import Generator
+from typing import TYPE_CHECKING, Any
+
+import click
+
+if TYPE_CHECKING:
+    from _typeshed import ReadableBuffer
+
+
+def serve(command: click.Command, socket_path: pathlib.Path) -> None:
+    """Answer queries to the given `gt` command, 1 at a time, until interrupted."""
+    if _is_listening(socket_path):
+        raise click.ClickException(f'Already serving on "{socket_path}".')
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    socket_path.unlink(missing_ok=True)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            _handle(command, self.rfile, self.wfile)
+
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(str(socket_path), Handler)
+    finally:
+        os.umask(old_umask)
+
+    click.echo(
+        f'Serving gt queries on "{socket_path}". Press Ctrl-C to stop.', err=True
+    )
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        socket_path.unlink(missing_ok=True)
+
+
+def _handle(
+    command: click.Command, rfile: io.BufferedIOBase, wfile: io.BufferedIOBase
+) -> None:
+    """Run 1 query, streaming its output back as it's written."""
+    request_line = rfile.readline()
+    if not request_line:
+        # Only checking whether the daemon is running
+        return
+    request = json.loads(request_line)
+    stdout, stderr = (
+        io.TextIOWrapper(_MessageWriter(wfile, name), write_through=True)
+        for name in ("stdout", "stderr")
+    )
+
+    exit_code = 0
+    with (
+        contextlib.redirect_stdout(stdout),
+        contextlib.redirect_stderr(stderr),
+        _environment(request["env"], request["cwd"]),
+    ):
+        try:
+            command.main(request["args"], prog_name="gt", color=request["color"])
+        except SystemExit as err:
+            exit_code = (
+                0 if err.code is None else err.code if isinstance(err.code, int) else 1
+            )
+        except BrokenPipeError:
+            return
+        except Exception:
+            # Report it to the client, and keep serving
+            traceback.print_exc()
+            exit_code = 1
+
+    with contextlib.suppress(BrokenPipeError):
+        _send(wfile, {"exit": exit_code})
+
+
+class _MessageWriter(io.RawIOBase):
+    """Binary stream sending each write as a message of text."""
+
+    def __init__(self, wfile: io.BufferedIOBase, name: str) -> None:
+        self.wfile = wfile
+        self.name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: "ReadableBuffer") -> int:
+        data = bytes(b)
+        if data:
+            _send(self.wfile, {self.name: data.decode(errors="replace")})
+        return len(data)
+
+
+def _send(wfile: io.BufferedIOBase, message: dict[str, Any]) -> None:
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+
+@contextlib.contextmanager
+def _environment(env: dict[str, str | None], cwd: str) -> Generator[None]:
+    """Temporarily set the given environment variables and working directory.
+
+    Variables that are `None` are unset.
+    """
+    old_env = {name: os.environ.get(name) for name in env}
+    old_cwd = os.getcwd()
+    try:
+        _set_environment(env)
+        os.chdir(cwd)
+        yield
+    finally:
+        os.chdir(old_cwd)
+        _set_environment(old_env)
+
+
+def _set_environment(env: dict[str, str | None]) -> None:
+    for name, value in env.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+def _is_listening(socket_path: pathlib.Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
@@ -0,0 +1,253 @@
+"""Columnar, memory-mapped store of the transactions in a snapshot."""
+
+import array
+import bisect
+import csv
+import datetime
+import decimal
+import hashlib
+import pathlib
+import re
+import struct
+from collections.abc import Iterable, Iterator
+
+from taxes.amounts import amount_cents
+from taxes.paths import cache_path
+
+from .columns import SectionReader, map_file, write_sections
+
+STORE_VERSION = 2
+
+_MAGIC = b"GTSTORE\0"
+_HEADER = struct.Struct("=8sIxxxxqqqqqq")
+
+# Stored in place of an amount that doesn't parse, like "(5.00)". Rows with it
+# are left out of amount filters, sums, and amount order.
+INVALID_AMOUNT = -(2**63)
+
+_open_stores: dict[pathlib.Path, "TransactionStore"] = {}
+
+# A transaction CSV row, indented in a snapshot
+_ROW_RE = re.compile(r"^\s*(\d{4})-(\d{2})-(\d{2}),")
+
+
+class TransactionStore:
+    """Transactions parsed from a snapshot once, stored column by column.
+
+    Columns are dates as days (proleptic Gregorian ordinals), amounts as
+    integer cents, or `INVALID_AMOUNT`, and descriptions as IDs into a table
+    of interned strings. Each row's original line of snapshot text is kept
+    too, so query output matches the snapshot exactly. Columns are
+    memory-mapped from a file, so a query only reads the columns and rows it
+    touches.
+
+    Rows are indexed by date, so a date range's rows are found by binary
+    search, instead of a scan of all rows.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Map the store file at the given path."""
+        self.path = path
+        self._mmap = map_file(path)
+
+        (
+            magic,
+            version,
+            self.source_size,
+            self.source_mtime_ns,
+            num_rows,
+            num_descriptions,
+            lines_size,
+            descriptions_size,
+        ) = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or version != STORE_VERSION:
+            raise ValueError(f'Not a version {STORE_VERSION} store: "{path}"')
+
+        self.num_descriptions = num_descriptions
+        sections = SectionReader(memoryview(self._mmap), _HEADER.size)
+        self.dates = sections.column("i", num_rows)
+        self.amounts = sections.column("q", num_rows)
+        self.description_ids = sections.column("i", num_rows)
+        self._sorted_dates = sections.column("i", num_rows)
+        self._date_order = sections.column("i", num_rows)
+        self._line_offsets = sections.column("q", num_rows + 1)
+        self._description_offsets = sections.column("q", num_descriptions + 1)
+        self._lines = sections.blob(lines_size)
+        self._descriptions = sections.blob(descriptions_size)
+
+    @classmethod
+    def open(
+        cls, source: pathlib.Path, path: pathlib.Path | None = None
+    ) -> "TransactionStore":
+        """Open the store of the given snapshot, first rebuilding it if the snapshot changed.
+
+        Stores stay open for the life of the process, like a `gt --serve`
+        daemon's, so later queries reuse them while the snapshot is unchanged.
+        """
+        path = path or default_store_path(source)
+        stat = source.stat()
+        source_stamp = (stat.st_size, stat.st_mtime_ns)
+
+        store = _open_stores.get(path)
+        if store is None or store.source_stamp != source_stamp:
+            try:
+                store = cls(path)
+            except (FileNotFoundError, ValueError, struct.error):
+                store = None
+            if store is None or store.source_stamp != source_stamp:
+                build_store(source, path)
+                store = cls(path)
+            _open_stores[path] = store
+
+        return store
+
+    @property
+    def source_stamp(self) -> tuple[int, int]:
+        """Return the size and modification time of the snapshot the store was built from."""
+        return self.source_size, self.source_mtime_ns
+
+    def __len__(self) -> int:
+        """Count the rows in the store."""
+        return len(self.dates)
+
+    def date(self, row: int) -> datetime.date:
+        """Return the given row's transaction date."""
+        return datetime.date.fromordinal(self.dates[row])
+
+    def description(self, description_id: int) -> str:
+        """Return the description string with the given ID."""
+        start, end = self._description_offsets[description_id : description_id + 2]
+        return bytes(self._descriptions[start:end]).decode("utf-8")
+
+    def line(self, row: int) -> str:
+        """Return the given row's original line of snapshot text."""
+        start, end = self._line_offsets[row : row + 2]
+        return bytes(self._lines[start:end]).decode("utf-8")
+
+    def date_rows(
+        self,
+        date_ranges: Iterable[tuple[datetime.date | None, datetime.date | None]],
+    ) -> list[int]:
+        """Return the rows of transactions in any of the given date ranges, in snapshot order.
+
+        Each range includes its start date and excludes its end date. A
+        missing start or end leaves the range open on that side.
+        """
+        rows: set[int] = set()
+        for start, end in date_ranges:
+            lo = (
+                0
+                if start is None
+                else bisect.bisect_left(self._sorted_dates, start.toordinal())
+            )
+            hi = (
+                len(self)
+                if end is None
+                else bisect.bisect_left(self._sorted_dates, end.toordinal(), lo)
+            )
+            rows.update(self._date_order[lo:hi])
+        return sorted(rows)
+
+    def amount_rows(
+        self,
+        rows: Iterable[int],
+        min_cents: int | None = None,
+        max_cents: int | None = None,
+    ) -> Iterator[int]:
+        """Yield those of the given rows with amounts between the given bounds, inclusive.
+
+        With any bound, rows with invalid amounts are left out.
+        """
+        amounts = self.amounts
+        is_bounded = min_cents is not None or max_cents is not None
+        for row in rows:
+            amount = amounts[row]
+            if is_bounded and amount == INVALID_AMOUNT:
+                continue
+            if (min_cents is None or amount >= min_cents) and (
+                max_cents is None or amount <= max_cents
+            ):
+                yield row
+
+    def has_amount(self, row: int) -> bool:
+        """Whether the given row's amount parsed."""
+        return self.amounts[row] != INVALID_AMOUNT
+
+    def description_rows(
+        self, rows: Iterable[int], description_ids: set[int]
+    ) -> Iterator[int]:
+        """Yield those of the given rows with any of the given descriptions."""
+        row_description_ids = self.description_ids
+        for row in rows:
+            if row_description_ids[row] in description_ids:
+                yield row
+
+
+def default_store_path(source: pathlib.Path) -> pathlib.Path:
+    """Return where to store the given snapshot's transactions, by default."""
+    source_key = hashlib.sha256(str(source.resolve()).encode()).hexdigest()
+    return cache_path("greptransactions", f"{source_key}.store")
+
+
+def build_store(source: pathlib.Path, path: pathlib.Path) -> None:
+    """Parse the given snapshot's transactions into a store file at the given path."""
+    stat = source.stat()
+    dates = array.array("i")
+    amounts = array.array("q")
+    description_ids = array.array("i")
+    line_offsets = array.array("q", [0])
+    lines = bytearray()
+    description_id_by_text: dict[str, int] = {}
+    description_offsets = array.array("q", [0])
+    descriptions = bytearray()
+
+    with open(source, encoding="utf-8") as fil:
+        for line in fil:
+            line = line.rstrip("\r\n")
+            match = _ROW_RE.match(line)
+            if not match:
+                continue
+
+            _, description, amount = next(csv.reader([line]))[:3]
+            dates.append(datetime.date(*map(int, match.groups())).toordinal())
+            try:
+                amounts.append(amount_cents(amount))
+            except decimal.InvalidOperation:
+                amounts.append(INVALID_AMOUNT)
+
+            description_id = description_id_by_text.get(description)
+            if description_id is None:
+                description_id = len(description_id_by_text)
+                description_id_by_text[description] = description_id
+                descriptions += description.encode("utf-8")
+                description_offsets.append(len(descriptions))
+            description_ids.append(description_id)
+
+            lines += line.encode("utf-8")
+            line_offsets.append(len(lines))
+
+    header = _HEADER.pack(
+        _MAGIC,
+        STORE_VERSION,
+        stat.st_size,
+        stat.st_mtime_ns,
+        len(dates),
+        len(description_id_by_text),
+        len(lines),
+        len(descriptions),
+    )
+    date_order = array.array("i", sorted(range(len(dates)), key=dates.__getitem__))
+    sorted_dates = array.array("i", (dates[row] for row in date_order))
+    sections: list[bytes | bytearray | array.array[int]] = [
+        dates,
+        amounts,
+        description_ids,
+        sorted_dates,
+        date_order,
+        line_offsets,
+        description_offsets,
+        lines,
+        descriptions,
+    ]
+
+    write_sections(path, header, sections)
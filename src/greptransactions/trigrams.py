@@ -0,0 +1,232 @@
+"""Trigram index of transaction descriptions, for narrowing searches."""
+
+import array
+import bisect
+import pathlib
+import re
+import struct
+from collections.abc import Iterable
+
+from .columns import SectionReader, map_file, write_sections
+from .store import TransactionStore
+
+INDEX_VERSION = 1
+DEFAULT_FUZZY_THRESHOLD = 0.5
+
+_MAGIC = b"GTTRIGR\0"
+_HEADER = struct.Struct("=8sIxxxxqqqq")
+
+_open_indexes: dict[pathlib.Path, "TrigramIndex"] = {}
+
+# Text that's only ever in a transaction line's date or amount fields, or
+# between them
+_NON_DESCRIPTION_CHARS = frozenset("0123456789-$,.+ ")
+_REGEX_METACHARS_RE = re.compile(r"[.^$*+?{}\[\]\\|()]")
+_LITERAL_PATTERN_RE = re.compile(
+    r"(?:\(\?[aiu]+\))?(?:\((?:\?:)?(?P<group>[^()]*)\)|(?P<bare>[^()]*))"
+)
+
+
+class TrigramIndex:
+    """Which descriptions in a transaction store contain each trigram.
+
+    Trigrams are every 3 consecutive characters of a description, ignoring
+    case and runs of whitespace. A description can only contain some text if
+    it contains all the text's trigrams, so a search only needs to check the
+    descriptions that do. Searches for text similar to descriptions count
+    how many of the text's trigrams each description contains.
+
+    Posting lists of description IDs are memory-mapped from a file, next to
+    the store's, and rebuilt along with the store.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Map the index file at the given path."""
+        self._mmap = map_file(path)
+        (
+            magic,
+            version,
+            self.source_size,
+            self.source_mtime_ns,
+            num_trigrams,
+            num_postings,
+        ) = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or version != INDEX_VERSION:
+            raise ValueError(f'Not a version {INDEX_VERSION} trigram index: "{path}"')
+
+        sections = SectionReader(memoryview(self._mmap), _HEADER.size)
+        self._trigrams = sections.column("q", num_trigrams)
+        self._posting_offsets = sections.column("q", num_trigrams + 1)
+        self._postings = sections.column("i", num_postings)
+
+    @classmethod
+    def open(
+        cls, store: TransactionStore, path: pathlib.Path | None = None
+    ) -> "TrigramIndex":
+        """Open the index of the given store, first rebuilding it if the store's snapshot changed.
+
+        Like stores, indexes stay open for the life of the process.
+        """
+        path = path or store.path.with_suffix(".trigrams")
+
+        index = _open_indexes.get(path)
+        if index is None or index.source_stamp != store.source_stamp:
+            try:
+                index = cls(path)
+            except (FileNotFoundError, ValueError, struct.error):
+                index = None
+            if index is None or index.source_stamp != store.source_stamp:
+                build_index(store, path)
+                index = cls(path)
+            _open_indexes[path] = index
+
+        return index
+
+    @property
+    def source_stamp(self) -> tuple[int, int]:
+        """Return the size and modification time of the snapshot the index was built from."""
+        return self.source_size, self.source_mtime_ns
+
+    def containing(self, text: str) -> set[int] | None:
+        """Return the IDs of descriptions that could contain the given text, ignoring case.
+
+        Returns `None` if the text is too short to narrow down descriptions.
+        """
+        trigrams = _trigrams(text)
+        if not trigrams:
+            return None
+
+        # Intersect the shortest posting lists first
+        posting_lists = sorted(
+            (self._posting_list(trigram) for trigram in trigrams), key=len
+        )
+        result = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            result.intersection_update(posting_list)
+        return result
+
+    def similar(
+        self, text: str, threshold: float = DEFAULT_FUZZY_THRESHOLD
+    ) -> set[int] | None:
+        """Return the IDs of descriptions containing at least the given fraction of the text's trigrams, ignoring case.
+
+        Returns `None` if the text is too short to have any trigrams. See
+        `descriptions_containing`.
+        """
+        trigrams = _trigrams(text)
+        if not trigrams:
+            return None
+
+        counts: dict[int, int] = {}
+        for trigram in trigrams:
+            for description_id in self._posting_list(trigram):
+                counts[description_id] = counts.get(description_id, 0) + 1
+
+        min_count = threshold * len(trigrams)
+        return {
+            description_id
+            for description_id, count in counts.items()
+            if count >= min_count
+        }
+
+    def _posting_list(self, trigram: int) -> "memoryview[int]":
+        i = bisect.bisect_left(self._trigrams, trigram)
+        if i == len(self._trigrams) or self._trigrams[i] != trigram:
+            return self._postings[0:0]
+        start, end = self._posting_offsets[i : i + 2]
+        return self._postings[start:end]
+
+
+def build_index(store: TransactionStore, path: pathlib.Path) -> None:
+    """Index the given store's descriptions by trigram, into a file at the given path."""
+    description_ids_by_trigram: dict[int, list[int]] = {}
+    for description_id in range(store.num_descriptions):
+        for trigram in _trigrams(store.description(description_id)):
+            description_ids_by_trigram.setdefault(trigram, []).append(description_id)
+
+    trigrams = array.array("q", sorted(description_ids_by_trigram))
+    posting_offsets = array.array("q", [0])
+    postings = array.array("i")
+    for trigram in trigrams:
+        postings.extend(description_ids_by_trigram[trigram])
+        posting_offsets.append(len(postings))
+
+    header = _HEADER.pack(
+        _MAGIC,
+        INDEX_VERSION,
+        store.source_size,
+        store.source_mtime_ns,
+        len(trigrams),
+        len(postings),
+    )
+    write_sections(path, header, [trigrams, posting_offsets, postings])
+
+
+def pattern_literals(pattern: str) -> list[str] | None:
+    """Return the literal alternatives of a regex that's only plain text, like `(?i)(output|tulip)`.
+
+    Matching lines must contain one of the alternatives, ignoring case. Only
+    returns alternatives that must be in a line's description, not its other
+    fields, so they can be looked up in the index. Otherwise, returns `None`.
+    """
+    match = _LITERAL_PATTERN_RE.fullmatch(pattern)
+    if not match:
+        return None
+
+    group, bare = match.group("group", "bare")
+    alternatives: list[str] = (bare if group is None else group).split("|")
+    if not all(_is_description_literal(text) for text in alternatives):
+        return None
+    return alternatives
+
+
+def candidate_descriptions(
+    index: TrigramIndex, alternatives: Iterable[str]
+) -> set[int] | None:
+    """Return the IDs of descriptions that could contain any of the given texts, if the index can narrow them down."""
+    result: set[int] = set()
+    for text in alternatives:
+        description_ids = index.containing(text)
+        if description_ids is None:
+            return None
+        result |= description_ids
+    return result
+
+
+def descriptions_containing(store: TransactionStore, text: str) -> set[int]:
+    """Return the IDs of descriptions containing the given text, ignoring case and runs of whitespace.
+
+    Scans every description, for text too short for an index to look up.
+    """
+    normalized = _normalize(text)
+    return {
+        description_id
+        for description_id in range(store.num_descriptions)
+        if normalized in _normalize(store.description(description_id))
+    }
+
+
+def _is_description_literal(text: str) -> bool:
+    """Return whether the given regex is plain text, that only a description could contain."""
+    return (
+        len(text) >= 3
+        and text.isascii()
+        and not _REGEX_METACHARS_RE.search(text)
+        and not any(char in text for char in '\t"')
+        and not set(text) <= _NON_DESCRIPTION_CHARS
+    )
+
+
+def _trigrams(text: str) -> set[int]:
+    """Return the given text's trigrams, ignoring case and runs of whitespace, each packed into an int."""
+    normalized = _normalize(text)
+    return {
+        (ord(normalized[i]) << 42)
+        | (ord(normalized[i + 1]) << 21)
+        | ord(normalized[i + 2])
+        for i in range(len(normalized) - 2)
+    }
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
@@ -2,20 +2,45 @@
 
 from __future__ import annotations
 
+import collections
+import contextlib
 import dataclasses
 import datetime
+import functools
+import heapq
 import itertools
 import logging
 import multiprocessing
 import os
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from functools import partial
 from pathlib import Path
-from typing import Literal
+from typing import IO, Any, Literal
 
 import click
 
-from .extract import extract_dataframes
-from .extractors import Extraction
+from . import timings
+from .cache import DEFAULT_MAX_BYTES, TableCache
+from .extract import (
+    DEFAULT_PAGES_PER_CHUNK,
+    ExtractionTask,
+    TaskExtraction,
+    earliest_transaction_date,
+    extract_task,
+    plan_extraction,
+    select_extractions,
+)
+from .extractors import Extraction, Flavor
+from .manifest import ExtractionOptions, Manifest
+from .output import Format, Writer, open_writer
+from .packing import PackedTaskExtraction, pack_task_extraction, unpack_task_extraction
+from .schedule import default_jobs, longest_first
+
+# Order of transactions in the output
+Order = Literal["tables", "date"]
+
+# Maps a function over items, like `map`, or a pool's `imap_unordered`
+_Map = Callable[..., Iterable[Any]]
 
 
 @dataclasses.dataclass
@@ -24,6 +49,13 @@ class FileExtraction:
 
     fil: Path
     extraction: Extraction
+    sort_key: tuple[datetime.date, Path] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        """Compute the sort key once, instead of on every comparison."""
+        self.sort_key = self.extraction.date_start, _resolve(self.fil)
 
     def __lt__(self, other: FileExtraction) -> bool:
         """Sort extractions in deterministic, roughly chronological order.
@@ -35,23 +67,26 @@ class FileExtraction:
 
         Transactions aren't sorted within a table, so a few transactions may
         still be out of order when multiple files are merged into one output.
-        Transactions should _tend_ to be adjacent, month to month.
+        Transactions should _tend_ to be adjacent, month to month. For fully
+        chronological output, see `_in_date_order`.
         """
-        return self._sort_key < other._sort_key
+        return self.sort_key < other.sort_key
+
 
-    @property
-    def _sort_key(self) -> tuple[datetime.date, Path]:
-        return self.extraction.date_start, self.fil.resolve()
+@functools.cache
+def _resolve(fil: Path) -> Path:
+    """Resolve each file's path once, for all its tables' sort keys."""
+    return fil.resolve()
 
 
 def extract_file(
     fil: Path,
-    flavor: Literal["network", "stream"] | None,
+    task_extractions: Sequence[TaskExtraction],
 ) -> list[FileExtraction]:
-    """Convert 1 bank statement PDF to a list of its transaction tables."""
+    """Collect 1 bank statement PDF's transaction tables, given all its tasks' results."""
     result = sorted(
         FileExtraction(fil, extraction)
-        for extraction in extract_dataframes(fil, flavor)
+        for extraction in select_extractions(fil, task_extractions)
     )
     if not result:
         logging.warning('File "%s" had nothing to extract', fil)
@@ -65,35 +100,488 @@ def extract_file(
     help="""Flavor of PDF reader to use. Defaults to whatever is known to work with a given bank statement.""",
     type=click.Choice(["network", "stream"]),
 )
-def main(files: list[Path], flavor: Literal["network", "stream"] | None) -> None:
-    """Convert FILES bank statement PDFs to CSV on stdout."""
+@click.option(
+    "--cache/--no-cache",
+    "use_cache",
+    default=True,
+    help="""Reuse tables previously parsed from the same PDF content. Defaults to on.""",
+)
+@click.option(
+    "--cache-max-mb",
+    default=DEFAULT_MAX_BYTES // (1024 * 1024),
+    show_default=True,
+    help="""Evict least recently used cached tables beyond this size.""",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--pages-per-chunk",
+    default=DEFAULT_PAGES_PER_CHUNK,
+    show_default=True,
+    help="""Parse each PDF this many pages at a time, so chunks of large statements spread across workers. 0 parses all pages at once.""",
+    type=click.IntRange(min=0),
+)
+@click.option(
+    "--prescan",
+    is_flag=True,
+    help="""Read each PDF's text layer first, to parse only pages that could hold transaction tables, with only the flavors their banks need.""",
+)
+@click.option(
+    "--manifest",
+    "manifest_path",
+    help="""Build incrementally. Record extracted statements in this JSON file, and replay unchanged statements from it instead of extracting them again.""",
+    type=click.Path(dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--jobs",
+    help="""Number of worker processes parsing PDFs in parallel. Defaults to half the CPUs available to this process, within any container CPU quota.""",
+    type=click.IntRange(min=1),
+)
+@click.option(
+    "--order",
+    default="tables",
+    show_default=True,
+    help="""Order of transactions in the output. "tables" writes each table whole, as soon as it's extracted, roughly chronologically. "date" sorts all transactions by date, across tables and files.""",
+    type=click.Choice(["tables", "date"]),
+)
+@click.option(
+    "--format",
+    "fmt",
+    default="csv",
+    show_default=True,
+    help="""Output format. "csv" keeps amounts as printed in each statement. "jsonl", "parquet", and "arrow" (an Arrow IPC file, AKA Feather) have typed dates and decimal amounts. "parquet" and "arrow" require pyarrow.""",
+    type=click.Choice(["csv", "jsonl", "parquet", "arrow"]),
+)
+@click.option(
+    "--output",
+    "-o",
+    "out",
+    default="-",
+    help="""File to write to. Defaults to stdout.""",
+    type=click.File("wb", lazy=False),
+)
+@click.option(
+    "--timings",
+    "timings_path",
+    help="""Time each stage of extracting each file, like parsing PDFs and matching tables to banks. Write the timings to this Chrome trace file, and summarize them on stderr.""",
+    type=click.Path(dir_okay=False, path_type=Path),
+)
+def main(
+    files: list[Path],
+    flavor: Flavor | None,
+    use_cache: bool,
+    cache_max_mb: int,
+    pages_per_chunk: int,
+    prescan: bool,
+    manifest_path: Path | None,
+    jobs: int | None,
+    order: Order,
+    fmt: Format,
+    out: IO[bytes],
+    timings_path: Path | None,
+) -> None:
+    """Convert FILES bank statement PDFs to CSV, or another format, on stdout."""
     logging.basicConfig(level=os.environ.get("LOGLEVEL", "WARNING").upper())
 
-    num_cores_that_hopefully_wont_max_out_machine = multiprocessing.cpu_count() // 2
-    do_serially = len(files) <= 1 or num_cores_that_hopefully_wont_max_out_machine <= 1
-    if do_serially:
-        extractions = [extract_file(fil, flavor) for fil in files]
+    cache = TableCache(max_bytes=cache_max_mb * 1024 * 1024) if use_cache else None
+    manifest = Manifest.load(manifest_path) if manifest_path else None
+
+    options = ExtractionOptions(flavor, pages_per_chunk or None, prescan)
+    replayed_files, unplanned_files = _replayed(manifest, files, options)
+
+    # Each flavor of each chunk of pages of each file is its own unit of work,
+    # so a single file's flavors and pages are parsed in parallel, sharing the
+    # same pool of workers as other files
+    plan_file = partial(
+        _plan_file,
+        flavor=options.flavor,
+        pages_per_chunk=options.pages_per_chunk,
+        prescan=options.prescan,
+    )
+    task_files = _TaskFiles()
+    indexed_tasks: list[tuple[int, ExtractionTask]] = []
+    plan_tasks = None
+    if prescan:
+        # Prescanning reads the text of every page, so files are planned by
+        # workers too
+        plan_tasks = partial(_planned_tasks, task_files, plan_file, unplanned_files)
+        num_workers = (jobs or default_jobs()) if unplanned_files else 0
     else:
-        # Let through child process logging to stderr. Note on macOS, this line is
-        # considered unsafe.
-        # https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
-        multiprocessing.set_start_method("fork")
-
-        with multiprocessing.Pool(
-            num_cores_that_hopefully_wont_max_out_machine
-        ) as pool:
-            extractions = pool.map(partial(extract_file, flavor=flavor), files)
-
-    flattened_extractions = itertools.chain.from_iterable(extractions)
-    sorted_extractions = sorted(flattened_extractions)
-
-    for i, flattened_extraction in enumerate(sorted_extractions):
-        is_first = i == 0
-        is_last = i >= len(sorted_extractions) - 1
-        click.echo(
-            flattened_extraction.extraction.df.to_csv(header=is_first, index=False),
-            nl=is_last,
+        indexed_tasks = task_files.add(map(plan_file, unplanned_files))
+        num_workers = min(jobs or default_jobs(), len(indexed_tasks))
+
+    extract_indexed_task = partial(
+        _extract_indexed_task,
+        cache=cache,
+        timed=timings_path is not None,
+    )
+
+    with contextlib.ExitStack() as stack:
+        writer = _open_writer(stack, fmt, out)
+        spans: list[timings.Span] = []
+        if timings_path:
+            spans = stack.enter_context(timings.recording())
+
+        indexed_task_extractions = _run_tasks(
+            stack, num_workers, extract_indexed_task, indexed_tasks, plan_tasks
+        )
+        extracted_files = _collect_files(
+            task_files, _with_spans(indexed_task_extractions, spans)
         )
+        if manifest:
+            extracted_files = _recorded(manifest, files, options, extracted_files)
+        completed_files = itertools.chain(replayed_files, extracted_files)
+
+        in_order = _in_date_order if order == "date" else _in_sorted_order
+        _write_all(writer, in_order(files, completed_files))
+
+    if manifest:
+        manifest.save()
+
+    if timings_path:
+        timings.write_trace(timings_path, spans)
+        for line in timings.format_summary(timings.summarize(spans)):
+            click.echo(line, err=True)
+
+
+def _open_writer(stack: contextlib.ExitStack, fmt: Format, out: IO[bytes]) -> Writer:
+    """Open the output, before any extracting, so a missing dependency fails fast."""
+    try:
+        return stack.enter_context(open_writer(fmt, out))
+    except ImportError as err:
+        raise click.ClickException(
+            f'--format {fmt} requires pyarrow. Install it with "pip install pyarrow".'
+        ) from err
+
+
+def _write_all(writer: Writer, file_extractions: Iterable[FileExtraction]) -> None:
+    """Write transaction tables as they come, as 1 output."""
+    for file_extraction in file_extractions:
+        with timings.span("write", file_extraction.fil):
+            writer.write(file_extraction.extraction.df)
+
+
+class _TaskFiles:
+    """Which file each task belongs to, numbering tasks as their files are planned.
+
+    Files can be planned by pool workers, while earlier files' tasks already
+    run, so files are added as their plans arrive.
+    """
+
+    def __init__(self) -> None:
+        # Each task's file index, file, and the file's number of tasks
+        self.task_files: list[tuple[int, Path, int]] = []
+        # Files planned without any tasks, and not yet collected
+        self.empty_files: collections.deque[tuple[int, Path]] = collections.deque()
+
+    def add(
+        self, files_tasks: Iterable[tuple[int, Path, list[ExtractionTask]]]
+    ) -> list[tuple[int, ExtractionTask]]:
+        """Add the given files' tasks, returning them numbered, in the order to run them."""
+        start = len(self.task_files)
+        tasks = []
+        for file_i, fil, file_tasks in files_tasks:
+            if not file_tasks:
+                self.empty_files.append((file_i, fil))
+            for task in file_tasks:
+                self.task_files.append((file_i, fil, len(file_tasks)))
+                tasks.append(task)
+
+        # Start the most work first, so the largest PDFs don't start last,
+        # leaving other workers idle while they finish
+        return [(start + task_i, tasks[task_i]) for task_i in longest_first(tasks)]
+
+
+def _replayed(
+    manifest: Manifest | None, files: Sequence[Path], options: ExtractionOptions
+) -> tuple[list[tuple[int, list[FileExtraction]]], list[tuple[int, Path]]]:
+    """Replay unchanged files' tables from the manifest, if any.
+
+    Returns the replayed files' indexes and tables, and the indexes of the
+    other files, with the files, which still need extracting.
+    """
+    replayed_files = []
+    unplanned_files = []
+    for file_i, fil in enumerate(files):
+        replayed = manifest.lookup(fil, options) if manifest else None
+        if replayed is None:
+            unplanned_files.append((file_i, fil))
+        else:
+            logging.info('File "%s" is unchanged since the last build', fil)
+            file_extractions = [
+                FileExtraction(fil, extraction) for extraction in replayed
+            ]
+            replayed_files.append((file_i, file_extractions))
+    return replayed_files, unplanned_files
+
+
+def _run_tasks(
+    stack: contextlib.ExitStack,
+    num_workers: int,
+    extract_indexed_task: Callable[
+        [tuple[int, ExtractionTask]], tuple[int, PackedTaskExtraction]
+    ],
+    indexed_tasks: Iterable[tuple[int, ExtractionTask]],
+    plan_tasks: Callable[[_Map], Iterator[tuple[int, ExtractionTask]]] | None,
+) -> Iterable[tuple[int, PackedTaskExtraction]]:
+    """Run tasks on a pool of workers, or in this process, yielding results as they arrive.
+
+    If given a way to plan tasks, plans them with the same workers, instead
+    of running the given tasks.
+    """
+    if num_workers <= 1:
+        if plan_tasks is not None:
+            indexed_tasks = plan_tasks(map)
+        return map(extract_indexed_task, indexed_tasks)
+
+    # Let through child process logging to stderr. Note on macOS, this line is
+    # considered unsafe.
+    # https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
+    context = multiprocessing.get_context("fork")
+
+    pool = stack.enter_context(context.Pool(num_workers))
+    if plan_tasks is not None:
+        indexed_tasks = plan_tasks(pool.imap_unordered)
+    # 1 task at a time, so a worker never holds on to queued tasks while
+    # others are idle
+    return pool.imap_unordered(extract_indexed_task, indexed_tasks, chunksize=1)
+
+
+def _plan_file(
+    indexed_fil: tuple[int, Path],
+    flavor: Flavor | None,
+    pages_per_chunk: int | None,
+    prescan: bool,
+) -> tuple[int, Path, list[ExtractionTask]]:
+    """Plan the given file's tasks, keeping track of its index, for plans that arrive in any order."""
+    file_i, fil = indexed_fil
+    return file_i, fil, plan_extraction(fil, flavor, pages_per_chunk, prescan)
+
+
+def _planned_tasks(
+    task_files: _TaskFiles,
+    plan_file: Callable[[tuple[int, Path]], tuple[int, Path, list[ExtractionTask]]],
+    unplanned_files: Sequence[tuple[int, Path]],
+    map_files: _Map,
+) -> Iterator[tuple[int, ExtractionTask]]:
+    """Start planning files with the given map, and yield each file's tasks once planned.
+
+    Fed to the same pool that plans the files, so workers start on a file's
+    tasks without waiting for other files' plans. Planning starts right away,
+    since a pool only takes more work once it has iterated all of these tasks.
+    """
+    files_tasks = map_files(plan_file, unplanned_files)
+    return (
+        indexed_task
+        for file_tasks in files_tasks
+        for indexed_task in task_files.add([file_tasks])
+    )
+
+
+def _extract_indexed_task(
+    indexed_task: tuple[int, ExtractionTask],
+    cache: TableCache | None,
+    timed: bool,
+) -> tuple[int, PackedTaskExtraction]:
+    """Run the given task, keeping track of its index, for results that arrive in any order.
+
+    Packs the task's tables, so results from pool workers are cheap to send.
+    """
+    task_i, task = indexed_task
+    return task_i, pack_task_extraction(extract_task(task, cache, timed))
+
+
+def _with_spans(
+    indexed_task_extractions: Iterable[tuple[int, PackedTaskExtraction]],
+    spans: list[timings.Span],
+) -> Iterator[tuple[int, PackedTaskExtraction]]:
+    """Collect the timings of tasks, run in any process, as their results arrive."""
+    for task_i, task_extraction in indexed_task_extractions:
+        spans.extend(task_extraction.spans)
+        yield task_i, task_extraction
+
+
+def _collect_files(
+    task_files: _TaskFiles,
+    indexed_task_extractions: Iterable[tuple[int, PackedTaskExtraction]],
+) -> Iterator[tuple[int, list[FileExtraction]]]:
+    """Group tasks' results, arriving in any order, by file.
+
+    Yields each file's index and its transaction tables, as soon as all the
+    file's tasks are done. Files without any tasks are done as soon as they're
+    planned. Tasks' tables stay packed until their file is done.
+    """
+    yield from _collect_empty_files(task_files)
+
+    done_tasks: dict[int, dict[int, PackedTaskExtraction]] = collections.defaultdict(
+        dict
+    )
+    for task_i, task_extraction in indexed_task_extractions:
+        yield from _collect_empty_files(task_files)
+
+        file_i, fil, num_file_tasks = task_files.task_files[task_i]
+        file_done_tasks = done_tasks[file_i]
+        file_done_tasks[task_i] = task_extraction
+
+        if len(file_done_tasks) == num_file_tasks:
+            del done_tasks[file_i]
+            yield (
+                file_i,
+                extract_file(
+                    fil,
+                    [
+                        unpack_task_extraction(file_done_tasks[i])
+                        for i in sorted(file_done_tasks)
+                    ],
+                ),
+            )
+
+    yield from _collect_empty_files(task_files)
+
+
+def _collect_empty_files(
+    task_files: _TaskFiles,
+) -> Iterator[tuple[int, list[FileExtraction]]]:
+    while task_files.empty_files:
+        file_i, fil = task_files.empty_files.popleft()
+        yield file_i, extract_file(fil, [])
+
+
+def _recorded(
+    manifest: Manifest,
+    files: Sequence[Path],
+    options: ExtractionOptions,
+    completed_files: Iterable[tuple[int, list[FileExtraction]]],
+) -> Iterator[tuple[int, list[FileExtraction]]]:
+    """Record files' transaction tables in the given manifest, as they complete.
+
+    Files without any tables are recorded too, so they aren't parsed again.
+    """
+    for file_i, file_extractions in completed_files:
+        manifest.record(
+            files[file_i], options, [fe.extraction for fe in file_extractions]
+        )
+        yield file_i, file_extractions
+
+
+def _in_sorted_order(
+    files: Sequence[Path],
+    completed_files: Iterable[tuple[int, list[FileExtraction]]],
+) -> Iterator[FileExtraction]:
+    """Reorder files' transaction tables, arriving in any order, into sorted order.
+
+    Yields each table as soon as no table sorted before it can still arrive.
+    Unfinished files can't have tables sorted before their earliest possible
+    transaction date. Ties are broken by argument order, same as a stable sort
+    of all files' tables.
+    """
+    pending_files = [
+        ((earliest_transaction_date(fil), fil.resolve()), file_i)
+        for file_i, fil in enumerate(files)
+    ]
+    heapq.heapify(pending_files)
+    done_files = set()
+
+    ready: list[tuple[tuple[datetime.date, Path], int, int, FileExtraction]] = []
+    for file_i, file_extractions in completed_files:
+        done_files.add(file_i)
+        for table_i, file_extraction in enumerate(file_extractions):
+            heapq.heappush(
+                ready, (file_extraction.sort_key, file_i, table_i, file_extraction)
+            )
+
+        while pending_files and pending_files[0][1] in done_files:
+            heapq.heappop(pending_files)
+
+        while ready and (not pending_files or ready[0][:2] < pending_files[0]):
+            yield heapq.heappop(ready)[-1]
+
+
+# A sorted table's remaining rows, keyed by its next row
+_Run = tuple[
+    tuple[datetime.date, Path], int, int, int, list[datetime.date], FileExtraction
+]
+
+
+def _in_date_order(
+    files: Sequence[Path],
+    completed_files: Iterable[tuple[int, list[FileExtraction]]],
+) -> Iterator[FileExtraction]:
+    """Merge files' transaction tables, arriving in any order, into date order.
+
+    A k-way merge of the tables, each of which is sorted by date first, if it
+    isn't already. Like `_in_sorted_order`, yields transactions as soon as no
+    unfinished file can have a transaction sorted before them. Yields runs of
+    consecutive transactions from the same table, as tables. Same day
+    transactions are ordered by file path, then argument order, then table
+    order.
+    """
+    pending_files = [
+        ((earliest_transaction_date(fil), _resolve(fil)), file_i)
+        for file_i, fil in enumerate(files)
+    ]
+    heapq.heapify(pending_files)
+    done_files = set()
+
+    runs: list[_Run] = []
+    for file_i, file_extractions in completed_files:
+        done_files.add(file_i)
+        for table_i, file_extraction in enumerate(file_extractions):
+            extraction = file_extraction.extraction.sorted_by_date()
+            if extraction.df.empty:
+                continue
+            dates = extraction.df["Date"].tolist()
+            heapq.heappush(
+                runs,
+                (
+                    (dates[0], file_extraction.sort_key[1]),
+                    file_i,
+                    table_i,
+                    0,
+                    dates,
+                    FileExtraction(file_extraction.fil, extraction),
+                ),
+            )
+
+        while pending_files and pending_files[0][1] in done_files:
+            heapq.heappop(pending_files)
+
+        yield from _merge_runs(runs, pending_files[0] if pending_files else None)
+
+
+def _merge_runs(
+    runs: list[_Run], bound: tuple[tuple[datetime.date, Path], int] | None
+) -> Iterator[FileExtraction]:
+    """Pop transactions from the heap of runs, in order, until reaching the bound, if any."""
+    while runs and (bound is None or runs[0][:2] < bound):
+        (_, resolved_fil), file_i, table_i, row_i, dates, file_extraction = (
+            heapq.heappop(runs)
+        )
+
+        # Take as many consecutive transactions from this run as come before
+        # any other run's next transaction, and before the bound
+        row_end = row_i + 1
+        while row_end < len(dates):
+            next_key = ((dates[row_end], resolved_fil), file_i, table_i)
+            if (runs and not next_key < runs[0][:3]) or (
+                bound is not None and not next_key[:2] < bound
+            ):
+                break
+            row_end += 1
+
+        df = file_extraction.extraction.df
+        yield FileExtraction(file_extraction.fil, Extraction(df.iloc[row_i:row_end]))
+        if row_end < len(dates):
+            heapq.heappush(
+                runs,
+                (
+                    (dates[row_end], resolved_fil),
+                    file_i,
+                    table_i,
+                    row_end,
+                    dates,
+                    file_extraction,
+                ),
+            )
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,142 @@
+"""Persistent cache of the raw tables camelot parses from PDFs."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import tempfile
+from typing import TYPE_CHECKING
+
+from taxes.paths import cache_path
+
+if TYPE_CHECKING:
+    import pandas
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_READ_CHUNK_SIZE = 1024 * 1024
+_SUFFIX = ".pickle"
+
+
+class TableCache:
+    """Content-addressed store of raw camelot tables, capped in size.
+
+    Entries are keyed by a hash of the PDF's content, the camelot flavor and
+    pages parsed, and the camelot and pandas versions, so renaming or moving a
+    statement still hits the cache, while upgrading the parser misses it. Once
+    the cache grows past its size cap, the least recently used entries are
+    evicted.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        """Initialize."""
+        self.directory = directory or cache_path("statements2csv", "tables")
+        self.max_bytes = max_bytes
+
+    def key(self, fil: pathlib.Path, flavor: str, pages: str) -> str:
+        """Compute the cache key for parsing the given pages of the given PDF."""
+        digest = hashlib.sha256(hash_file(fil).encode())
+        for part in (flavor, pages, *_parser_versions()):
+            digest.update(b"\0")
+            digest.update(part.encode())
+
+        return digest.hexdigest()
+
+    def get(self, key: str) -> list[pandas.DataFrame] | None:
+        """Return the cached tables for the given key, if any."""
+        entry = self._entry_path(key)
+        try:
+            with open(entry, "rb") as stream:
+                tables: list[pandas.DataFrame] = pickle.load(stream)
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            # Truncated, or stale, pickles fail in many ways, like a missing
+            # attribute of a renamed class
+            logging.warning('Ignoring corrupt cache entry "%s": %s', entry, err)
+            entry.unlink(missing_ok=True)
+            return None
+
+        # Mark the entry recently used
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+
+        return tables
+
+    def put(self, key: str, tables: list[pandas.DataFrame]) -> None:
+        """Store the given tables under the given key, evicting old entries if needed."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first, so concurrent readers, like other
+        # pool workers, never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as stream:
+                pickle.dump(tables, stream, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._entry_path(key))
+        except BaseException:
+            pathlib.Path(tmp).unlink(missing_ok=True)
+            raise
+
+        self._evict()
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits its size cap."""
+        entries = []
+        for entry in self.directory.glob(f"*{_SUFFIX}"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total_bytes -= size
+
+
+def hash_file(fil: pathlib.Path) -> str:
+    """Hash the given file's content.
+
+    Memoized by the file's size and modification time, since every task
+    parsing the same PDF looks up the cache by its hash.
+    """
+    stat = fil.stat()
+    return _hash_file(fil.resolve(), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=1024)
+def _hash_file(fil: pathlib.Path, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(fil, "rb") as stream:
+        while chunk := stream.read(_READ_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@functools.cache
+def _parser_versions() -> tuple[str, str]:
+    """Return the installed camelot and pandas versions, without importing either."""
+    # Deferred until the cache is used, since it's slow to import, on every
+    # command's startup
+    import importlib.metadata
+
+    camelot_version = importlib.metadata.version("camelot-py")
+    pandas_version = importlib.metadata.version("pandas")
+    return camelot_version, pandas_version
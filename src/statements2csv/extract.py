@@ -1,21 +1,59 @@
 """Functions for parsing a PDF bank statement."""
 
+from __future__ import annotations
+
+import collections
+import contextlib
+import datetime
 import logging
 import pathlib
 import re
-from collections.abc import Iterator
-from typing import Literal
+from collections.abc import Iterator, Sequence
+from typing import TYPE_CHECKING, NamedTuple
+
+from . import timings
+from .cache import TableCache
+from .extractors import (
+    ALL_EXTRACTORS,
+    ALL_EXTRACTORS_ROUTER,
+    Extraction,
+    ExtractionValidationError,
+    Extractor,
+    Flavor,
+)
+from .pages import count_pages, page_ranges, prescan_pages
+
+if TYPE_CHECKING:
+    import pandas
 
-import camelot
-from camelot.core import Table
+YEAR_RE = re.compile(r"^\d{4}$")
 
-from .extractors import ALL_EXTRACTORS, Extraction, ExtractionValidationError, Extractor
+DEFAULT_PAGES_PER_CHUNK = 4
 
-YEAR_RE = re.compile(r"^\d{4}$")
+
+class ExtractionTask(NamedTuple):
+    """1 unit of work: a range of pages of 1 PDF, parsed with 1 flavor of PDF reader."""
+
+    fil: pathlib.Path
+    flavor: Flavor
+    pages: str
+
+
+class TaskExtraction(NamedTuple):
+    """Transaction tables extracted by 1 task, in page order."""
+
+    task: ExtractionTask
+    extractions: list[Extraction]
+    validation_errors: list[ExtractionValidationError]
+    spans: Sequence[timings.Span] = ()
 
 
 def extract_dataframes(
-    fil: pathlib.Path, flavor: Literal["network", "stream"] | None
+    fil: pathlib.Path,
+    flavor: Flavor | None,
+    cache: TableCache | None = None,
+    pages_per_chunk: int | None = None,
+    prescan: bool = False,
 ) -> Iterator[Extraction]:
     """Parse the given PDF's tables for bank transactions, yielding one table at a time.
 
@@ -25,47 +63,156 @@ def extract_dataframes(
     validation, an `ExtractionValidationError` is reraised; the PDF's schema is
     unexpected. Tries whatever flavors are known to work best with the given
     bank statement, yielding from the flavor with the most transactions, if no
-    flavor is given.
+    flavor is given. Reads and writes raw tables through the given cache, if
+    any.
+
+    If given a number of pages per chunk, parses the PDF that many pages at a
+    time, so only 1 chunk's raw tables are in memory at once. If prescanning,
+    parses only pages that could hold transaction tables. See
+    `plan_extraction`.
+
+    Tasks run one after another. To run them concurrently, map `extract_task`
+    over `plan_extraction` and pass the results to `select_extractions`.
     """
-    year = _parse_year_from_absolute_filepath(fil.resolve())
+    tasks = plan_extraction(fil, flavor, pages_per_chunk, prescan)
+    yield from select_extractions(fil, [extract_task(task, cache) for task in tasks])
 
-    validation_errors: list[ExtractionValidationError] = []
 
-    flavors = {
-        flavor_choice: _extract_tables_for_flavor(
-            fil, year, flavor_choice, validation_errors
-        )
-        for flavor_choice in _flavors_to_try(fil, flavor)
-    }
+def plan_extraction(
+    fil: pathlib.Path,
+    flavor: Flavor | None,
+    pages_per_chunk: int | None = None,
+    prescan: bool = False,
+) -> list[ExtractionTask]:
+    """Split parsing the given PDF into independent tasks, by flavor, then page order.
+
+    Without a number of pages per chunk, each flavor parses all pages at once.
+
+    If prescanning, first reads the PDF's text layer, to parse only pages that
+    could hold transaction tables, with only the flavors their banks need. A
+    PDF without such pages needs no tasks at all.
+    """
+    flavor_choices = flavors_to_try(fil, flavor)
+
+    if prescan and (page_prescan := prescan_pages(fil, ALL_EXTRACTORS)):
+        if not page_prescan.pages:
+            logging.info('File "%s" has no pages with transaction tables', fil)
+            return []
+        if flavor is None:
+            flavor_choices = page_prescan.flavors
+        chunks = page_ranges(page_prescan.pages, pages_per_chunk)
+    elif pages_per_chunk is None:
+        chunks = ["all"]
+    else:
+        chunks = page_ranges(range(1, count_pages(fil) + 1), pages_per_chunk)
+
+    return [
+        ExtractionTask(fil, flavor_choice, pages)
+        for flavor_choice in flavor_choices
+        for pages in chunks
+    ]
+
+
+def extract_task(
+    task: ExtractionTask,
+    cache: TableCache | None = None,
+    timed: bool = False,
+) -> TaskExtraction:
+    """Parse the given task's tables for bank transactions.
+
+    Independent of other tasks, so flavors and pages of the same PDF can be
+    parsed in parallel. If timed, the result includes the timings of each of
+    the task's stages, wherever the task ran.
+    """
+    year = _parse_year_from_absolute_filepath(task.fil.resolve())
+
+    spans: list[timings.Span] = []
+    with (
+        timings.recording(task.fil) if timed else contextlib.nullcontext(spans) as spans
+    ):
+        validation_errors: list[ExtractionValidationError] = []
+        extractions = _extract_tables_for_flavor(task, year, validation_errors, cache)
+    return TaskExtraction(task, extractions, validation_errors, spans)
+
+
+def select_extractions(
+    fil: pathlib.Path, task_extractions: Sequence[TaskExtraction]
+) -> list[Extraction]:
+    """Pick the flavor with the most transactions, given all tasks' results for 1 PDF.
+
+    The results must be in the order of `plan_extraction`, so each flavor's
+    chunks are reassembled in page order. Ties go to the earliest flavor, in
+    the order of `flavors_to_try`. Raises if banks matched but every flavor
+    failed validation.
+    """
+    validation_errors = [
+        err
+        for task_extraction in task_extractions
+        for err in task_extraction.validation_errors
+    ]
+
+    flavors: dict[Flavor, list[Extraction]] = {}
+    for task_extraction in task_extractions:
+        extractions = flavors.setdefault(task_extraction.task.flavor, [])
+        _extend_deduplicated(fil, extractions, task_extraction.extractions)
 
     if validation_errors and not any(flavors.values()):
         raise ValueError(
             f"No extractors found valid data in file {fil}"
         ) from validation_errors[0]
 
+    if not flavors:
+        return []
+
     winning_extractions = max(flavors.values(), key=_sum_extracted_transactions)
-    yield from winning_extractions
+    return winning_extractions
+
+
+def earliest_transaction_date(fil: pathlib.Path) -> datetime.date:
+    """Return the earliest date any transaction in the given PDF can have, before parsing it.
+
+    Transaction dates get the year in the PDF's filepath. Only December
+    transactions, in a statement crossing into January, get the year before.
+    """
+    year = _parse_year_from_absolute_filepath(fil.resolve())
+    return datetime.date(year - 1, 12, 1)
+
+
+def flavors_to_try(fil: pathlib.Path, flavor: Flavor | None) -> list[Flavor]:
+    """List the flavors of PDF reader known to work with the given bank statement."""
+    if flavor is not None:
+        return [flavor]
+
+    filepath = str(fil.resolve())
+    if any(part in filepath for part in ("Apple", "Chase")):
+        return ["network", "stream"]
+
+    return ["stream"]
 
 
 def _extract_tables_for_flavor(
-    fil: pathlib.Path,
+    task: ExtractionTask,
     year: int,
-    flavor: Literal["network", "stream"],
     validation_errors: list[ExtractionValidationError],
+    cache: TableCache | None,
 ) -> list[Extraction]:
-    """Process all tables for a given flavor."""
-    tables = camelot.io.read_pdf(str(fil), pages="all", flavor=flavor)
+    """Process all tables for a given flavor and range of pages."""
+    tables = _read_tables(task, cache)
     extractions: list[Extraction] = []
 
     for table in tables:
-        maybe_extraction, errs = _extract_table(fil, year, table)
+        maybe_extraction, errs = _extract_table(task.fil, year, table)
         validation_errors.extend(errs)
 
         if not maybe_extraction:
             continue
 
         extractor, extraction = maybe_extraction
-        if extractions and _is_duplicate_extraction(extractions[-1], extraction):
+        is_duplicate = False
+        if extractions:
+            with timings.span("dedupe"):
+                is_duplicate = _is_duplicate_extraction(extractions[-1], extraction)
+        if is_duplicate:
             logging.info(
                 'Extractor "%s" found duplicate table. Preferring newer table',
                 extractor,
@@ -79,21 +226,83 @@ def _extract_tables_for_flavor(
     return extractions
 
 
+def _extend_deduplicated(
+    fil: pathlib.Path,
+    extractions: list[Extraction],
+    next_extractions: list[Extraction],
+) -> None:
+    """Append the next chunk's extractions, as if both chunks were parsed at once.
+
+    Each chunk is already deduplicated, and deduplicating only ever compares a
+    table to the one right before it. So only the tables on either side of
+    the chunk boundary need to be compared.
+    """
+    if not (extractions and next_extractions):
+        extractions.extend(next_extractions)
+        return
+
+    with timings.span("dedupe", fil):
+        is_duplicate = _is_duplicate_extraction(extractions[-1], next_extractions[0])
+    if is_duplicate:
+        logging.info("Found duplicate table across pages. Preferring newer table")
+        extractions.pop()
+
+    extractions.extend(next_extractions)
+
+
+def _read_tables(
+    task: ExtractionTask,
+    cache: TableCache | None,
+) -> list[pandas.DataFrame]:
+    """Parse the raw tables from the given PDF, or replay them from the cache."""
+    fil, flavor, pages = task
+    if cache is None:
+        return _read_tables_uncached(fil, flavor, pages)
+
+    with timings.span("read_cache", flavor=flavor, pages=pages):
+        key = cache.key(fil, flavor, pages)
+        tables = cache.get(key)
+    if tables is None:
+        tables = _read_tables_uncached(fil, flavor, pages)
+        cache.put(key, tables)
+    else:
+        logging.info(
+            'Using cached "%s" tables for pages "%s" of file "%s"', flavor, pages, fil
+        )
+
+    return tables
+
+
+def _read_tables_uncached(
+    fil: pathlib.Path,
+    flavor: Flavor,
+    pages: str,
+) -> list[pandas.DataFrame]:
+    # Deferred until a PDF actually needs parsing, since camelot and its
+    # dependencies take seconds to import
+    import camelot
+
+    with timings.span("read_pdf", flavor=flavor, pages=pages):
+        tables = camelot.io.read_pdf(str(fil), pages=pages, flavor=flavor)
+    return [table.df for table in tables]
+
+
 def _extract_table(
     fil: pathlib.Path,
     year: int,
-    table: Table,
+    table: pandas.DataFrame,
 ) -> tuple[tuple[Extractor, Extraction] | None, list[ExtractionValidationError]]:
-    """Try all extractors on the given table, returning the first successful one and its result, if any.
+    """Try all extractors that could match the given table, returning the first successful one and its result, if any.
 
     Also returns all accumulated errors.
     """
     matching = []
     errors = []
-    for extractor in ALL_EXTRACTORS:
+    for extractor in ALL_EXTRACTORS_ROUTER.candidates(table):
         next_extraction = None
         try:
-            next_extraction = extractor(year, table.df)
+            with timings.span("extract_table", extractor=type(extractor).__name__):
+                next_extraction = extractor(year, table)
         except ExtractionValidationError as eve:
             logging.info('Extractor "%s" failed validation: %s', extractor, eve)
             errors.append(eve)
@@ -111,26 +320,29 @@ def _extract_table(
     return matching[0] if matching else None, errors
 
 
-def _flavors_to_try(
-    fil: pathlib.Path, flavor: Literal["network", "stream"] | None
-) -> dict[Literal["network", "stream"], list[Extraction]]:
-    if flavor is not None:
-        return {flavor: []}
+def _is_duplicate_extraction(prev: Extraction, _next: Extraction) -> bool:
+    """Check if the previous extraction is an exact duplicate or strict subset of the new one.
 
-    filepath = str(fil.resolve())
-    if any(part in filepath for part in ("Apple", "Chase")):
-        return {"network": [], "stream": []}
+    The previous extraction is a subset if each of its rows appears exactly
+    once in the new one, which is what inner merging the two, then comparing
+    to the previous extraction, tests. Rows are compared by hash, in linear
+    time, without building the merged table.
+    """
+    if prev.df.equals(_next.df):
+        return True
 
-    return {"stream": []}
+    if not prev.df.columns.equals(_next.df.columns):
+        subset = prev.df.merge(_next.df, how="inner")
+        return subset.equals(prev.df)
 
+    next_row_counts = collections.Counter(_hash_rows(_next.df))
+    return all(next_row_counts[row_hash] == 1 for row_hash in _hash_rows(prev.df))
 
-def _is_duplicate_extraction(prev: Extraction, _next: Extraction) -> bool:
-    """Check if the previous extraction is an exact duplicate or strict subset of the new one."""
-    if prev.df.equals(_next.df):
-        return True
 
-    subset = prev.df.merge(_next.df, how="inner")
-    return subset.equals(prev.df)
+def _hash_rows(df: pandas.DataFrame) -> list[int]:
+    import pandas
+
+    return pandas.util.hash_pandas_object(df, index=False).tolist()
 
 
 def _parse_year_from_absolute_filepath(fil: pathlib.Path) -> int:
@@ -1,13 +1,26 @@
 """Callables to identify and extract transaction data from supported banks' statements."""
 
+from __future__ import annotations
+
+import collections
 import datetime
+import functools
 import re
 from abc import abstractmethod
 from collections.abc import Sequence
-from typing import Any, NamedTuple, Protocol, cast
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple, Protocol, cast
+
+from . import timings
+
+if TYPE_CHECKING:
+    import pandas
 
-import dateutil.parser
-import pandas
+# Bump whenever a change here changes extracted transactions, so incremental
+# builds re-extract every statement
+EXTRACTOR_VERSION = 1
+
+# Flavor of PDF reader
+Flavor = Literal["network", "stream"]
 
 
 class ExtractionValidationError(ValueError):
@@ -24,6 +37,12 @@ class Extraction(NamedTuple):
         """The earliest date in the extracted table."""
         return cast(datetime.date, self.df["Date"].min())
 
+    def sorted_by_date(self) -> Extraction:
+        """Sort the extracted table by date, keeping same day transactions in table order."""
+        if self.df["Date"].is_monotonic_increasing:
+            return self
+        return Extraction(self.df.sort_values("Date", kind="stable", ignore_index=True))
+
 
 class Extractor(Protocol):
     """Callable to identify and extract transaction data from 1 table from 1 particular bank's statement.
@@ -33,8 +52,23 @@ class Extractor(Protocol):
     relation to the n other tables in the same PDF). Parse dates in the table
     to have the provided year, if the statement omits the year. If no data is
     found matching the particular bank, return `None`.
+
+    Optionally, declare words, in lowercase, that a table must contain for
+    `is_match` to be true. Tables missing any of them are never routed to the
+    Extractor. See `ExtractorRouter`.
+
+    Optionally, declare a run of lowercase words, like adjacent column
+    headers, that a page's text must contain, besides the fingerprint words,
+    to be parsed when prescanning. See `prescan_pages`.
+
+    Declare the flavors of PDF reader known to work with the bank's
+    statements, in order of preference.
     """
 
+    fingerprint_words: frozenset[str] = frozenset()
+    page_signature: tuple[str, ...] = ()
+    flavors: tuple[Flavor, ...] = ("stream",)
+
     def __call__(self, year: int, df: pandas.DataFrame) -> Extraction | None:
         """Override."""
         if not self.is_match(df):
@@ -59,7 +93,8 @@ class Extractor(Protocol):
             )
         trimmed_df.rename(columns=column_names, inplace=True)
 
-        trimmed_df["Date"] = _date_column_parse(year, trimmed_df["Date"])
+        with timings.span("parse_dates"):
+            trimmed_df["Date"] = _date_column_parse(year, trimmed_df["Date"])
 
         trimmed_df.drop(
             index=trimmed_df.loc[self.unwanted_rows(trimmed_df)].index,
@@ -100,6 +135,9 @@ class ExtractorAppleCard(Extractor):
     because the statements already include the year.
     """
 
+    fingerprint_words = frozenset(("date", "daily", "cash"))
+    flavors = ("network", "stream")
+
     def is_match(self, df: pandas.DataFrame) -> bool:
         """Override."""
 
@@ -136,6 +174,11 @@ class ExtractorBankOfAmerica(Extractor):
     arrival time. Drop these extra rows.
     """
 
+    fingerprint_words = frozenset(("date",))
+    # The 2 date column headers, side by side, unlike "date" on its own, which
+    # is on most any page
+    page_signature = ("date", "date")
+
     def is_match(self, df: pandas.DataFrame) -> bool:
         """Override."""
 
@@ -164,6 +207,8 @@ class ExtractorCapitalOne(Extractor):
     variable, in the last 2 columns.
     """
 
+    fingerprint_words = frozenset(("date", "amount", "balance"))
+
     def is_match(self, df: pandas.DataFrame) -> bool:
         """Override."""
         try:
@@ -204,9 +249,13 @@ class ExtractorChase(Extractor):
     They have 1 of a few words in the first cell of the table.
     """
 
-    IS_MATCH_RE = re.compile(
-        r"\s+".join(("Merchant", "Name", "or", "Transaction", "Description"))
-    )
+    IS_MATCH_WORDS = ("Merchant", "Name", "or", "Transaction", "Description")
+    IS_MATCH_RE = re.compile(r"\s+".join(IS_MATCH_WORDS))
+
+    # The first and last words may run into neighboring text, so they aren't
+    # necessarily words of their own
+    fingerprint_words = frozenset(word.lower() for word in IS_MATCH_WORDS[1:-1])
+    flavors = ("network", "stream")
 
     def is_match(self, df: pandas.DataFrame) -> bool:
         """Override."""
@@ -227,6 +276,8 @@ class ExtractorWellsFargo(Extractor):
     They have separate columns for additions and subtractions.
     """
 
+    fingerprint_words = frozenset(("additions", "subtractions"))
+
     def is_match(self, df: pandas.DataFrame) -> bool:
         """Override."""
         try:
@@ -255,6 +306,58 @@ ALL_EXTRACTORS: Sequence[Extractor] = (
 )
 
 
+class ExtractorRouter:
+    """Index of extractors by their fingerprint words, to skip extractors that can't match a table.
+
+    A table's fingerprint is the set of lowercase words in its cells, computed
+    in 1 pass over the table. The table is routed only to extractors whose
+    fingerprint words it contains, found by looking up each word in an
+    index, so the cost per table doesn't grow with the number of banks.
+    Extractors without fingerprint words are routed every table.
+    """
+
+    def __init__(self, extractors: Sequence[Extractor]) -> None:
+        """Initialize."""
+        self.extractors = extractors
+        self._unfingerprinted = [
+            i
+            for i, extractor in enumerate(extractors)
+            if not extractor.fingerprint_words
+        ]
+        self._by_word: dict[str, list[int]] = collections.defaultdict(list)
+        for i, extractor in enumerate(extractors):
+            for word in extractor.fingerprint_words:
+                self._by_word[word].append(i)
+
+    def candidates(self, df: pandas.DataFrame) -> list[Extractor]:
+        """List the extractors that could match the given table, in their original order."""
+        words_found: collections.Counter[int] = collections.Counter()
+        for word in table_fingerprint(df) & self._by_word.keys():
+            words_found.update(self._by_word[word])
+
+        candidate_indexes = [
+            i
+            for i, num_words in words_found.items()
+            if num_words == len(self.extractors[i].fingerprint_words)
+        ]
+        return [
+            self.extractors[i]
+            for i in sorted(candidate_indexes + self._unfingerprinted)
+        ]
+
+
+def table_fingerprint(df: pandas.DataFrame) -> set[str]:
+    """Collect the lowercase, whitespace-separated words in all of a table's cells."""
+    words: set[str] = set()
+    for cell in df.to_numpy().ravel():
+        if isinstance(cell, str):
+            words.update(cell.lower().split())
+    return words
+
+
+ALL_EXTRACTORS_ROUTER = ExtractorRouter(ALL_EXTRACTORS)
+
+
 def _date_parse(year: int, text: str) -> datetime.date:
     """Convert a transaction date string to a date object, with the given, explicit year.
 
@@ -262,6 +365,10 @@ def _date_parse(year: int, text: str) -> datetime.date:
     current year if the year is omitted in the string. This application usually
     handles historical dates from years past.
     """
+    # Deferred until a date isn't in a known format, since dateutil is slow to
+    # import, on every command's startup
+    import dateutil.parser
+
     try:
         parsed = dateutil.parser.parse(text)
     except dateutil.parser.ParserError as perr:
@@ -274,24 +381,61 @@ def _date_parse(year: int, text: str) -> datetime.date:
     return parsed.replace(year=year).date()
 
 
+@functools.lru_cache(maxsize=4096)
 def _maybe_date_parse(year: int, text: str) -> datetime.date | None:
     """Convert a transaction date string to an optional date object, with the given, explicit year.
 
     Same as _date_parse, but ignores non-date strings by catching a date parse
-    error, and returning `None`.
+    error, and returning `None`. Tries the date formats banks commonly use
+    before the general, slower date parser. Memoized, because statements
+    repeat the same dates and labels many times.
     """
+    known_format_date = _known_format_date_parse(year, text)
+    if known_format_date is not None:
+        return known_format_date
+
+    import dateutil.parser
+
     try:
         return _date_parse(year, text)
     except dateutil.parser.ParserError:
         return None
 
 
+def _known_format_date_parse(year: int, text: str) -> datetime.date | None:
+    """Convert a transaction date string to a date object, if it's in a format banks commonly use.
+
+    For example, "01/31", "01/31/21", "01/31/2021", or "Jan 31". Results are
+    the same as `_date_parse`. Returns `None` for anything else, including
+    non-dates, and February 29, whose parsing depends on the current year.
+    """
+    if match := _NUMERIC_DATE_RE.match(text):
+        month = int(match["month"])
+    elif match := _NAMED_MONTH_DATE_RE.match(text):
+        month = _MONTH_NUMBERS.get(match["month"].lower(), 0)
+    else:
+        return None
+
+    day = int(match["day"])
+    if (month, day) == (2, 29):
+        return None
+
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
 def _date_column_parse(
     year: int,
     column: pandas.Series,
 ) -> list[datetime.date | None]:
-    """Convert a transaction column to column of dates, with the given, explicit year."""
-    raw_dates = [_maybe_date_parse(year, date) for date in column]
+    """Convert a transaction column to column of dates, with the given, explicit year.
+
+    Parses each distinct string in the column once.
+    """
+    dates_by_text = {text: _maybe_date_parse(year, text) for text in column.unique()}
+    raw_dates = [dates_by_text[text] for text in column]
     is_crossing_year_boundary = {date.month for date in raw_dates if date} == {1, 12}
     if not is_crossing_year_boundary:
         return raw_dates
@@ -302,3 +446,15 @@ def _date_column_parse(
         return date.replace(year=year - 1)
 
     return [fix_date_on_year_boundary(date) for date in raw_dates]
+
+
+_NUMERIC_DATE_RE = re.compile(
+    r"^\s*(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:/(?:\d{2}|\d{4}))?\s*$"
+)
+_NAMED_MONTH_DATE_RE = re.compile(r"^\s*(?P<month>[a-zA-Z]{3})\s+(?P<day>\d{1,2})\s*$")
+_MONTH_NUMBERS = {
+    name: number
+    for number, name in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
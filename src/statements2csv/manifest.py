@@ -0,0 +1,111 @@
+"""Record of bank statements already extracted, for incremental builds."""
+
+import datetime
+import json
+import os
+import pathlib
+import tempfile
+from typing import Any, NamedTuple
+
+from .cache import hash_file
+from .extractors import EXTRACTOR_VERSION, Extraction, Flavor
+
+MANIFEST_VERSION = 2
+
+
+class ExtractionOptions(NamedTuple):
+    """Options that change which tables are extracted from a PDF."""
+
+    flavor: Flavor | None
+    pages_per_chunk: int | None
+    prescan: bool
+
+
+class Manifest:
+    """Each extracted PDF's fingerprint and output rows, saved as JSON.
+
+    A PDF is considered unchanged if its size and modification time match the
+    recorded ones, or failing that, its content hash does. Entries recorded
+    with a different extractor version or extraction options are stale.
+    """
+
+    def __init__(self, path: pathlib.Path, files: dict[str, Any] | None = None):
+        """Initialize."""
+        self.path = path
+        self.files = files or {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "Manifest":
+        """Read the manifest at the given path, or start an empty one if there is none."""
+        try:
+            with open(path, encoding="utf-8") as fil:
+                data = json.load(fil)
+        except FileNotFoundError:
+            return cls(path)
+
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data["files"])
+
+    def lookup(
+        self, fil: pathlib.Path, options: ExtractionOptions
+    ) -> list[Extraction] | None:
+        """Return the given PDF's previously extracted tables, if it is unchanged."""
+        entry = self.files.get(str(fil.resolve()))
+        if (
+            entry is None
+            or entry["extractor_version"] != EXTRACTOR_VERSION
+            or ExtractionOptions(**entry["options"]) != options
+        ):
+            return None
+
+        stat = fil.stat()
+        if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+            if hash_file(fil) != entry["sha256"]:
+                return None
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+
+        return [_table_to_extraction(table) for table in entry["tables"]]
+
+    def record(
+        self,
+        fil: pathlib.Path,
+        options: ExtractionOptions,
+        extractions: list[Extraction],
+    ) -> None:
+        """Remember the given PDF's freshly extracted tables."""
+        stat = fil.stat()
+        self.files[str(fil.resolve())] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": hash_file(fil),
+            "extractor_version": EXTRACTOR_VERSION,
+            "options": options._asdict(),
+            "tables": [_extraction_to_table(extraction) for extraction in extractions],
+        }
+
+    def save(self) -> None:
+        """Write the manifest, replacing the previous one all at once."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fil:
+                json.dump({"version": MANIFEST_VERSION, "files": self.files}, fil)
+            os.replace(tmp, self.path)
+        except BaseException:
+            pathlib.Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+def _extraction_to_table(extraction: Extraction) -> dict[str, Any]:
+    df = extraction.df.assign(Date=[date.isoformat() for date in extraction.df["Date"]])
+    return {"columns": list(df.columns), "rows": df.to_numpy(dtype=object).tolist()}
+
+
+def _table_to_extraction(table: dict[str, Any]) -> Extraction:
+    import pandas
+
+    df = pandas.DataFrame(table["rows"], columns=table["columns"], dtype=object)
+    df["Date"] = [datetime.date.fromisoformat(date) for date in df["Date"]]
+    return Extraction(df)
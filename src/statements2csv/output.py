@@ -0,0 +1,162 @@
+"""Writers of transaction tables, to a stream, in each supported format."""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+import importlib
+import json
+from collections.abc import Generator
+from decimal import Decimal, InvalidOperation
+from typing import IO, TYPE_CHECKING, Any, Literal, Protocol
+
+from taxes.amounts import parse_amount
+
+if TYPE_CHECKING:
+    import pandas
+
+Format = Literal["csv", "jsonl", "parquet", "arrow"]
+
+# Columns of the typed formats, which every extractor outputs
+COLUMNS = ("Date", "Description", "Amount")
+
+# Rows buffered before writing a batch, in the binary formats
+BATCH_ROWS = 65536
+
+_CENT = Decimal("0.01")
+
+
+class Writer(Protocol):
+    """Writes transaction tables, one after another, as 1 output."""
+
+    def write(self, df: pandas.DataFrame) -> None:
+        """Write 1 table's transactions."""
+
+    def close(self) -> None:
+        """Finish the output, after all tables are written."""
+
+
+@contextlib.contextmanager
+def open_writer(fmt: Format, out: IO[bytes]) -> Generator[Writer]:
+    """Write transaction tables to the given binary stream, in the given format.
+
+    Raises `ImportError` right away if the format needs pyarrow, and it isn't
+    installed.
+    """
+    writer: Writer
+    if fmt == "csv":
+        writer = _CsvWriter(out)
+    elif fmt == "jsonl":
+        writer = _JsonlWriter(out)
+    else:
+        writer = _ArrowWriter(fmt, out)
+
+    yield writer
+    writer.close()
+
+
+class _CsvWriter:
+    """CSV, with 1 header, and amounts as they were printed in the statement."""
+
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+        self.is_first = True
+
+    def write(self, df: pandas.DataFrame) -> None:
+        self.out.write(df.to_csv(header=self.is_first, index=False).encode())
+        self.out.flush()
+        self.is_first = False
+
+    def close(self) -> None:
+        if not self.is_first:
+            self.out.write(b"\n")
+        self.out.flush()
+
+
+class _JsonlWriter:
+    """1 JSON object per transaction, with each amount as a number with 2 decimal places.
+
+    Amounts that don't parse, like "(5.00)", are null.
+    """
+
+    def __init__(self, out: IO[bytes]):
+        self.out = out
+
+    def write(self, df: pandas.DataFrame) -> None:
+        lines = [
+            f'{{"Date": "{date.isoformat()}", '
+            f'"Description": {json.dumps(description)}, '
+            f'"Amount": {_json_amount(amount)}}}\n'
+            for date, description, amount in zip(
+                *(df[column].tolist() for column in COLUMNS), strict=True
+            )
+        ]
+        self.out.write("".join(lines).encode())
+        self.out.flush()
+
+    def close(self) -> None:
+        self.out.flush()
+
+
+class _ArrowWriter:
+    """Parquet, or Arrow IPC file, columns, written in batches.
+
+    Dates are Arrow dates, and amounts exact decimals, with 2 decimal places,
+    or null if they don't parse.
+    """
+
+    def __init__(self, fmt: Literal["parquet", "arrow"], out: IO[bytes]):
+        # pyarrow is optional, only needed by these formats
+        self.pa: Any = importlib.import_module("pyarrow")
+        self.schema = self.pa.schema(
+            [
+                ("Date", self.pa.date32()),
+                ("Description", self.pa.string()),
+                ("Amount", self.pa.decimal128(18, 2)),
+            ]
+        )
+        if fmt == "parquet":
+            parquet: Any = importlib.import_module("pyarrow.parquet")
+            self.writer = parquet.ParquetWriter(out, self.schema)
+        else:
+            self.writer = self.pa.ipc.new_file(out, self.schema)
+
+        self.dates: list[datetime.date] = []
+        self.descriptions: list[str] = []
+        self.amounts: list[Decimal | None] = []
+
+    def write(self, df: pandas.DataFrame) -> None:
+        self.dates.extend(df["Date"].tolist())
+        self.descriptions.extend(df["Description"].tolist())
+        self.amounts.extend(map(_amount, df["Amount"].tolist()))
+        if len(self.dates) >= BATCH_ROWS:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+
+    def _flush(self) -> None:
+        if not self.dates:
+            return
+        self.writer.write_table(
+            self.pa.table(
+                [self.dates, self.descriptions, self.amounts], schema=self.schema
+            )
+        )
+        self.dates, self.descriptions, self.amounts = [], [], []
+
+
+def _amount(amount: str) -> Decimal | None:
+    """Parse transaction amount text into an exact decimal, in whole cents, if it parses."""
+    try:
+        decimal = parse_amount(amount)
+    except InvalidOperation:
+        return None
+    return decimal.quantize(_CENT) if decimal.is_finite() else None
+
+
+def _json_amount(amount: str) -> str:
+    """Format transaction amount text as a JSON number, or null."""
+    decimal = _amount(amount)
+    return "null" if decimal is None else str(decimal)
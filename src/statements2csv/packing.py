@@ -0,0 +1,139 @@
+"""Compact, columnar transaction tables, for cheap transfer between processes."""
+
+from __future__ import annotations
+
+import array
+import datetime
+import itertools
+from collections.abc import Sequence
+from typing import NamedTuple
+
+from . import timings
+from .extract import ExtractionTask, TaskExtraction
+from .extractors import Extraction, ExtractionValidationError
+
+
+class PackedTables(NamedTuple):
+    """Transaction tables, flattened into a few contiguous buffers.
+
+    Pickling a DataFrame of Python objects pickles every string and date, one
+    at a time. Pickling these buffers is a copy of each. Each table's "Date"
+    column is packed as int32 days, and each of its other, text columns as
+    slices of 1 UTF-8 buffer.
+    """
+
+    # Column names of each table, in order, with "Date" first
+    columns: list[tuple[str, ...]]
+    # array("i") of each table's number of rows
+    num_rows: bytes
+    # array("i") of each row's date, as proleptic Gregorian ordinals
+    dates: bytes
+    # Text cells, table by table, row by row, concatenated
+    text: bytes
+    # array("i") of where each text cell ends, in characters of the decoded text
+    text_ends: bytes
+
+
+class PackedTaskExtraction(NamedTuple):
+    """`TaskExtraction`, with its tables packed."""
+
+    task: ExtractionTask
+    tables: PackedTables
+    validation_errors: list[ExtractionValidationError]
+    spans: Sequence[timings.Span] = ()
+
+
+def pack(extractions: Sequence[Extraction]) -> PackedTables:
+    """Flatten transaction tables into buffers."""
+    columns = []
+    num_rows = array.array("i")
+    dates = array.array("i")
+    cells: list[str] = []
+    for extraction in extractions:
+        df = extraction.df
+        if df.columns[0] != "Date":
+            raise ValueError(
+                f'Expected "Date" first, actual columns {list(df.columns)}'
+            )
+        columns.append(tuple(df.columns))
+        num_rows.append(len(df))
+        dates.extend(date.toordinal() for date in df["Date"])
+        for row in zip(*(df[column] for column in df.columns[1:]), strict=True):
+            cells.extend(row)
+
+    text_ends = array.array("i", itertools.accumulate(map(len, cells)))
+    return PackedTables(
+        columns,
+        num_rows.tobytes(),
+        dates.tobytes(),
+        "".join(cells).encode(),
+        text_ends.tobytes(),
+    )
+
+
+def unpack(tables: PackedTables) -> list[Extraction]:
+    """Rebuild transaction tables from their buffers.
+
+    Consecutive tables with the same columns are built as 1 DataFrame, then
+    split, which is cheaper than building each table's DataFrame on its own.
+    """
+    import pandas
+
+    dates = array.array("i", tables.dates)
+    cells = _split_text(tables.text.decode(), array.array("i", tables.text_ends))
+
+    extractions = []
+    row_i = 0
+    cell_i = 0
+    for columns, group in itertools.groupby(
+        zip(tables.columns, array.array("i", tables.num_rows), strict=True),
+        key=lambda columns_num_rows: columns_num_rows[0],
+    ):
+        group_num_rows = [num_rows for _, num_rows in group]
+        group_rows = sum(group_num_rows)
+        text_columns = columns[1:]
+        group_cells = cells[cell_i : cell_i + group_rows * len(text_columns)]
+
+        data: dict[str, list[datetime.date] | list[str]] = {
+            "Date": [
+                datetime.date.fromordinal(date)
+                for date in dates[row_i : row_i + group_rows]
+            ]
+        }
+        for column_i, column in enumerate(text_columns):
+            data[column] = group_cells[column_i :: len(text_columns)]
+        df = pandas.DataFrame(data)
+
+        table_start = 0
+        for num_rows in group_num_rows:
+            table_df = df.iloc[table_start : table_start + num_rows]
+            extractions.append(Extraction(table_df.reset_index(drop=True)))
+            table_start += num_rows
+
+        row_i += group_rows
+        cell_i += len(group_cells)
+
+    return extractions
+
+
+def _split_text(text: str, text_ends: Sequence[int]) -> list[str]:
+    cells = []
+    start = 0
+    for end in text_ends:
+        cells.append(text[start:end])
+        start = end
+    return cells
+
+
+def pack_task_extraction(task_extraction: TaskExtraction) -> PackedTaskExtraction:
+    """Pack a task's tables, to send its results to another process."""
+    task, extractions, validation_errors, spans = task_extraction
+    return PackedTaskExtraction(task, pack(extractions), validation_errors, spans)
+
+
+def unpack_task_extraction(
+    packed_task_extraction: PackedTaskExtraction,
+) -> TaskExtraction:
+    """Unpack a task's tables, received from another process."""
+    task, tables, validation_errors, spans = packed_task_extraction
+    return TaskExtraction(task, unpack(tables), validation_errors, spans)
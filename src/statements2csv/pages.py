@@ -0,0 +1,116 @@
+"""Functions for splitting a PDF bank statement into ranges of pages."""
+
+import itertools
+import pathlib
+import re
+from collections.abc import Sequence
+from typing import NamedTuple
+
+from .extractors import Extractor, Flavor
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class PagePrescan(NamedTuple):
+    """Which pages of a PDF could hold transaction tables, and how to parse them."""
+
+    pages: list[int]
+    flavors: list[Flavor]
+
+
+def count_pages(fil: pathlib.Path) -> int:
+    """Count the pages in the given PDF, without parsing their content."""
+    import pypdf
+
+    return len(pypdf.PdfReader(fil).pages)
+
+
+def prescan_pages(
+    fil: pathlib.Path, extractors: Sequence[Extractor]
+) -> PagePrescan | None:
+    """Read each page's text layer, to find pages that could hold transaction tables.
+
+    Much cheaper than parsing tables. A page is kept if its text contains all
+    of some extractor's fingerprint words, the words the extractor's tables
+    must contain, and its page signature, if any. Words are compared whole,
+    ignoring case and punctuation. The flavors returned are the ones the
+    banks of the kept pages' extractors need.
+
+    Returns `None` if the PDF has no text layer to go by.
+    """
+    import pypdf
+
+    reader = pypdf.PdfReader(fil)
+    page_words = [
+        _WORD_RE.findall(page.extract_text().lower()) for page in reader.pages
+    ]
+    if not any(page_words):
+        return None
+
+    pages = []
+    flavors: set[Flavor] = set()
+    for page_number, words in enumerate(page_words, start=1):
+        word_set = set(words)
+        page_extractors = [
+            extractor
+            for extractor in extractors
+            if extractor.fingerprint_words <= word_set
+            and _contains_run(words, extractor.page_signature)
+        ]
+        if page_extractors:
+            pages.append(page_number)
+            for extractor in page_extractors:
+                flavors.update(extractor.flavors)
+
+    # Preserve the order flavors are otherwise tried in
+    ordered_flavors: list[Flavor] = [
+        flavor for flavor in ("network", "stream") if flavor in flavors
+    ]
+    return PagePrescan(pages, ordered_flavors)
+
+
+def _contains_run(words: Sequence[str], run: tuple[str, ...]) -> bool:
+    """Whether the given words contain the given run of words, consecutively."""
+    return any(
+        tuple(words[i : i + len(run)]) == run for i in range(len(words) - len(run) + 1)
+    )
+
+
+def page_ranges(pages: Sequence[int], pages_per_chunk: int | None) -> list[str]:
+    """Split a PDF's pages into chunks, as camelot page range strings.
+
+    For example, pages 1 through 5, 2 pages at a time, is `["1-2", "3-4",
+    "5"]`, and pages 1, 2, 3, and 5, all at once, is `["1-3,5"]`. Falls back to
+    all pages, if no pages are known.
+    """
+    if not pages:
+        return ["all"]
+
+    chunk_size = pages_per_chunk or len(pages)
+    return [
+        _format_pages(pages[start : start + chunk_size])
+        for start in range(0, len(pages), chunk_size)
+    ]
+
+
+def count_range_pages(pages: str) -> int | None:
+    """Count the pages in a camelot page range string, or None for all pages."""
+    if pages == "all":
+        return None
+    num_pages = 0
+    for run in pages.split(","):
+        first, _, last = run.partition("-")
+        num_pages += int(last or first) - int(first) + 1
+    return num_pages
+
+
+def _format_pages(pages: Sequence[int]) -> str:
+    """Format page numbers as a camelot page range string, collapsing consecutive runs."""
+    runs = []
+    for _, run in itertools.groupby(
+        enumerate(pages), key=lambda i_page: i_page[1] - i_page[0]
+    ):
+        run_pages = [page for _, page in run]
+        first, last = run_pages[0], run_pages[-1]
+        runs.append(str(first) if first == last else f"{first}-{last}")
+    return ",".join(runs)
@@ -0,0 +1,78 @@
+"""Functions for spreading extraction tasks across worker processes."""
+
+import math
+import os
+import pathlib
+from collections.abc import Sequence
+
+from .extract import ExtractionTask
+from .pages import count_range_pages
+
+_CGROUP_V2_CPU_MAX = pathlib.Path("/sys/fs/cgroup/cpu.max")
+_CGROUP_V1_CPU_DIR = pathlib.Path("/sys/fs/cgroup/cpu")
+
+
+def available_cpus() -> int:
+    """Count the CPUs this process may run on, within its container's CPU quota, if any."""
+    if hasattr(os, "sched_getaffinity"):
+        num_cpus = len(os.sched_getaffinity(0))
+    else:
+        # macOS doesn't support CPU affinity
+        num_cpus = os.cpu_count() or 1
+
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        num_cpus = min(num_cpus, max(1, math.ceil(quota)))
+    return num_cpus
+
+
+def default_jobs() -> int:
+    """Pick how many worker processes to run, leaving half the available CPUs for the rest of the machine."""
+    return max(1, available_cpus() // 2)
+
+
+def _cgroup_cpu_quota() -> float | None:
+    """Read the Linux cgroup CPU quota, in CPUs, or None if unlimited or unknown."""
+    try:
+        quota, period = _CGROUP_V2_CPU_MAX.read_text().split()
+    except (OSError, ValueError):
+        try:
+            quota = (_CGROUP_V1_CPU_DIR / "cpu.cfs_quota_us").read_text().strip()
+            period = (_CGROUP_V1_CPU_DIR / "cpu.cfs_period_us").read_text().strip()
+        except OSError:
+            return None
+
+    if quota in ("max", "-1"):
+        return None
+    try:
+        return int(quota) / int(period)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def longest_first(tasks: Sequence[ExtractionTask]) -> list[int]:
+    """Order tasks' indexes by their estimated work, most first.
+
+    Handing the longest tasks to workers first keeps a large PDF from starting
+    last, while other workers sit idle. Work is estimated by the number of
+    pages parsed, then by file size. A task parsing all of a PDF's pages, with
+    its number of pages unknown, is estimated as more work than any chunk.
+    """
+    file_sizes = {task.fil: _file_size(task.fil) for task in tasks}
+
+    def estimated_work(task_i: int) -> tuple[float, int]:
+        task = tasks[task_i]
+        num_pages = count_range_pages(task.pages)
+        return (
+            math.inf if num_pages is None else num_pages,
+            file_sizes[task.fil],
+        )
+
+    return sorted(range(len(tasks)), key=estimated_work, reverse=True)
+
+
+def _file_size(fil: pathlib.Path) -> int:
+    try:
+        return fil.stat().st_size
+    except OSError:
+        return 0
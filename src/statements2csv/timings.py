@@ -0,0 +1,170 @@
+"""Timings of each stage of extracting bank statements, for finding slow PDFs."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import pathlib
+import resource
+import sys
+import time
+from collections.abc import Generator, Iterable, Iterator
+from typing import Any, NamedTuple
+
+
+class Span(NamedTuple):
+    """1 run of 1 stage, for 1 file, in 1 process."""
+
+    stage: str
+    fil: str
+    args: dict[str, str]
+    pid: int
+    start_ns: int
+    wall_ns: int
+    cpu_ns: int
+    peak_rss_kb: int
+
+
+class StageSummary(NamedTuple):
+    """Totals of all runs of 1 stage."""
+
+    stage: str
+    num_spans: int
+    wall_ns: int
+    cpu_ns: int
+    max_wall_ns: int
+    slowest_fil: str
+    peak_rss_kb: int
+
+
+class _Recording(NamedTuple):
+    fil: str
+    spans: list[Span]
+
+
+# Where spans are recorded, if anywhere. Off by default, so untimed runs only
+# pay for a lookup per stage.
+_recording: _Recording | None = None
+
+
+@contextlib.contextmanager
+def recording(fil: pathlib.Path | str = "") -> Generator[list[Span]]:
+    """Record the spans of stages run inside this context, by default for the given file.
+
+    Yields the list that spans are appended to. Nested recordings each get
+    only their own spans.
+    """
+    global _recording
+    outer = _recording
+    _recording = _Recording(str(fil), [])
+    try:
+        yield _recording.spans
+    finally:
+        _recording = outer
+
+
+@contextlib.contextmanager
+def span(
+    stage: str, fil: pathlib.Path | str | None = None, **args: str
+) -> Generator[None]:
+    """Time the stage run inside this context, if recording."""
+    current = _recording
+    if current is None:
+        yield
+        return
+
+    start_ns = time.perf_counter_ns()
+    start_cpu_ns = time.process_time_ns()
+    try:
+        yield
+    finally:
+        current.spans.append(
+            Span(
+                stage,
+                current.fil if fil is None else str(fil),
+                args,
+                os.getpid(),
+                start_ns,
+                time.perf_counter_ns() - start_ns,
+                time.process_time_ns() - start_cpu_ns,
+                _peak_rss_kb(),
+            )
+        )
+
+
+def _peak_rss_kb() -> int:
+    """Return this process's peak resident memory so far, in KB."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other Unixes KB
+    return peak_rss // 1024 if sys.platform == "darwin" else peak_rss
+
+
+def write_trace(path: pathlib.Path, spans: Iterable[Span]) -> None:
+    """Write spans as a Chrome trace, viewable in Perfetto or chrome://tracing."""
+    events = [
+        {
+            "name": span.stage,
+            "cat": "statements2csv",
+            "ph": "X",
+            "ts": span.start_ns / 1000,
+            "dur": span.wall_ns / 1000,
+            "pid": span.pid,
+            "tid": span.pid,
+            "args": {
+                "file": span.fil,
+                "cpu_ms": span.cpu_ns / 1e6,
+                "peak_rss_kb": span.peak_rss_kb,
+                **span.args,
+            },
+        }
+        for span in spans
+    ]
+    trace: dict[str, Any] = {"traceEvents": events, "displayTimeUnit": "ms"}
+    path.write_text(json.dumps(trace, indent=1) + "\n", encoding="utf-8")
+
+
+def summarize(spans: Iterable[Span]) -> list[StageSummary]:
+    """Total each stage's spans, slowest stage first."""
+    summaries: dict[str, StageSummary] = {}
+    for span in spans:
+        summary = summaries.get(span.stage)
+        if summary is None:
+            summaries[span.stage] = StageSummary(
+                span.stage,
+                1,
+                span.wall_ns,
+                span.cpu_ns,
+                span.wall_ns,
+                span.fil,
+                span.peak_rss_kb,
+            )
+            continue
+
+        is_slowest = span.wall_ns > summary.max_wall_ns
+        summaries[span.stage] = StageSummary(
+            span.stage,
+            summary.num_spans + 1,
+            summary.wall_ns + span.wall_ns,
+            summary.cpu_ns + span.cpu_ns,
+            span.wall_ns if is_slowest else summary.max_wall_ns,
+            span.fil if is_slowest else summary.slowest_fil,
+            max(summary.peak_rss_kb, span.peak_rss_kb),
+        )
+
+    return sorted(summaries.values(), key=lambda summary: -summary.wall_ns)
+
+
+def format_summary(summaries: Iterable[StageSummary]) -> Iterator[str]:
+    """Format stage summaries as a table, 1 line at a time."""
+    yield (
+        f"{'stage':<14} {'runs':>6} {'wall s':>9} {'cpu s':>9} "
+        f"{'max s':>8} {'peak MB':>8}  slowest file"
+    )
+    for summary in summaries:
+        yield (
+            f"{summary.stage:<14} {summary.num_spans:>6} "
+            f"{summary.wall_ns / 1e9:>9.3f} {summary.cpu_ns / 1e9:>9.3f} "
+            f"{summary.max_wall_ns / 1e9:>8.3f} {summary.peak_rss_kb / 1024:>8.1f}  "
+            f"{summary.slowest_fil}"
+        )
@@ -0,0 +1,20 @@
+"""Functions for transaction amounts."""
+
+from decimal import Decimal
+
+_AMOUNT_PRESENTATION_CHARS = str.maketrans("", "", "$,+ ")
+
+
+def parse_amount(amount: str) -> Decimal:
+    """Parse transaction amount text into a sortable decimal value."""
+    return Decimal(amount.translate(_AMOUNT_PRESENTATION_CHARS))
+
+
+def amount_cents(amount: str) -> int:
+    """Parse transaction amount text into whole cents."""
+    return int(parse_amount(amount).scaleb(2).to_integral_value())
+
+
+def format_cents(cents: int) -> str:
+    """Format whole cents as plain amount text, like -1814.83."""
+    return str(Decimal(cents).scaleb(-2))
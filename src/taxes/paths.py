@@ -4,6 +4,7 @@ import os
 from pathlib import Path
 
 DECRYPTED_ROOT_ENV_VAR = "TAXES_DECRYPTED_ROOT"
+CACHE_ROOT_ENV_VAR = "TAXES_CACHE_DIR"
 
 
 def repository_root() -> Path:
@@ -22,3 +23,24 @@ def decrypted_root() -> Path:
 def decrypted_path(*parts: str | Path) -> Path:
     """Build a path under the checkout with readable git-crypt files."""
     return decrypted_root().joinpath(*parts)
+
+
+def cache_root() -> Path:
+    """Return the directory for local, regenerable caches.
+
+    Caches hold derived data, like parsed bank statements, so they live outside
+    the checkout, where they can't be committed unencrypted.
+    """
+    configured_root = os.environ.get(CACHE_ROOT_ENV_VAR)
+    if configured_root:
+        return Path(configured_root).expanduser()
+
+    xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+    if xdg_cache_home:
+        return Path(xdg_cache_home).expanduser() / "taxes"
+    return Path.home() / ".cache" / "taxes"
+
+
+def cache_path(*parts: str | Path) -> Path:
+    """Build a path under the local cache directory."""
+    return cache_root().joinpath(*parts)
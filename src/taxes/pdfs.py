@@ -0,0 +1,58 @@
+"""Minimal PDFs, to test and benchmark statement parsing with."""
+
+from pathlib import Path
+
+import pypdf
+from pypdf.generic import DictionaryObject, NameObject, StreamObject
+
+
+def blank_pdf(path: Path, num_pages: int) -> Path:
+    """Write a PDF of the given number of blank pages."""
+    return text_pdf(path, [""] * num_pages)
+
+
+def text_pdf(path: Path, page_texts: list[str]) -> Path:
+    """Write a PDF with a page per given line of text. Empty lines are blank pages."""
+    return content_pdf(
+        path,
+        [
+            f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET" if text else ""
+            for text in page_texts
+        ],
+    )
+
+
+def content_pdf(path: Path, page_contents: list[str]) -> Path:
+    """Write a PDF with a page per given content stream, drawing text in font F1.
+
+    Empty content streams are blank pages.
+    """
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for page_content in page_contents:
+        page = writer.add_blank_page(width=612, height=792)
+        if not page_content:
+            continue
+
+        content = StreamObject()
+        content.set_data(page_content.encode())
+        page[NameObject("/Resources")] = DictionaryObject(
+            {
+                NameObject("/Font"): DictionaryObject(
+                    {NameObject("/F1"): font},
+                ),
+            }
+        )
+        page[NameObject("/Contents")] = writer._add_object(content)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer.write(path)
+    return path
@@ -0,0 +1,15 @@
+"""Fixtures shared by the greptransactions tests."""
+
+from pathlib import Path
+
+import pytest
+
+from greptransactions.store import TransactionStore
+
+
+@pytest.fixture
+def store(request: pytest.FixtureRequest, tmp_path: Path) -> TransactionStore:
+    """Return a store of the test module's small `SNAPSHOT`."""
+    snapshot = tmp_path / "snapshot.ambr"
+    snapshot.write_text(request.module.SNAPSHOT, encoding="utf-8")
+    return TransactionStore.open(snapshot, tmp_path / "store")
@@ -0,0 +1,60 @@
+"""Tests for greptransactions totals."""
+
+import pytest
+
+from greptransactions.aggregate import Total, format_totals, totals
+from greptransactions.store import TransactionStore
+
+SNAPSHOT = """\
+  2021-12-30,Tea,2.00
+  2022-01-02,Coffee,3.00
+  2022-01-03,Tea,"1,000.00"
+  2022-02-04,Tea,- $2.50
+"""
+
+
+@pytest.mark.parametrize(
+    ("group_by", "expected"),
+    [
+        (None, [Total(None, 4, 100250)]),
+        ("year", [Total("2021", 1, 200), Total("2022", 3, 100050)]),
+        (
+            "month",
+            [
+                Total("2021-12", 1, 200),
+                Total("2022-01", 2, 100300),
+                Total("2022-02", 1, -250),
+            ],
+        ),
+        ("description", [Total("Coffee", 1, 300), Total("Tea", 3, 99950)]),
+    ],
+)
+def test_totals(
+    store: TransactionStore, group_by: str | None, expected: list[Total]
+) -> None:
+    """Totals should count and sum exact cents, per group, in group order."""
+    assert totals(store, range(len(store)), group_by) == expected
+
+
+def test_totals_without_rows(store: TransactionStore) -> None:
+    """An overall total of nothing is zero, and there are no groups of nothing."""
+    assert totals(store, []) == [Total(None, 0, 0)]
+    assert totals(store, [], "month") == []
+
+
+@pytest.mark.parametrize(
+    ("count", "amount_sum", "expected"),
+    [
+        (True, True, ["2022-01\t2\t1003.00", '"Tea\ticed"\t1\t-2.50']),
+        (True, False, ["2022-01\t2", '"Tea\ticed"\t1']),
+        (False, True, ["2022-01\t1003.00", '"Tea\ticed"\t-2.50']),
+    ],
+)
+def test_format_totals(count: bool, amount_sum: bool, expected: list[str]) -> None:
+    """Totals should be formatted like csv_to_tsv rows, with only the requested columns."""
+    group_totals = [Total("2022-01", 2, 100300), Total("Tea\ticed", 1, -250)]
+
+    assert (
+        list(format_totals(group_totals, count=count, amount_sum=amount_sum))
+        == expected
+    )
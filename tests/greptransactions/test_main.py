@@ -1,28 +1,48 @@
 """Tests for greptransactions helpers."""
 
-from decimal import Decimal
+import datetime
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
 
+import freezegun
 import pytest
+from click.testing import CliRunner
 
-from greptransactions.__main__ import csv_to_tsv, parse_amount
+from greptransactions.__main__ import (
+    GIT_CRYPT_HEADER,
+    DateRange,
+    csv_to_tsv,
+    date_ranges,
+    is_encrypted,
+    main,
+)
+from taxes.paths import CACHE_ROOT_ENV_VAR, DECRYPTED_ROOT_ENV_VAR
 
+SNAPSHOT = """\
+# name: test_statements2csv_all_files
+  '''
+  Date,Description,Amount
+  2021-12-30,Amazon.com,3.00
+  2022-01-02,"Books, used","- $1,212.00"
+  2022-01-03,AMAZON MKTP,+ $3.50
+  2022-02-03,Amazon.com,20.00
 
-@pytest.mark.parametrize(
-    ("amount", "expected"),
-    [
-        ("35.99", Decimal("35.99")),
-        ("$35.99", Decimal("35.99")),
-        ("+ $7,500.00", Decimal("7500.00")),
-        ("- $72.23", Decimal("-72.23")),
-        ("-1,814.83", Decimal("-1814.83")),
-    ],
-)
-def test_parse_amount_normalizes_supported_formats(
-    amount: str,
-    expected: Decimal,
-) -> None:
-    """Amount parsing should preserve signs while ignoring presentation marks."""
-    assert parse_amount(amount) == expected
+  '''
+# ---
+"""
+
+
+@pytest.fixture
+def snapshot_root(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Write a decrypted transaction snapshot, and cache its store, under a temporary directory."""
+    snapshot = tmp_path / "tests" / "__snapshots__" / "secrets" / "all"
+    snapshot.mkdir(parents=True)
+    (snapshot / "test_integration.ambr").write_text(SNAPSHOT, encoding="utf-8")
+    monkeypatch.setenv(DECRYPTED_ROOT_ENV_VAR, str(tmp_path))
+    monkeypatch.setenv(CACHE_ROOT_ENV_VAR, str(tmp_path / "cache"))
+    return tmp_path
 
 
 def test_csv_to_tsv_sorts_amounts_ascending() -> None:
@@ -121,3 +141,337 @@ def test_csv_to_tsv_reverses_default_date_sort() -> None:
     assert csv_to_tsv(csv_text, reverse=True) == (
         "2025-01-03\tC\t3.00\n2025-01-02\tB\t2.00\n2025-01-01\tA\t1.00\n"
     )
+
+
+@freezegun.freeze_time(datetime.datetime(2022, 4, 20))
+@pytest.mark.parametrize(
+    ("years", "months", "from_date", "to_date", "expected"),
+    [
+        ([], [], None, None, [(date(2021, 1, 1), date(2022, 1, 1))]),
+        (
+            [2021, 2022],
+            [],
+            None,
+            None,
+            [
+                (date(2021, 1, 1), date(2022, 1, 1)),
+                (date(2022, 1, 1), date(2023, 1, 1)),
+            ],
+        ),
+        (
+            [],
+            [date(2021, 11, 1), date(2021, 12, 1)],
+            None,
+            None,
+            [
+                (date(2021, 11, 1), date(2021, 12, 1)),
+                (date(2021, 12, 1), date(2022, 1, 1)),
+            ],
+        ),
+        ([], [], date(2021, 3, 15), None, [(date(2021, 3, 15), None)]),
+        ([], [], None, date(2021, 3, 15), [(None, date(2021, 3, 16))]),
+        (
+            [],
+            [],
+            date(2021, 3, 15),
+            date(2021, 4, 15),
+            [(date(2021, 3, 15), date(2021, 4, 16))],
+        ),
+    ],
+)
+def test_date_ranges(
+    years: list[int],
+    months: list[date],
+    from_date: date | None,
+    to_date: date | None,
+    expected: list[DateRange],
+) -> None:
+    """Date options should become ranges that exclude their end date."""
+    assert date_ranges(years, months, from_date, to_date) == expected
+
+
+@pytest.mark.usefixtures("snapshot_root")
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        (
+            ["--year", "2022", "(?i)amazon"],
+            "  2022-01-03\tAMAZON MKTP\t+ $3.50\n  2022-02-03\tAmazon.com\t20.00\n",
+        ),
+        (
+            ["--from", "2021-12-01", "--to", "2022-01-31", "Amazon|Books"],
+            "  2021-12-30\tAmazon.com\t3.00\n  2022-01-02\tBooks, used\t- $1,212.00\n",
+        ),
+        (
+            [
+                "--year",
+                "2022",
+                "--min-amount",
+                "3.50",
+                "--max-amount",
+                "$20",
+                "Amazon|AMAZON",
+            ],
+            "  2022-01-03\tAMAZON MKTP\t+ $3.50\n  2022-02-03\tAmazon.com\t20.00\n",
+        ),
+        (
+            ["--year", "2022", "--top", "1", "."],
+            "  2022-02-03\tAmazon.com\t20.00\n",
+        ),
+        (
+            ["--year", "2022", "--sum", "(?i)amazon"],
+            "23.50\n",
+        ),
+        (
+            ["--year", "2022", "--count", "--sum", "--group-by", "month", "."],
+            "2022-01\t2\t-1208.50\n2022-02\t1\t20.00\n",
+        ),
+        (
+            ["--year", "2022", "--group-by", "description", "--reverse", "Amazon"],
+            "Amazon.com\t1\t20.00\n",
+        ),
+        (
+            ["--year", "2022", "--sort", "amount", "--reverse", "."],
+            "  2022-02-03\tAmazon.com\t20.00\n"
+            "  2022-01-03\tAMAZON MKTP\t+ $3.50\n"
+            "  2022-01-02\tBooks, used\t- $1,212.00\n",
+        ),
+    ],
+)
+def test_main_python_engine(args: list[str], expected: str) -> None:
+    """The in-process engine should match and format rows like ripgrep over csv_to_tsv."""
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 0, result.output
+    assert result.output == expected
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        (["--year", "2022", "MKTP"], "  2022-01-03\tAMAZON MKTP\t(5.00)\n"),
+        (
+            ["--year", "2022", "--min-amount", "-2000", "."],
+            "  2022-01-02\tBooks, used\t- $1,212.00\n  2022-02-03\tAmazon.com\t20.00\n",
+        ),
+        (["--year", "2022", "--top", "1", "."], "  2022-02-03\tAmazon.com\t20.00\n"),
+        (["--year", "2022", "--count", "--sum", "."], "3\t-1192.00\n"),
+        (
+            ["--year", "2022", "--sort", "amount", "."],
+            "  2022-01-02\tBooks, used\t- $1,212.00\n"
+            "  2022-02-03\tAmazon.com\t20.00\n"
+            "  2022-01-03\tAMAZON MKTP\t(5.00)\n",
+        ),
+    ],
+)
+def test_main_python_engine_skips_invalid_amounts(
+    snapshot_root: Path, args: list[str], expected: str
+) -> None:
+    """Rows with amounts that don't parse should match, but be left out of amount options."""
+    snapshot = next(snapshot_root.glob("tests/**/test_integration.ambr"))
+    snapshot.write_text(SNAPSHOT.replace("+ $3.50", "(5.00)"), encoding="utf-8")
+
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 0, result.output
+    assert result.output == expected
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_python_engine_exits_1_without_matches() -> None:
+    """No matches should exit like grep, without output."""
+    result = CliRunner().invoke(main, ["--year", "2022", "tulip"])
+
+    assert result.exit_code == 1
+    assert result.output == ""
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_python_engine_rejects_invalid_pattern(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """An invalid regex should be a usage error, without ripgrep to fall back to."""
+    monkeypatch.setattr("shutil.which", lambda _: None)
+
+    result = CliRunner().invoke(main, ["--year", "2022", "(unclosed"])
+
+    assert result.exit_code == 2
+    assert "PATTERN" in result.output
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_python_engine_falls_back_to_rg(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A PCRE2-only pattern should be piped through ripgrep, when it's installed."""
+    commands = []
+
+    def run(command: list[str], **kwargs: object) -> subprocess.CompletedProcess[str]:
+        commands.append(command)
+        return subprocess.CompletedProcess(
+            command, 0, "  2022-02-03\tAmazon.com\t20.00\n"
+        )
+
+    monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/rg")
+    monkeypatch.setattr("subprocess.run", run)
+
+    result = CliRunner().invoke(main, ["--year", "2022", r"\p{L}mazon"])
+
+    assert result.exit_code == 0, result.output
+    assert commands == [["rg", "--pcre2", r"(\p{L}mazon)"]]
+    assert result.output == "  2022-02-03\tAmazon.com\t20.00\n"
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_python_engine_falls_back_to_rg_for_posix_classes(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A POSIX class, which Python would read as a set of characters, should be piped through ripgrep."""
+    commands = []
+
+    def run(command: list[str], **kwargs: object) -> subprocess.CompletedProcess[str]:
+        commands.append(command)
+        return subprocess.CompletedProcess(
+            command, 0, "  2022-01-02\tBooks, used\t- $1,212.00\n"
+        )
+
+    monkeypatch.setattr("shutil.which", lambda _: "/usr/bin/rg")
+    monkeypatch.setattr("subprocess.run", run)
+
+    result = CliRunner().invoke(main, ["--year", "2022", "[[:digit:]],[[:digit:]]"])
+
+    assert result.exit_code == 0, result.output
+    assert commands == [["rg", "--pcre2", "([[:digit:]],[[:digit:]])"]]
+    assert result.output == "  2022-01-02\tBooks, used\t- $1,212.00\n"
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_python_engine_highlights_matches_in_terminal() -> None:
+    """Matches should be highlighted when color is on."""
+    result = CliRunner().invoke(main, ["--year", "2022", "Books"], color=True)
+
+    assert result.output == (
+        "  2022-01-02\t\x1b[31m\x1b[1mBooks\x1b[0m, used\t- $1,212.00\n"
+    )
+
+
+@pytest.mark.usefixtures("snapshot_root")
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--min-amount", "lots", "."],
+        ["--top", "1", "--sort", "date", "."],
+        ["--top", "1", "--engine", "rg", "."],
+        ["--sum", "--sort", "amount", "."],
+        ["--count", "--engine", "rg", "."],
+    ],
+)
+def test_main_rejects_invalid_output_options(args: list[str]) -> None:
+    """Unparseable amounts, and output options that can't all be honored, should be usage errors."""
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 2
+
+
+def test_main_patterns(snapshot_root: Path) -> None:
+    """Rows matching any named pattern should be output once, tagged with every pattern they match."""
+    patterns = snapshot_root / "patterns.txt"
+    patterns.write_text("shopping (?i)amazon|books\nonline \\.com\n", encoding="utf-8")
+
+    result = CliRunner().invoke(main, ["--year", "2022", "--patterns", str(patterns)])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        "shopping\t  2022-01-02\tBooks, used\t- $1,212.00\n"
+        "shopping\t  2022-01-03\tAMAZON MKTP\t+ $3.50\n"
+        "shopping,online\t  2022-02-03\tAmazon.com\t20.00\n"
+    )
+
+
+@pytest.mark.usefixtures("snapshot_root")
+@pytest.mark.parametrize("args", [[], ["--patterns", __file__, "Amazon"]])
+def test_main_requires_pattern_or_patterns(args: list[str]) -> None:
+    """Exactly one of PATTERN or --patterns should be required."""
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 2
+
+
+@pytest.mark.usefixtures("snapshot_root")
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["(?i)amazon"],
+        ["(output|Books)"],
+        ["2022-01"],
+        ["--sort", "amount", "Amazon|MKTP"],
+    ],
+)
+def test_main_index_matches_scan(args: list[str]) -> None:
+    """Narrowing down with the trigram index should match the same as scanning every row."""
+    scan = CliRunner().invoke(main, ["--year", "2022", *args])
+    indexed = CliRunner().invoke(main, ["--year", "2022", "--index", *args])
+
+    assert scan.exit_code == indexed.exit_code == 0, indexed.output
+    assert indexed.output == scan.output
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_fuzzy() -> None:
+    """Fuzzy matching should find description variants, ignoring case."""
+    result = CliRunner().invoke(main, ["--year", "2022", "--fuzzy", "AMAZN"])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        "  2022-01-03\tAMAZON MKTP\t+ $3.50\n  2022-02-03\tAmazon.com\t20.00\n"
+    )
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_main_fuzzy_short() -> None:
+    """Fuzzy patterns too short for trigrams should still match descriptions containing them."""
+    result = CliRunner().invoke(main, ["--year", "2022", "--fuzzy", "MK"])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == "  2022-01-03\tAMAZON MKTP\t+ $3.50\n"
+
+
+def test_is_encrypted(tmp_path: Path) -> None:
+    """Only git-crypt's header should mark a file encrypted, not other binary content."""
+    encrypted = tmp_path / "encrypted"
+    encrypted.write_bytes(GIT_CRYPT_HEADER + bytes(range(256)))
+    binary = tmp_path / "binary"
+    binary.write_bytes(bytes(range(256)))
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+
+    assert is_encrypted(encrypted)
+    assert not is_encrypted(binary)
+    assert not is_encrypted(empty)
+
+
+@pytest.mark.usefixtures("snapshot_root")
+def test_query_skips_unused_imports() -> None:
+    """A query against an up to date store shouldn't pay for importing modules it doesn't use."""
+    warm_up = CliRunner().invoke(main, ["--year", "2022", "Amazon"])
+    assert warm_up.exit_code == 0, warm_up.output
+
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "sys.argv = ['gt', '--year', '2022', 'Amazon']\n"
+            "from greptransactions.client import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "unused = {'socketserver', 'subprocess', 'tempfile', 'pandas', 'camelot'}\n"
+            "print(sorted(unused & set(sys.modules)), file=sys.stderr)",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout == "  2022-02-03\tAmazon.com\t20.00\n"
+    assert result.stderr.splitlines()[-1] == "[]"
@@ -0,0 +1,68 @@
+"""Tests for greptransactions named patterns."""
+
+import re
+from pathlib import Path
+
+import pytest
+
+from greptransactions.patterns import PatternSet
+
+
+def test_pattern_set_read(tmp_path: Path) -> None:
+    """Patterns should be read by name, skipping blank lines and comments."""
+    path = tmp_path / "patterns.txt"
+    path.write_text(
+        "# Deductible categories\n"
+        "\n"
+        "charity   (?i)red cross|unicef\n"
+        "medical\tpharmacy \n",
+        encoding="utf-8",
+    )
+
+    pattern_set = PatternSet.read(path)
+
+    assert {name: regex.pattern for name, regex in pattern_set.patterns.items()} == {
+        "charity": "(?i)red cross|unicef",
+        "medical": "pharmacy",
+    }
+    assert pattern_set.names("2022-01-02\tUnicef pharmacy\t50.00") == [
+        "charity",
+        "medical",
+    ]
+    assert pattern_set.names("2022-01-02\tPharmacy\t50.00") == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["charity\n", "bad,name unicef\n", "charity (unclosed\n"],
+)
+def test_pattern_set_read_rejects_invalid_lines(tmp_path: Path, text: str) -> None:
+    """Lines without a valid name and regex should be errors, with line numbers."""
+    path = tmp_path / "patterns.txt"
+    path.write_text(f"medical pharmacy\n{text}", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="^Line 2: "):
+        PatternSet.read(path)
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        ("2022-01-02\tRED CROSS\t50.00", ["charity"]),
+        ("2022-01-02\tUNICEF pharmacy\t50.00", ["charity", "medical"]),
+        ("2022-01-02\tPharmacy\t50.00", []),
+        ("2022-01-02\tpharmacy pharmacy\t50.00", ["medical", "repeat"]),
+        ("2022-01-02\tCoffee\t3.00", []),
+    ],
+)
+def test_pattern_set_names(line: str, expected: list[str]) -> None:
+    """Names should be those of every matching pattern, with flags and backreferences intact."""
+    pattern_set = PatternSet(
+        {
+            "charity": re.compile("(?i)red cross|unicef"),
+            "medical": re.compile("pharmacy"),
+            "repeat": re.compile(r"(\w+) \1"),
+        }
+    )
+
+    assert pattern_set.names(line) == expected
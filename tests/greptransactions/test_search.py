@@ -0,0 +1,76 @@
+"""Tests for the greptransactions in-process search."""
+
+import re
+from collections.abc import Iterator
+
+import pytest
+
+from greptransactions.search import matching_rows, order_matches
+from greptransactions.store import TransactionStore
+
+SNAPSHOT = """\
+  2022-01-01,Tea,2.00
+  2022-01-02,Coffee,3.00
+  2022-01-03,"Tea, iced","1,000.00"
+  2022-01-04,Tea refund,- $2.00
+  2022-01-05,Tea,2.00
+"""
+
+
+def test_search_streams_unsorted_matches(store: TransactionStore) -> None:
+    """Unsorted matches should be yielded before later rows are read."""
+    read: list[int] = []
+
+    def rows() -> Iterator[int]:
+        for row in range(len(store)):
+            read.append(row)
+            yield row
+
+    matches = order_matches(store, matching_rows(store, rows(), re.compile("Tea")))
+
+    assert next(matches) == "  2022-01-01\tTea\t2.00"
+    assert read == [0]
+
+
+def test_search_sorts_only_matches(store: TransactionStore) -> None:
+    """Sorting should apply to matching rows, in the same order as sorting all rows first."""
+    matches = order_matches(
+        store,
+        matching_rows(store, range(len(store)), re.compile("Tea")),
+        sort="amount",
+        reverse=True,
+    )
+
+    assert list(matches) == [
+        "  2022-01-03\tTea, iced\t1,000.00",
+        "  2022-01-01\tTea\t2.00",
+        "  2022-01-05\tTea\t2.00",
+        "  2022-01-04\tTea refund\t- $2.00",
+    ]
+
+
+@pytest.mark.parametrize(
+    ("reverse", "expected"),
+    [
+        (
+            False,
+            ["  2022-01-03\tTea, iced\t1,000.00", "  2022-01-01\tTea\t2.00"],
+        ),
+        (
+            True,
+            ["  2022-01-04\tTea refund\t- $2.00", "  2022-01-01\tTea\t2.00"],
+        ),
+    ],
+)
+def test_search_top(
+    store: TransactionStore, reverse: bool, expected: list[str]
+) -> None:
+    """Top matches should be the largest amounts, or smallest, with ties in snapshot order."""
+    matches = order_matches(
+        store,
+        matching_rows(store, range(len(store)), re.compile("Tea")),
+        reverse=reverse,
+        top=2,
+    )
+
+    assert list(matches) == expected
@@ -0,0 +1,128 @@
+"""Tests for the gt daemon and its client."""
+
+import io
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+import pytest
+
+from greptransactions import client
+from greptransactions.__main__ import main
+from greptransactions.server import _handle
+from taxes.paths import CACHE_ROOT_ENV_VAR, DECRYPTED_ROOT_ENV_VAR
+
+from .test_main import SNAPSHOT
+
+
+def _output(messages: list[dict[str, str | int]], name: str) -> str:
+    return "".join(str(message.get(name, "")) for message in messages)
+
+
+def _query(args: list[str], root: Path) -> list[dict[str, str | int]]:
+    """Run a query in the daemon's handler, returning its response messages."""
+    request = {
+        "args": args,
+        "color": False,
+        "cwd": str(root),
+        "env": {
+            CACHE_ROOT_ENV_VAR: str(root / "cache"),
+            DECRYPTED_ROOT_ENV_VAR: str(root),
+        },
+    }
+    rfile = io.BytesIO(json.dumps(request).encode() + b"\n")
+    wfile = io.BytesIO()
+
+    _handle(main, rfile, wfile)
+
+    return [json.loads(line) for line in wfile.getvalue().splitlines()]
+
+
+@pytest.fixture
+def snapshot_root(tmp_path: Path) -> Path:
+    """Write a decrypted transaction snapshot under a temporary directory, without changing this process's environment."""
+    snapshot = tmp_path / "tests" / "__snapshots__" / "secrets" / "all"
+    snapshot.mkdir(parents=True)
+    (snapshot / "test_integration.ambr").write_text(SNAPSHOT, encoding="utf-8")
+    return tmp_path
+
+
+def test_handle_query(snapshot_root: Path) -> None:
+    """A query should run with the client's environment, sending its output then its exit code."""
+    old_environ = dict(os.environ)
+    old_cwd = os.getcwd()
+
+    messages = _query(["--year", "2022", "--count", "(?i)amazon"], snapshot_root)
+
+    assert _output(messages, "stdout") == "2\n"
+    assert messages[-1] == {"exit": 0}
+    assert dict(os.environ) == old_environ
+    assert os.getcwd() == old_cwd
+
+
+def test_handle_query_reloads_changed_snapshot(snapshot_root: Path) -> None:
+    """Later queries should see a changed snapshot."""
+    assert _query(["--year", "2022", "Tulip"], snapshot_root) == [{"exit": 1}]
+
+    snapshot = (
+        snapshot_root
+        / "tests"
+        / "__snapshots__"
+        / "secrets"
+        / "all"
+        / "test_integration.ambr"
+    )
+    snapshot.write_text(
+        SNAPSHOT.replace("\n\n  '''", "\n  2022-03-01,Tulip,6.00\n\n  '''"),
+        encoding="utf-8",
+    )
+    os.utime(snapshot, ns=(0, 0))
+
+    messages = _query(["--year", "2022", "Tulip"], snapshot_root)
+
+    assert _output(messages, "stdout") == "  2022-03-01\tTulip\t6.00\n"
+    assert messages[-1] == {"exit": 0}
+
+
+def test_handle_usage_error(snapshot_root: Path) -> None:
+    """Usage errors should go to the client's stderr, with click's exit code."""
+    messages = _query([], snapshot_root)
+
+    assert "PATTERN" in _output(messages, "stderr")
+    assert messages[-1] == {"exit": 2}
+
+
+def test_client_forward(capsys: pytest.CaptureFixture[str]) -> None:
+    """The client should send its query, and replay the daemon's output and exit code."""
+    client_sock, daemon_sock = socket.socketpair()
+    with client_sock, daemon_sock:
+        daemon_sock.sendall(
+            b'{"stdout": "match\\n"}\n{"stderr": "warning\\n"}\n{"exit": 3}\n'
+        )
+
+        assert client.forward(client_sock, ["--year", "2022", "x"]) == 3
+
+        request = json.loads(daemon_sock.makefile("rb").readline())
+
+    assert request["args"] == ["--year", "2022", "x"]
+    assert request["cwd"] == os.getcwd()
+    assert set(request["env"]) == {CACHE_ROOT_ENV_VAR, DECRYPTED_ROOT_ENV_VAR}
+    captured = capsys.readouterr()
+    assert captured.out == "match\n"
+    assert captured.err == "warning\n"
+
+
+def test_client_runs_in_process_without_daemon(
+    monkeypatch: pytest.MonkeyPatch, snapshot_root: Path
+) -> None:
+    """Without a daemon listening, the client should run the query itself."""
+    monkeypatch.setenv(DECRYPTED_ROOT_ENV_VAR, str(snapshot_root))
+    monkeypatch.setenv(CACHE_ROOT_ENV_VAR, str(snapshot_root / "cache"))
+    monkeypatch.setattr(sys, "argv", ["gt", "--year", "2022", "--count", "(?i)amazon"])
+
+    with pytest.raises(SystemExit) as exc_info:
+        client.main()
+
+    assert exc_info.value.code == 0
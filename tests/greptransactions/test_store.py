@@ -0,0 +1,139 @@
+"""Tests for the greptransactions columnar store."""
+
+import datetime
+import os
+from pathlib import Path
+
+import pytest
+
+from greptransactions.store import INVALID_AMOUNT, TransactionStore
+
+SNAPSHOT = """\
+# name: test_statements2csv_all_files
+  '''
+  Date,Description,Amount
+  2021-12-30,Coffee,3.00
+  2022-01-02,"Books, used","- $1,212.00"
+  2022-01-03,Coffee,+ $3.50
+
+  '''
+# ---
+"""
+
+
+# Statements are in file order, not date order
+UNSORTED_SNAPSHOT = """\
+  2021-12-30,Coffee,3.00
+  2022-01-02,Tea,2.00
+  2022-01-03,Coffee,3.00
+  2021-12-01,Books,12.00
+"""
+
+
+def _write_snapshot(path: Path, text: str) -> Path:
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_store_columns(tmp_path: Path) -> None:
+    """Test transaction rows are parsed into typed columns, with descriptions interned."""
+    snapshot = _write_snapshot(tmp_path / "snapshot.ambr", SNAPSHOT)
+
+    store = TransactionStore.open(snapshot, tmp_path / "store")
+
+    assert len(store) == 3
+    assert [store.date(row) for row in range(len(store))] == [
+        datetime.date(2021, 12, 30),
+        datetime.date(2022, 1, 2),
+        datetime.date(2022, 1, 3),
+    ]
+    assert list(store.amounts) == [300, -121200, 350]
+    assert [store.description(i) for i in store.description_ids] == [
+        "Coffee",
+        "Books, used",
+        "Coffee",
+    ]
+    assert store.description_ids[0] == store.description_ids[2]
+    assert store.line(1) == '  2022-01-02,"Books, used","- $1,212.00"'
+
+
+@pytest.mark.parametrize(
+    ("date_ranges", "expected"),
+    [
+        ([(datetime.date(2022, 1, 1), datetime.date(2023, 1, 1))], [1, 2]),
+        ([(datetime.date(2022, 1, 3), None)], [2]),
+        ([(None, datetime.date(2022, 1, 3))], [0, 1, 3]),
+        ([(None, None)], [0, 1, 2, 3]),
+        ([(datetime.date(2020, 1, 1), datetime.date(2021, 1, 1))], []),
+        (
+            [
+                (datetime.date(2022, 1, 3), datetime.date(2022, 1, 4)),
+                (datetime.date(2021, 12, 1), datetime.date(2022, 1, 1)),
+                (datetime.date(2021, 12, 30), datetime.date(2021, 12, 31)),
+            ],
+            [0, 2, 3],
+        ),
+    ],
+)
+def test_store_date_rows(
+    tmp_path: Path,
+    date_ranges: list[tuple[datetime.date | None, datetime.date | None]],
+    expected: list[int],
+) -> None:
+    """Test rows are selected by date ranges, without duplicates, in snapshot order."""
+    snapshot = _write_snapshot(tmp_path / "snapshot.ambr", UNSORTED_SNAPSHOT)
+
+    store = TransactionStore.open(snapshot, tmp_path / "store")
+
+    assert store.date_rows(date_ranges) == expected
+
+
+def test_store_rebuilds_when_snapshot_changes(tmp_path: Path) -> None:
+    """Test the store is reused while the snapshot is unchanged, and rebuilt after."""
+    snapshot = _write_snapshot(tmp_path / "snapshot.ambr", SNAPSHOT)
+    store_path = tmp_path / "store"
+
+    store = TransactionStore.open(snapshot, store_path)
+    built_ns = store_path.stat().st_mtime_ns
+    assert TransactionStore.open(snapshot, store_path) is store
+    assert len(store) == 3
+    assert store_path.stat().st_mtime_ns == built_ns
+
+    _write_snapshot(snapshot, SNAPSHOT.replace("  2021-12-30,Coffee,3.00\n", ""))
+    os.utime(snapshot, ns=(0, 0))
+
+    assert len(TransactionStore.open(snapshot, store_path)) == 2
+
+
+def test_store_rebuilds_corrupt_store(tmp_path: Path) -> None:
+    """Test an unreadable store file is rebuilt instead of failing queries."""
+    snapshot = _write_snapshot(tmp_path / "snapshot.ambr", SNAPSHOT)
+    store_path = tmp_path / "store"
+    store_path.write_bytes(b"garbage")
+
+    assert len(TransactionStore.open(snapshot, store_path)) == 3
+
+
+def test_store_amount_rows(tmp_path: Path) -> None:
+    """Test rows are filtered by amount bounds, inclusive, in the given order."""
+    snapshot = _write_snapshot(tmp_path / "snapshot.ambr", SNAPSHOT)
+
+    store = TransactionStore.open(snapshot, tmp_path / "store")
+
+    assert list(store.amount_rows([2, 1, 0], min_cents=300)) == [2, 0]
+    assert list(store.amount_rows([0, 1, 2], max_cents=300)) == [0, 1]
+    assert list(store.amount_rows([0, 1, 2], -200000, -100000)) == [1]
+
+
+def test_store_invalid_amounts(tmp_path: Path) -> None:
+    """Test rows with amounts that don't parse are stored, but left out of amount bounds."""
+    snapshot = _write_snapshot(
+        tmp_path / "snapshot.ambr", SNAPSHOT.replace("+ $3.50", "(5.00)")
+    )
+
+    store = TransactionStore.open(snapshot, tmp_path / "store")
+
+    assert list(store.amounts) == [300, -121200, INVALID_AMOUNT]
+    assert not store.has_amount(2)
+    assert list(store.amount_rows([0, 1, 2])) == [0, 1, 2]
+    assert list(store.amount_rows([0, 1, 2], min_cents=-200000)) == [0, 1]
@@ -0,0 +1,111 @@
+"""Tests for the greptransactions trigram index."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from greptransactions.store import TransactionStore
+from greptransactions.trigrams import (
+    TrigramIndex,
+    candidate_descriptions,
+    descriptions_containing,
+    pattern_literals,
+)
+
+SNAPSHOT = """\
+  2022-01-01,AMZN Mktp US*2K3,2.00
+  2022-01-02,Amazon.com,3.00
+  2022-01-03,AMZN MKTP   US*9Z1,4.00
+  2022-01-04,Pharmacy,5.00
+"""
+
+
+def _descriptions(store: TransactionStore, description_ids: set[int]) -> set[str]:
+    return {store.description(i) for i in description_ids}
+
+
+def test_index_containing(store: TransactionStore) -> None:
+    """Descriptions should be narrowed to those with all the text's trigrams, ignoring case and runs of whitespace."""
+    index = TrigramIndex.open(store)
+
+    assert _descriptions(store, index.containing("mktp us") or set()) == {
+        "AMZN Mktp US*2K3",
+        "AMZN MKTP   US*9Z1",
+    }
+    assert index.containing("tulip") == set()
+    assert index.containing("us") is None
+
+
+def test_index_similar(store: TransactionStore) -> None:
+    """Similar descriptions should share enough of the text's trigrams."""
+    index = TrigramIndex.open(store)
+
+    assert _descriptions(store, index.similar("amzn mktp") or set()) == {
+        "AMZN Mktp US*2K3",
+        "AMZN MKTP   US*9Z1",
+    }
+    assert _descriptions(store, index.similar("pharmcy") or set()) == {"Pharmacy"}
+
+
+def test_short_text_scans_descriptions(store: TransactionStore) -> None:
+    """Text too short for trigrams should be found by scanning every description instead."""
+    index = TrigramIndex.open(store)
+
+    assert index.similar("mk") is None
+    assert _descriptions(store, descriptions_containing(store, "mk")) == {
+        "AMZN Mktp US*2K3",
+        "AMZN MKTP   US*9Z1",
+    }
+    assert _descriptions(store, descriptions_containing(store, "p u")) == {
+        "AMZN Mktp US*2K3",
+        "AMZN MKTP   US*9Z1",
+    }
+
+
+def test_index_rebuilds_with_store(store: TransactionStore, tmp_path: Path) -> None:
+    """The index should stay open while its store's snapshot is unchanged, and be rebuilt after."""
+    old_index = TrigramIndex.open(store)
+    assert TrigramIndex.open(store) is old_index
+    snapshot = tmp_path / "snapshot.ambr"
+    snapshot.write_text(SNAPSHOT + "  2022-01-05,Tulip,6.00\n", encoding="utf-8")
+    os.utime(snapshot, ns=(0, 0))
+
+    new_store = TransactionStore.open(snapshot, store.path)
+    index = TrigramIndex.open(new_store)
+
+    assert _descriptions(new_store, index.containing("tulip") or set()) == {"Tulip"}
+
+
+@pytest.mark.parametrize(
+    ("pattern", "expected"),
+    [
+        ("amazon", ["amazon"]),
+        ("(output|tulip)", ["output", "tulip"]),
+        ("(?i)(?:Red Cross|UNICEF)", ["Red Cross", "UNICEF"]),
+        ("Amazon|Books", ["Amazon", "Books"]),
+        # Could match other fields, or too short to narrow down
+        ("2022-01", None),
+        ("$3.50", None),
+        ("Amazon|TV", None),
+        # Not plain text
+        ("Amazon.com", None),
+        (r"(\w+) \1", None),
+        ("(?x)Red Cross", None),
+        ("(a)|(b)", None),
+        ("", None),
+    ],
+)
+def test_pattern_literals(pattern: str, expected: list[str] | None) -> None:
+    """Only plain text patterns, only matching descriptions, should be narrowed down."""
+    assert pattern_literals(pattern) == expected
+
+
+def test_candidate_descriptions(store: TransactionStore) -> None:
+    """Candidates should be descriptions containing any alternative, unless one can't be narrowed down."""
+    index = TrigramIndex.open(store)
+
+    assert _descriptions(
+        store, candidate_descriptions(index, ["amazon", "pharmacy"]) or set()
+    ) == {"Amazon.com", "Pharmacy"}
+    assert candidate_descriptions(index, ["amazon", "us"]) is None
@@ -0,0 +1,131 @@
+"""Benchmark harness behavior."""
+
+from __future__ import annotations
+
+import csv
+import importlib.util
+import json
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+from click.testing import CliRunner
+
+from statements2csv.__main__ import main as statements2csv
+
+
+def _load_benchmark_module() -> ModuleType:
+    path = Path(__file__).parents[2] / "scripts" / "benchmark.py"
+    spec = importlib.util.spec_from_file_location("benchmark", path)
+    assert spec
+    assert spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_synthetic_statements_extract_every_row(tmp_path: Path) -> None:
+    """Each bank layout's synthetic statement is extracted by that bank's extractor, row for row."""
+    benchmark = _load_benchmark_module()
+    params = benchmark.BenchmarkParams(
+        list(benchmark.LAYOUTS), statements=1, pages=2, rows_per_page=4
+    )
+
+    files = benchmark.generate_statements(tmp_path, params)
+    result = CliRunner().invoke(statements2csv, ["--no-cache", *map(str, files)])
+
+    assert result.exit_code == 0, result.output
+    rows = [row for row in csv.reader(result.stdout.splitlines()) if row]
+    assert rows[0] == ["Date", "Description", "Amount"]
+    assert len(rows[1:]) == len(benchmark.LAYOUTS) * 2 * 4
+
+
+def test_time_stages_parse_dates_uncached(tmp_path: Path) -> None:
+    """Each stage, each repeat, starts without dates parsed by earlier ones."""
+    benchmark = _load_benchmark_module()
+    params = benchmark.BenchmarkParams(
+        ["Apple"], statements=1, pages=1, rows_per_page=4
+    )
+    files = benchmark.generate_statements(tmp_path, params)
+    benchmark.time_stages(files)
+    assert benchmark._maybe_date_parse.cache_info().currsize > 0
+    cache_sizes = []
+
+    with benchmark._timed({}, "read"):
+        cache_sizes.append(benchmark._maybe_date_parse.cache_info().currsize)
+
+    assert cache_sizes == [0]
+
+
+def test_time_stages_compares_consecutive_tables(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """The dedupe stage compares each table to the one before it."""
+    benchmark = _load_benchmark_module()
+    params = benchmark.BenchmarkParams(
+        ["Apple"], statements=1, pages=3, rows_per_page=4
+    )
+    files = benchmark.generate_statements(tmp_path, params)
+    compared = []
+
+    def is_duplicate_extraction(prev: object, next_extraction: object) -> bool:
+        compared.append((prev, next_extraction))
+        return False
+
+    monkeypatch.setattr(benchmark, "_is_duplicate_extraction", is_duplicate_extraction)
+
+    benchmark.time_stages(files)
+
+    # 2 pairs of tables, in each flavor
+    assert len(compared) == 4
+
+
+def test_find_regressions() -> None:
+    """Only stages slower than their baseline by more than the threshold regress."""
+    benchmark = _load_benchmark_module()
+
+    regressions = benchmark.find_regressions(
+        {"read": 1.3, "csv": 0.11, "main": 2.0},
+        {"read": 1.0, "csv": 0.1},
+        0.2,
+    )
+
+    assert regressions == ["read: 1300.0 ms, +30% vs. baseline 1000.0 ms"]
+
+
+@pytest.mark.parametrize(
+    ("baseline_timing", "expected_exit_code"), [(1000.0, 0), (0.000001, 1)]
+)
+def test_main_compares_to_baseline(
+    tmp_path: Path, baseline_timing: float, expected_exit_code: int
+) -> None:
+    """A run fails if it's slower than the saved baseline."""
+    benchmark = _load_benchmark_module()
+    baseline = tmp_path / "baseline.json"
+    args = [
+        "--layout",
+        "Chase",
+        "--pages",
+        "1",
+        "--rows-per-page",
+        "2",
+        "--repeat",
+        "1",
+        "--baseline",
+        str(baseline),
+    ]
+
+    assert benchmark.main([*args, "--save-baseline"]) == 0
+    results = json.loads(baseline.read_text())
+    assert set(results["timings"]) == {
+        "read",
+        "extract_table",
+        "parse_dates",
+        "dedupe",
+        "csv",
+        "main",
+    }
+
+    results["timings"] = dict.fromkeys(results["timings"], baseline_timing)
+    baseline.write_text(json.dumps(results))
+    assert benchmark.main(args) == expected_exit_code
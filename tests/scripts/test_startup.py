@@ -0,0 +1,105 @@
+"""Startup benchmark behavior."""
+
+from __future__ import annotations
+
+import importlib.util
+import subprocess
+import sys
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 |     click.core
+import time:       200 |       1100 |   click
+import time:      5000 |       5000 | pandas
+"""
+
+
+def _load_startup_module() -> ModuleType:
+    path = Path(__file__).parents[2] / "scripts" / "startup.py"
+    spec = importlib.util.spec_from_file_location("startup", path)
+    assert spec
+    assert spec.loader
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_slowest_imports() -> None:
+    """Only top-level packages are reported, slowest first."""
+    startup = _load_startup_module()
+
+    import_times = startup.parse_import_times(IMPORTTIME_OUTPUT)
+
+    assert [tuple(import_time) for import_time in import_times] == [
+        ("_io", 120),
+        ("click.core", 900),
+        ("click", 1100),
+        ("pandas", 5000),
+    ]
+    assert [
+        import_time.module for import_time in startup.slowest_imports(import_times, 2)
+    ] == ["pandas", "click"]
+
+
+def test_write_snapshot(tmp_path: Path) -> None:
+    """The generated snapshot parses into a store of all its transactions."""
+    from greptransactions.store import TransactionStore
+
+    startup = _load_startup_module()
+    snapshot = tmp_path / "snapshot.ambr"
+
+    startup.write_snapshot(snapshot, 10)
+
+    store = TransactionStore.open(snapshot, tmp_path / "store")
+    assert len(store) == 10
+    assert store.description(store.description_ids[3]) == "Books, used"
+
+
+def test_main_fails_over_budget() -> None:
+    """A command slower than the budget fails the benchmark."""
+    startup = _load_startup_module()
+
+    assert startup.main(["--runs", "1", "--top", "0", "--budget-ms", "0"]) == 1
+
+
+def test_gt_command_queries_warm_store() -> None:
+    """The gt command runs a matching query, through its entry point."""
+    startup = _load_startup_module()
+
+    with startup._snapshot_env() as env:
+        result = subprocess.run(
+            (sys.executable, *startup.COMMANDS["gt"]),
+            check=True,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+    assert "Amazon.com" in result.stdout
+    assert "AMAZON MKTP" in result.stdout
+
+
+@pytest.mark.parametrize(("median_ms", "expected"), [(150.0, 0), (250.0, 1)])
+def test_main_compares_median_to_budget(
+    monkeypatch: pytest.MonkeyPatch, median_ms: float, expected: int
+) -> None:
+    """Each command's median time, after 1 warm up run, is compared to the budget."""
+    startup = _load_startup_module()
+    times = iter([1000.0, median_ms - 10, median_ms, median_ms + 10])
+    timed_commands = []
+
+    def time_ms(command: Sequence[str], env: Mapping[str, str]) -> float:
+        timed_commands.append(command)
+        return next(times)
+
+    monkeypatch.setattr(startup, "_time_ms", time_ms)
+    monkeypatch.setattr(startup, "_import_times", lambda *_: [])
+
+    assert startup.main(["gt", "--runs", "3", "--budget-ms", "200"]) == expected
+    assert timed_commands == [(sys.executable, *startup.COMMANDS["gt"])] * 4
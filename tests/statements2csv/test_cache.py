@@ -0,0 +1,103 @@
+"""Test the cache module."""
+
+import os
+from pathlib import Path
+
+import pandas
+import pytest
+
+from statements2csv import cache as cache_module
+from statements2csv.cache import TableCache
+
+
+def test_cache_roundtrips_tables(tmp_path: Path) -> None:
+    """Test tables put in the cache come back equal."""
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 a")
+    cache = TableCache(tmp_path / "cache")
+    key = cache.key(pdf, "stream", "all")
+    tables = [pandas.DataFrame([["Date", "Amount"], ["01/02", "$1.00"]])]
+
+    assert cache.get(key) is None
+
+    cache.put(key, tables)
+    cached = cache.get(key)
+
+    assert cached is not None
+    assert len(cached) == 1
+    assert cached[0].equals(tables[0])
+
+
+def test_cache_key_is_content_addressed(tmp_path: Path) -> None:
+    """Test cache keys follow the PDF's content and parse options, not its path."""
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 a")
+    same_content = tmp_path / "b.pdf"
+    same_content.write_bytes(b"%PDF-1.4 a")
+    other_content = tmp_path / "c.pdf"
+    other_content.write_bytes(b"%PDF-1.4 c")
+    cache = TableCache(tmp_path / "cache")
+
+    key = cache.key(pdf, "stream", "all")
+
+    assert cache.key(same_content, "stream", "all") == key
+    assert cache.key(other_content, "stream", "all") != key
+    assert cache.key(pdf, "network", "all") != key
+    assert cache.key(pdf, "stream", "1-2") != key
+
+
+def test_cache_key_hashes_each_file_version_once(tmp_path: Path) -> None:
+    """Test a PDF's content is hashed once for all its keys, until it changes."""
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 a")
+    cache = TableCache(tmp_path / "cache")
+    misses = cache_module._hash_file.cache_info().misses
+
+    keys = {cache.key(pdf, flavor, "all") for flavor in ("stream", "network")}
+    keys.add(cache.key(pdf, "stream", "1-2"))
+    pdf.write_bytes(b"%PDF-1.4 changed")
+    os.utime(pdf, ns=(0, 0))
+    changed_key = cache.key(pdf, "stream", "all")
+
+    assert len(keys) == 3
+    assert changed_key not in keys
+    assert cache_module._hash_file.cache_info().misses == misses + 2
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"",
+        b"\x80\x05\x95",
+        b"cstatements2csv.cache\nNoSuchClass\n.",
+        b"cno_such_module\nNoSuchClass\n.",
+    ],
+)
+def test_cache_evicts_corrupt_entries(tmp_path: Path, content: bytes) -> None:
+    """Test an entry that fails to load, like a truncated or stale pickle, is a miss."""
+    cache = TableCache(tmp_path / "cache")
+    cache.put("key", [pandas.DataFrame([["x"]])])
+    entry = tmp_path / "cache" / "key.pickle"
+    entry.write_bytes(content)
+
+    assert cache.get("key") is None
+    assert not entry.exists()
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    """Test the cache stays under its size cap, keeping recently used entries."""
+    cache = TableCache(tmp_path / "cache")
+    table = pandas.DataFrame([["x" * 1000]])
+    for i, key in enumerate(("old", "used", "new")):
+        cache.put(key, [table])
+        os.utime(tmp_path / "cache" / f"{key}.pickle", ns=(i, i))
+    assert cache.get("used") is not None
+
+    entry_size = (tmp_path / "cache" / "old.pickle").stat().st_size
+    cache.max_bytes = entry_size * 2
+    cache.put("newest", [table])
+
+    assert cache.get("old") is None
+    assert cache.get("new") is None
+    assert cache.get("used") is not None
+    assert cache.get("newest") is not None
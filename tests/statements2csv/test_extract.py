@@ -3,9 +3,13 @@
 from pathlib import Path
 
 import camelot.io
+import pandas
 import pytest
 
-from statements2csv.extract import extract_dataframes
+from statements2csv import timings
+from statements2csv.cache import TableCache
+from statements2csv.extract import _is_duplicate_extraction, extract_dataframes
+from statements2csv.extractors import Extraction
 
 
 def test_extract_dataframes_must_contain_one_year(
@@ -26,3 +30,52 @@ def test_extract_dataframes_must_contain_one_year(
         )
 
     assert list(extract_dataframes(Path("years") / "2020" / "a.pdf", flavor)) == []
+
+
+def test_extract_dataframes_replays_cached_tables(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Test a warm cache skips camelot entirely, timing the cache lookup instead."""
+    pdf = tmp_path / "2020" / "a.pdf"
+    pdf.parent.mkdir()
+    pdf.write_bytes(b"%PDF-1.4")
+    cache = TableCache(tmp_path / "cache")
+    calls = []
+
+    def read_pdf(*args: object, **kwargs: object) -> list[object]:
+        calls.append(args)
+        return []
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    assert list(extract_dataframes(pdf, "stream", cache)) == []
+    with timings.recording(pdf) as spans:
+        assert list(extract_dataframes(pdf, "stream", cache)) == []
+    assert len(calls) == 1
+    assert [span.stage for span in spans] == ["read_cache"]
+
+
+@pytest.mark.parametrize(
+    ("prev_rows", "next_rows", "expected"),
+    [
+        ([("01/02", "A")], [("01/02", "A")], True),
+        ([("01/02", "A")], [("01/02", "A"), ("01/03", "B")], True),
+        ([("01/03", "B")], [("01/02", "A"), ("01/03", "B")], True),
+        ([("01/02", "A"), ("01/02", "A")], [("01/02", "A"), ("01/03", "B")], True),
+        ([("01/02", "A")], [("01/02", "A"), ("01/02", "A")], False),
+        ([("01/02", "A"), ("01/04", "C")], [("01/02", "A"), ("01/03", "B")], False),
+        ([("01/02", "A")], [("01/02", "B")], False),
+    ],
+)
+def test_is_duplicate_extraction(
+    prev_rows: list[tuple[str, str]],
+    next_rows: list[tuple[str, str]],
+    expected: bool,
+) -> None:
+    """Test a table duplicates the next if its rows each appear exactly once in the next."""
+    columns = ["Date", "Description"]
+    prev = Extraction(pandas.DataFrame(prev_rows, columns=columns))
+    _next = Extraction(pandas.DataFrame(next_rows, columns=columns))
+
+    assert _is_duplicate_extraction(prev, _next) is expected
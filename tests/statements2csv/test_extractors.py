@@ -0,0 +1,135 @@
+"""Test the extractors module."""
+
+import datetime
+
+import dateutil.parser
+import pandas
+import pytest
+
+from statements2csv.extractors import (
+    ALL_EXTRACTORS,
+    ALL_EXTRACTORS_ROUTER,
+    Extraction,
+    Extractor,
+    ExtractorAppleCard,
+    ExtractorBankOfAmerica,
+    ExtractorCapitalOne,
+    ExtractorChase,
+    ExtractorWellsFargo,
+    _date_column_parse,
+    _date_parse,
+)
+
+TABLES: dict[type[Extractor], list[list[str]]] = {
+    ExtractorAppleCard: [
+        ["Date", "Description", "Daily Cash", "Amount"],
+        ["01/02/2021", "Coffee", "1%", "$3.00"],
+    ],
+    ExtractorBankOfAmerica: [
+        ["Date", "Date", "Description", "Reference", "Account", "Amount"],
+        ["01/02", "01/03", "Coffee", "123", "4567", "3.00"],
+    ],
+    ExtractorCapitalOne: [
+        ["Date", "Description", "Category", "AMOUNT", "BALANCE"],
+        ["Jan 2", "Coffee", "Dining", "3.00", "100.00"],
+    ],
+    ExtractorChase: [
+        [
+            "Date of\nTransaction",
+            "Merchant Name or Transaction Description",
+            "$ Amount",
+        ],
+        ["01/02", "Coffee", "3.00"],
+    ],
+    ExtractorWellsFargo: [
+        ["Date", "Number", "Description", "Additions", "Subtractions", "Balance"],
+        ["1/2", "", "Coffee", "", "3.00", "100.00"],
+    ],
+}
+
+
+@pytest.mark.parametrize("extractor_type", TABLES)
+def test_router_routes_tables_to_matching_extractors(
+    extractor_type: type[Extractor],
+) -> None:
+    """Test every extractor that matches a table is among the table's candidates."""
+    df = pandas.DataFrame(TABLES[extractor_type])
+
+    matching = [extractor for extractor in ALL_EXTRACTORS if extractor.is_match(df)]
+    candidates = ALL_EXTRACTORS_ROUTER.candidates(df)
+
+    assert any(isinstance(extractor, extractor_type) for extractor in matching)
+    assert set(matching) <= set(candidates)
+    assert len(candidates) < len(ALL_EXTRACTORS)
+
+
+def test_router_skips_non_transaction_tables() -> None:
+    """Test tables without any extractor's fingerprint words are routed nowhere."""
+    df = pandas.DataFrame([["Rewards Summary", ""], ["Points earned", "1,234"]])
+
+    assert ALL_EXTRACTORS_ROUTER.candidates(df) == []
+
+
+@pytest.mark.parametrize("year", [2020, 2021])
+def test_date_column_parse_matches_general_date_parser(year: int) -> None:
+    """Test parsing known date formats all at once matches parsing 1 date at a time."""
+    texts = [
+        "01/02",
+        " 1/2 ",
+        "12/31/20",
+        "12/31/2021",
+        "02/28",
+        "02/29",
+        "02/30",
+        "13/05",
+        "00/05",
+        "Jan 5",
+        "jan 05",
+        "SEP 30",
+        "Sept 3",
+        "Feb 29",
+        "Date",
+        "Total",
+        "",
+        "$3.00",
+        "March",
+    ]
+
+    def reference(text: str) -> datetime.date | None:
+        try:
+            return _date_parse(year, text)
+        except (dateutil.parser.ParserError, ValueError):
+            return None
+
+    expected = [reference(text) for text in texts]
+
+    assert _date_column_parse(year, pandas.Series(texts)) == expected
+
+
+def test_date_column_parse_fixes_year_boundary() -> None:
+    """Test December dates get the previous year, in statements crossing into January."""
+    dates = _date_column_parse(2021, pandas.Series(["12/30", "Date", "01/02"]))
+
+    assert dates == [datetime.date(2020, 12, 30), None, datetime.date(2021, 1, 2)]
+
+
+def test_extraction_sorted_by_date() -> None:
+    """Test sorting a table by date keeps same day transactions in table order."""
+    df = pandas.DataFrame(
+        {
+            "Date": [
+                datetime.date(2021, 1, 5),
+                datetime.date(2021, 1, 2),
+                datetime.date(2021, 1, 5),
+            ],
+            "Description": ["Tea", "Coffee", "Gas"],
+        }
+    )
+    already_sorted = Extraction(df.iloc[[1, 0, 2]].reset_index(drop=True))
+
+    assert Extraction(df).sorted_by_date().df["Description"].tolist() == [
+        "Coffee",
+        "Tea",
+        "Gas",
+    ]
+    assert already_sorted.sorted_by_date() is already_sorted
@@ -0,0 +1,581 @@
+"""Test the statements2csv command."""
+
+import datetime
+import json
+import os
+import subprocess
+import sys
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from types import SimpleNamespace
+
+import camelot.io
+import pandas
+import pytest
+from click.testing import CliRunner
+
+from statements2csv import extract, pages
+from statements2csv.__main__ import (
+    FileExtraction,
+    _in_date_order,
+    _in_sorted_order,
+    main,
+)
+from statements2csv.extractors import Extraction, Extractor
+from taxes.pdfs import blank_pdf, text_pdf
+
+
+def _chase_table(*rows: tuple[str, str, str]) -> SimpleNamespace:
+    header = (
+        "Date of Transaction",
+        "Merchant Name or Transaction Description",
+        "$ Amount",
+    )
+    return SimpleNamespace(df=pandas.DataFrame([header, *rows]))
+
+
+@pytest.fixture
+def chase_pdf(tmp_path: Path) -> Path:
+    """Return a blank placeholder for a Chase statement PDF."""
+    return blank_pdf(tmp_path / "Chase" / "2021" / "statement.pdf", 1)
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_picks_flavor_with_most_transactions(
+    monkeypatch: pytest.MonkeyPatch,
+    chase_pdf: Path,
+    jobs: str,
+) -> None:
+    """Test each flavor is tried, serially or in parallel, and the one with the most transactions wins."""
+    tables_by_flavor = {
+        "network": [
+            _chase_table(("01/02", "Coffee", "3.00"), ("01/03", "Books", "12.00"))
+        ],
+        "stream": [_chase_table(("01/02", "Coffee", "3.00"))],
+    }
+
+    def read_pdf(*_: object, flavor: str, **__: object) -> list[SimpleNamespace]:
+        return tables_by_flavor[flavor]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    result = CliRunner().invoke(main, ["--no-cache", "--jobs", jobs, str(chase_pdf)])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        "Date,Description,Amount\n2021-01-02,Coffee,3.00\n2021-01-03,Books,12.00\n\n"
+    )
+
+
+@pytest.mark.parametrize("pages_per_chunk", ["0", "1", "2", "3"])
+def test_main_reassembles_chunks_in_page_order(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    pages_per_chunk: str,
+) -> None:
+    """Test chunked parsing matches parsing all pages at once, including deduplication."""
+    pdf = blank_pdf(tmp_path / "2021" / "statement.pdf", 3)
+    tables_by_page = {
+        1: [_chase_table(("01/02", "Coffee", "3.00"))],
+        # Continues, and duplicates, the previous page's table
+        2: [_chase_table(("01/02", "Coffee", "3.00"), ("01/03", "Books", "12.00"))],
+        3: [_chase_table(("01/04", "Tea", "2.00"))],
+    }
+
+    def read_pdf(*_: object, pages: str, **__: object) -> list[SimpleNamespace]:
+        if pages == "all":
+            page_numbers = list(tables_by_page)
+        else:
+            start, _sep, end = pages.partition("-")
+            page_numbers = list(range(int(start), int(end or start) + 1))
+        return [table for page in page_numbers for table in tables_by_page[page]]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    result = CliRunner().invoke(
+        main, ["--no-cache", "--pages-per-chunk", pages_per_chunk, str(pdf)]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        "Date,Description,Amount\n"
+        "2021-01-02,Coffee,3.00\n"
+        "2021-01-03,Books,12.00\n"
+        "2021-01-04,Tea,2.00\n"
+        "\n"
+    )
+
+
+def test_main_prescan_parses_only_candidate_pages(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Test prescanning skips pages and PDFs without transaction tables, and picks flavors by content."""
+    statement = text_pdf(
+        tmp_path / "2021" / "statement.pdf",
+        ["Account summary", "Merchant Name or Transaction Description"],
+    )
+    notice = text_pdf(tmp_path / "2021" / "notice.pdf", ["Privacy notice"])
+    reads: list[tuple[str, str, str]] = []
+
+    def read_pdf(
+        filepath: str, pages: str, flavor: str, **_: object
+    ) -> list[SimpleNamespace]:
+        reads.append((Path(filepath).name, pages, flavor))
+        return [_chase_table(("01/02", "Coffee", "3.00"))]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    result = CliRunner().invoke(
+        main, ["--no-cache", "--jobs", "1", "--prescan", str(notice), str(statement)]
+    )
+
+    assert result.exit_code == 0, result.output
+    assert reads == [
+        ("statement.pdf", "2", "network"),
+        ("statement.pdf", "2", "stream"),
+    ]
+    assert result.output == "Date,Description,Amount\n2021-01-02,Coffee,3.00\n\n"
+
+
+def test_main_prescans_in_workers(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Test prescanning runs in pool workers, for every file, not in this process."""
+    statements = [
+        text_pdf(
+            tmp_path / "2021" / f"statement-{i}.pdf",
+            ["Account summary", "Merchant Name or Transaction Description"],
+        )
+        for i in range(3)
+    ]
+    empty = text_pdf(tmp_path / "2021" / "notice.pdf", ["Privacy notice"])
+    prescan_pids = tmp_path / "prescan_pids.txt"
+
+    def prescan_pages(
+        fil: Path, extractors: Sequence[Extractor]
+    ) -> pages.PagePrescan | None:
+        with prescan_pids.open("a") as pids:
+            pids.write(f"{os.getpid()}\n")
+        return pages.prescan_pages(fil, extractors)
+
+    monkeypatch.setattr(extract, "prescan_pages", prescan_pages)
+    monkeypatch.setattr(
+        camelot.io,
+        "read_pdf",
+        lambda *_, **__: [_chase_table(("01/02", "Coffee", "3.00"))],
+    )
+
+    result = CliRunner().invoke(
+        main,
+        ["--no-cache", "--jobs", "2", "--prescan", str(empty), *map(str, statements)],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert (
+        result.output
+        == "Date,Description,Amount\n" + ("2021-01-02,Coffee,3.00\n" * 3) + "\n"
+    )
+    pids = prescan_pids.read_text().split()
+    assert len(pids) == 4
+    assert str(os.getpid()) not in pids
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_sorts_files_completed_in_any_order(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    jobs: str,
+) -> None:
+    """Test output is sorted chronologically, whatever order files finish in."""
+    pdfs = [
+        blank_pdf(tmp_path / year / f"{month}.pdf", 1)
+        for year, month in [("2022", "01"), ("2021", "12"), ("2021", "02")]
+    ]
+    tables_by_name = {
+        "2022/01.pdf": [_chase_table(("01/05", "Tea", "2.00"))],
+        "2021/12.pdf": [_chase_table(("12/05", "Books", "12.00"))],
+        "2021/02.pdf": [_chase_table(("02/05", "Coffee", "3.00"))],
+    }
+
+    def read_pdf(filepath: str, **_: object) -> list[SimpleNamespace]:
+        return tables_by_name[str(Path(filepath).relative_to(tmp_path))]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    result = CliRunner().invoke(main, ["--no-cache", "--jobs", jobs, *map(str, pdfs)])
+
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        "Date,Description,Amount\n"
+        "2021-02-05,Coffee,3.00\n"
+        "2021-12-05,Books,12.00\n"
+        "2022-01-05,Tea,2.00\n"
+        "\n"
+    )
+
+
+def test_in_sorted_order_yields_before_later_files_finish(tmp_path: Path) -> None:
+    """Test a table is yielded as soon as no unfinished file can sort before it."""
+    files = [tmp_path / "2022" / "a.pdf", tmp_path / "2020" / "b.pdf"]
+
+    def file_extraction(fil: Path, date: datetime.date) -> FileExtraction:
+        return FileExtraction(fil, Extraction(pandas.DataFrame({"Date": [date]})))
+
+    earlier = file_extraction(files[1], datetime.date(2020, 3, 1))
+    later = file_extraction(files[0], datetime.date(2022, 3, 1))
+    yielded: list[FileExtraction] = []
+
+    def completed_files() -> Iterator[tuple[int, list[FileExtraction]]]:
+        yield 1, [earlier]
+        assert yielded == [earlier]
+        yield 0, [later]
+
+    for extraction in _in_sorted_order(files, completed_files()):
+        yielded.append(extraction)
+
+    assert yielded == [earlier, later]
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_order_date_merges_all_transactions(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    jobs: str,
+) -> None:
+    """Test every transaction is output in date order, across unsorted, overlapping tables."""
+    pdfs = [blank_pdf(tmp_path / "2021" / f"{name}.pdf", 1) for name in ("b", "a")]
+    tables_by_name = {
+        "b.pdf": [
+            _chase_table(
+                ("01/05", "Tea", "2.00"),
+                ("01/02", "Coffee", "3.00"),
+                ("01/09", "Lunch", "9.00"),
+            ),
+        ],
+        "a.pdf": [
+            _chase_table(("01/03", "Books", "12.00"), ("01/05", "Gas", "40.00")),
+            _chase_table(("01/01", "Rent", "1,000.00")),
+        ],
+    }
+
+    def read_pdf(filepath: str, **_: object) -> list[SimpleNamespace]:
+        return tables_by_name[Path(filepath).name]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    result = CliRunner().invoke(
+        main,
+        [
+            "--no-cache",
+            "--flavor",
+            "stream",
+            "--jobs",
+            jobs,
+            "--order",
+            "date",
+            *map(str, pdfs),
+        ],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.output == (
+        "Date,Description,Amount\n"
+        '2021-01-01,Rent,"1,000.00"\n'
+        "2021-01-02,Coffee,3.00\n"
+        "2021-01-03,Books,12.00\n"
+        "2021-01-05,Gas,40.00\n"
+        "2021-01-05,Tea,2.00\n"
+        "2021-01-09,Lunch,9.00\n"
+        "\n"
+    )
+
+
+def test_in_date_order_yields_before_later_files_finish(tmp_path: Path) -> None:
+    """Test transactions are yielded as soon as no unfinished file can sort before them."""
+    files = [tmp_path / "2022" / "a.pdf", tmp_path / "2021" / "b.pdf"]
+
+    def file_extraction(fil: Path, *dates: datetime.date) -> FileExtraction:
+        return FileExtraction(fil, Extraction(pandas.DataFrame({"Date": dates})))
+
+    earlier = file_extraction(
+        files[1], datetime.date(2021, 3, 1), datetime.date(2022, 3, 1)
+    )
+    later = file_extraction(files[0], datetime.date(2022, 2, 1))
+    yielded: list[list[datetime.date]] = []
+
+    def completed_files() -> Iterator[tuple[int, list[FileExtraction]]]:
+        yield 1, [earlier]
+        # The 2022 file could still have December 2021 transactions
+        assert yielded == [[datetime.date(2021, 3, 1)]]
+        yield 0, [later]
+
+    for merged in _in_date_order(files, completed_files()):
+        yielded.append(merged.extraction.df["Date"].tolist())
+
+    assert yielded == [
+        [datetime.date(2021, 3, 1)],
+        [datetime.date(2022, 2, 1)],
+        [datetime.date(2022, 3, 1)],
+    ]
+
+
+def test_main_replays_unchanged_files_from_manifest(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Test an incremental build only extracts new or changed files."""
+    old = blank_pdf(tmp_path / "2021" / "old.pdf", 1)
+    new = blank_pdf(tmp_path / "2022" / "new.pdf", 2)
+    manifest = tmp_path / "manifest.json"
+    tables_by_name = {
+        "old.pdf": [_chase_table(("01/02", "Coffee, black", "3.00"))],
+        "new.pdf": [_chase_table(("01/05", "Tea", "2.00"))],
+    }
+    read_names: list[str] = []
+
+    def read_pdf(filepath: str, **_: object) -> list[SimpleNamespace]:
+        read_names.append(Path(filepath).name)
+        return tables_by_name[Path(filepath).name]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+    args = [
+        "--no-cache",
+        "--jobs",
+        "1",
+        "--pages-per-chunk",
+        "0",
+        "--manifest",
+        str(manifest),
+    ]
+
+    first = CliRunner().invoke(main, [*args, str(old)])
+    second = CliRunner().invoke(main, [*args, str(new), str(old)])
+    blank_pdf(new, 3)
+    third = CliRunner().invoke(main, [*args, str(old), str(new)])
+
+    assert first.exit_code == 0, first.output
+    assert second.exit_code == 0, second.output
+    assert third.exit_code == 0, third.output
+    assert read_names == ["old.pdf", "new.pdf", "new.pdf"]
+    assert (
+        second.output
+        == third.output
+        == (
+            "Date,Description,Amount\n"
+            '2021-01-02,"Coffee, black",3.00\n'
+            "2022-01-05,Tea,2.00\n"
+            "\n"
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "changed_args",
+    [["--prescan"], ["--pages-per-chunk", "1"], ["--flavor", "stream"]],
+)
+def test_main_manifest_misses_with_other_options(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    changed_args: list[str],
+) -> None:
+    """Test a statement extracted with other options is extracted again."""
+    statement = text_pdf(
+        tmp_path / "Chase" / "2021" / "statement.pdf",
+        ["Account summary", "Merchant Name or Transaction Description"],
+    )
+    reads: list[str] = []
+
+    def read_pdf(*_: object, pages: str, **__: object) -> list[SimpleNamespace]:
+        reads.append(pages)
+        return [_chase_table(("01/02", "Coffee", "3.00"))]
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+    args = ["--no-cache", "--jobs", "1", "--manifest", str(tmp_path / "manifest.json")]
+
+    num_reads = []
+    outputs = []
+    for run_args in [args, [*args, *changed_args], [*args, *changed_args]]:
+        result = CliRunner().invoke(main, [*run_args, str(statement)])
+        assert result.exit_code == 0, result.output
+        num_reads.append(len(reads))
+        outputs.append(result.output)
+
+    # Extracted again with the changed options, then replayed
+    assert num_reads[0] < num_reads[1] == num_reads[2]
+    assert outputs == [outputs[0]] * 3
+
+
+def test_main_replays_files_without_tables_from_manifest(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Test an unchanged statement without transaction tables isn't parsed again."""
+    empty = blank_pdf(tmp_path / "Chase" / "2021" / "empty.pdf", 1)
+    manifest = tmp_path / "manifest.json"
+    reads: list[str] = []
+
+    def read_pdf(*_: object, flavor: str, **__: object) -> list[SimpleNamespace]:
+        reads.append(flavor)
+        return []
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+    args = ["--no-cache", "--jobs", "1", "--manifest", str(manifest), str(empty)]
+
+    first = CliRunner().invoke(main, args)
+    second = CliRunner().invoke(main, args)
+
+    assert first.exit_code == 0, first.output
+    assert second.exit_code == 0, second.output
+    assert reads == ["network", "stream"]
+    assert first.output == second.output == ""
+
+
+def test_main_replays_unsorted_tables_after_order_date(
+    monkeypatch: pytest.MonkeyPatch,
+    chase_pdf: Path,
+    tmp_path: Path,
+) -> None:
+    """Test tables recorded by an --order date build replay in their own order."""
+    monkeypatch.setattr(
+        camelot.io,
+        "read_pdf",
+        lambda *_, **__: [
+            _chase_table(("01/05", "Tea", "2.00"), ("01/02", "Coffee", "3.00"))
+        ],
+    )
+    args = ["--no-cache", "--jobs", "1", str(chase_pdf)]
+    manifest_args = ["--manifest", str(tmp_path / "manifest.json")]
+
+    fresh = CliRunner().invoke(main, args)
+    by_date = CliRunner().invoke(main, [*manifest_args, "--order", "date", *args])
+    replayed = CliRunner().invoke(main, [*manifest_args, *args])
+
+    assert fresh.exit_code == 0, fresh.output
+    assert by_date.exit_code == 0, by_date.output
+    assert replayed.exit_code == 0, replayed.output
+    assert by_date.output == (
+        "Date,Description,Amount\n2021-01-02,Coffee,3.00\n2021-01-05,Tea,2.00\n\n"
+    )
+    assert (
+        replayed.output
+        == fresh.output
+        == ("Date,Description,Amount\n2021-01-05,Tea,2.00\n2021-01-02,Coffee,3.00\n\n")
+    )
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_main_timings(
+    monkeypatch: pytest.MonkeyPatch,
+    chase_pdf: Path,
+    tmp_path: Path,
+    jobs: str,
+) -> None:
+    """Test stages are timed, even in pool workers, into a trace file and a summary."""
+    monkeypatch.setattr(
+        camelot.io,
+        "read_pdf",
+        lambda *_, **__: [_chase_table(("01/02", "Coffee", "3.00"))],
+    )
+    trace_path = tmp_path / "trace.json"
+
+    result = CliRunner().invoke(
+        main,
+        ["--no-cache", "--jobs", jobs, "--timings", str(trace_path), str(chase_pdf)],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == "Date,Description,Amount\n2021-01-02,Coffee,3.00\n\n"
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert {event["name"] for event in events} == {
+        "extract_table",
+        "parse_dates",
+        "read_pdf",
+        "write",
+    }
+    assert sorted(
+        event["args"]["flavor"] for event in events if event["name"] == "read_pdf"
+    ) == ["network", "stream"]
+    assert "ExtractorChase" in {
+        event["args"].get("extractor")
+        for event in events
+        if event["name"] == "extract_table"
+    }
+    assert {event["args"]["file"] for event in events} == {str(chase_pdf)}
+    summary = result.stderr.splitlines()
+    assert summary[0].split()[:2] == ["stage", "runs"]
+    assert sorted(line.split()[0] for line in summary[1:]) == [
+        "extract_table",
+        "parse_dates",
+        "read_pdf",
+        "write",
+    ]
+
+
+def test_main_format_jsonl_to_output_file(
+    monkeypatch: pytest.MonkeyPatch,
+    chase_pdf: Path,
+    tmp_path: Path,
+) -> None:
+    """Test writing another format, to a file instead of stdout."""
+    monkeypatch.setattr(
+        camelot.io,
+        "read_pdf",
+        lambda *_, **__: [_chase_table(("01/02", "Coffee", "3.00"))],
+    )
+    output = tmp_path / "transactions.jsonl"
+
+    result = CliRunner().invoke(
+        main,
+        ["--no-cache", "--format", "jsonl", "-o", str(output), str(chase_pdf)],
+    )
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == ""
+    assert output.read_text() == (
+        '{"Date": "2021-01-02", "Description": "Coffee", "Amount": 3.00}\n'
+    )
+
+
+def test_main_format_requires_pyarrow(
+    monkeypatch: pytest.MonkeyPatch,
+    chase_pdf: Path,
+) -> None:
+    """Test binary formats fail before extracting anything, without pyarrow."""
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+
+    def read_pdf(*_: object, **__: object) -> list[SimpleNamespace]:
+        raise AssertionError("Should fail before reading PDFs")
+
+    monkeypatch.setattr(camelot.io, "read_pdf", read_pdf)
+
+    result = CliRunner().invoke(
+        main, ["--no-cache", "--format", "parquet", str(chase_pdf)]
+    )
+
+    assert result.exit_code == 1
+    assert "--format parquet requires pyarrow" in result.stderr
+
+
+def test_help_skips_heavy_imports() -> None:
+    """Quick invocations shouldn't pay for importing the PDF parsing stack."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from statements2csv.__main__ import main\n"
+            "try:\n"
+            "    main(['--help'])\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "heavy = {'camelot', 'pandas', 'pypdf', 'dateutil', 'importlib.metadata'}\n"
+            "print(sorted(heavy & set(sys.modules)))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stdout.splitlines()[-1] == "[]"
@@ -0,0 +1,115 @@
+"""Test the output module."""
+
+import datetime
+import io
+import json
+from decimal import Decimal
+
+import pandas
+import pytest
+
+from statements2csv.output import Format, open_writer
+
+TABLES = [
+    pandas.DataFrame(
+        {
+            "Date": [datetime.date(2021, 1, 2), datetime.date(2021, 1, 3)],
+            "Description": ['Coffee, "black"', "Refund"],
+            "Amount": ["$1,003.50", "-12.00"],
+        }
+    ),
+    pandas.DataFrame(
+        {
+            "Date": [datetime.date(2021, 2, 1)],
+            "Description": ["Café"],
+            "Amount": ["0.10"],
+        }
+    ),
+]
+
+
+def _write(fmt: Format) -> bytes:
+    out = io.BytesIO()
+    with open_writer(fmt, out) as writer:
+        for df in TABLES:
+            writer.write(df)
+    return out.getvalue()
+
+
+def test_csv() -> None:
+    """Test CSV has 1 header, and amounts as printed."""
+    assert _write("csv").decode() == (
+        "Date,Description,Amount\n"
+        '2021-01-02,"Coffee, ""black""","$1,003.50"\n'
+        "2021-01-03,Refund,-12.00\n"
+        "2021-02-01,Café,0.10\n"
+        "\n"
+    )
+
+
+def test_csv_empty() -> None:
+    """Test no tables is no output."""
+    out = io.BytesIO()
+    with open_writer("csv", out):
+        pass
+    assert out.getvalue() == b""
+
+
+def test_jsonl() -> None:
+    """Test JSON lines have typed amounts, which parse exactly as decimals."""
+    lines = _write("jsonl").decode().splitlines()
+
+    assert lines[0] == (
+        '{"Date": "2021-01-02", "Description": "Coffee, \\"black\\"", "Amount": 1003.50}'
+    )
+    assert [json.loads(line, parse_float=Decimal) for line in lines[1:]] == [
+        {"Date": "2021-01-03", "Description": "Refund", "Amount": Decimal("-12.00")},
+        {"Date": "2021-02-01", "Description": "Café", "Amount": Decimal("0.10")},
+    ]
+
+
+def test_jsonl_unparseable_amounts() -> None:
+    """Test amounts that don't parse are null, instead of failing the output."""
+    df = pandas.DataFrame(
+        {
+            "Date": [datetime.date(2021, 1, 2)] * 3,
+            "Description": ["Refund", "Coffee", "Tea"],
+            "Amount": ["(5.00)", "NaN", "3.00"],
+        }
+    )
+    out = io.BytesIO()
+
+    with open_writer("jsonl", out) as writer:
+        writer.write(df)
+
+    assert [
+        json.loads(line, parse_float=Decimal)["Amount"]
+        for line in out.getvalue().decode().splitlines()
+    ] == [None, None, Decimal("3.00")]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_arrow_formats(fmt: Format) -> None:
+    """Test binary formats load straight into pandas, with typed dates and amounts."""
+    pytest.importorskip("pyarrow")
+
+    data = io.BytesIO(_write(fmt))
+    df = pandas.read_parquet(data) if fmt == "parquet" else pandas.read_feather(data)
+
+    assert df.to_dict("records") == [
+        {
+            "Date": datetime.date(2021, 1, 2),
+            "Description": 'Coffee, "black"',
+            "Amount": Decimal("1003.50"),
+        },
+        {
+            "Date": datetime.date(2021, 1, 3),
+            "Description": "Refund",
+            "Amount": Decimal("-12.00"),
+        },
+        {
+            "Date": datetime.date(2021, 2, 1),
+            "Description": "Café",
+            "Amount": Decimal("0.10"),
+        },
+    ]
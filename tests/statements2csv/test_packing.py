@@ -0,0 +1,83 @@
+"""Test the packing module."""
+
+import datetime
+import pickle
+from pathlib import Path
+
+import pandas
+import pytest
+
+from statements2csv.extract import ExtractionTask, TaskExtraction
+from statements2csv.extractors import Extraction, ExtractionValidationError
+from statements2csv.packing import (
+    pack,
+    pack_task_extraction,
+    unpack,
+    unpack_task_extraction,
+)
+
+
+def _extraction(*rows: tuple[datetime.date, str, str]) -> Extraction:
+    return Extraction(
+        pandas.DataFrame(
+            {
+                "Date": [date for date, _, _ in rows],
+                "Description": [description for _, description, _ in rows],
+                "Amount": [amount for _, _, amount in rows],
+            }
+        )
+    )
+
+
+def test_pack_roundtrip() -> None:
+    """Test unpacked tables equal the originals, down to dtypes, including multibyte text."""
+    extractions = [
+        _extraction(
+            (datetime.date(2021, 1, 2), "Café, black", "$3.00"),
+            (datetime.date(2021, 1, 3), "", "-12.00"),
+        ),
+        Extraction(
+            pandas.DataFrame(
+                {
+                    "Date": [datetime.date(2021, 2, 1)],
+                    "Description": ["Interest"],
+                    "Check": ["1001"],
+                    "Amount": ["0.01"],
+                }
+            )
+        ),
+        _extraction((datetime.date(2020, 12, 31), "Books 📚", "1,234.56")),
+    ]
+
+    unpacked = unpack(pickle.loads(pickle.dumps(pack(extractions))))
+
+    assert len(unpacked) == len(extractions)
+    for actual, expected in zip(unpacked, extractions, strict=True):
+        pandas.testing.assert_frame_equal(actual.df, expected.df)
+        assert actual.df.equals(expected.df)
+
+
+def test_pack_requires_date_first() -> None:
+    """Test tables without a leading date column are rejected."""
+    df = pandas.DataFrame({"Description": ["Coffee"], "Date": [datetime.date.today()]})
+
+    with pytest.raises(ValueError, match="Date"):
+        pack([Extraction(df)])
+
+
+def test_pack_task_extraction_roundtrip() -> None:
+    """Test a task's other results pass through packing unchanged."""
+    task = ExtractionTask(Path("2021/statement.pdf"), "stream", "1-4")
+    err = ExtractionValidationError("Expected 3 columns, actual 2")
+    task_extraction = TaskExtraction(
+        task,
+        [_extraction((datetime.date(2021, 1, 2), "Coffee", "3.00"))],
+        [err],
+    )
+
+    unpacked = unpack_task_extraction(pack_task_extraction(task_extraction))
+
+    assert unpacked.task == task
+    assert unpacked.validation_errors == [err]
+    assert unpacked.spans == ()
+    assert unpacked.extractions[0].df.equals(task_extraction.extractions[0].df)
@@ -0,0 +1,91 @@
+"""Test the pages module."""
+
+from pathlib import Path
+
+import pytest
+
+from statements2csv.extractors import ALL_EXTRACTORS
+from statements2csv.pages import (
+    PagePrescan,
+    count_range_pages,
+    page_ranges,
+    prescan_pages,
+)
+from taxes.pdfs import blank_pdf, text_pdf
+
+
+@pytest.mark.parametrize(
+    ("pages", "pages_per_chunk", "expected"),
+    [
+        ([], 2, ["all"]),
+        ([1], 2, ["1"]),
+        ([1, 2, 3, 4], 2, ["1-2", "3-4"]),
+        ([1, 2, 3, 4, 5], 2, ["1-2", "3-4", "5"]),
+        ([1, 2, 3, 4, 5], 10, ["1-5"]),
+        ([1, 2, 3, 4, 5], None, ["1-5"]),
+        ([1, 3, 4, 5, 7], None, ["1,3-5,7"]),
+        ([1, 3, 4, 5, 7], 2, ["1,3", "4-5", "7"]),
+    ],
+)
+def test_page_ranges(
+    pages: list[int], pages_per_chunk: int | None, expected: list[str]
+) -> None:
+    """Test pages are split into camelot page ranges, in order."""
+    assert page_ranges(pages, pages_per_chunk) == expected
+
+
+@pytest.mark.parametrize(
+    ("pages", "expected"),
+    [("all", None), ("1", 1), ("3-4", 2), ("1,3-5,7", 5)],
+)
+def test_count_range_pages(pages: str, expected: int | None) -> None:
+    """Test counting pages is the inverse of formatting them as page ranges."""
+    assert count_range_pages(pages) == expected
+
+
+def test_prescan_pages(tmp_path: Path) -> None:
+    """Test only pages with a bank's table header words are kept, with that bank's flavors."""
+    pdf = text_pdf(
+        tmp_path / "statement.pdf",
+        [
+            "Account summary",
+            "Merchant Name or Transaction Description",
+            "",
+            "Deposits/Additions Withdrawals/Subtractions",
+        ],
+    )
+
+    assert prescan_pages(pdf, ALL_EXTRACTORS) == PagePrescan(
+        pages=[2, 4], flavors=["network", "stream"]
+    )
+
+
+def test_prescan_pages_drops_summary_and_legal_pages(tmp_path: Path) -> None:
+    """Test pages merely mentioning a fingerprint word, or containing it in a longer word, are dropped."""
+    pdf = text_pdf(
+        tmp_path / "statement.pdf",
+        [
+            "Payment Due Date 02/25/2021",
+            "Terms updated. See your account agreement.",
+            "Date Date Description Reference Number Account Number Amount",
+            "Interest charge calculation, as of the statement closing date",
+        ],
+    )
+
+    assert prescan_pages(pdf, ALL_EXTRACTORS) == PagePrescan(
+        pages=[3], flavors=["stream"]
+    )
+
+
+def test_prescan_pages_none_match(tmp_path: Path) -> None:
+    """Test a PDF with text, but no transaction tables, has no pages to parse."""
+    pdf = text_pdf(tmp_path / "statement.pdf", ["Account summary"])
+
+    assert prescan_pages(pdf, ALL_EXTRACTORS) == PagePrescan(pages=[], flavors=[])
+
+
+def test_prescan_pages_without_text_layer(tmp_path: Path) -> None:
+    """Test a PDF without text, like a scan, can't be prescanned."""
+    pdf = blank_pdf(tmp_path / "statement.pdf", 2)
+
+    assert prescan_pages(pdf, ALL_EXTRACTORS) is None
@@ -0,0 +1,62 @@
+"""Test the schedule module."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from statements2csv import schedule
+from statements2csv.extract import ExtractionTask
+
+
+@pytest.fixture
+def cgroup(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Point cgroup lookups to an empty directory, and pretend 8 CPUs are available."""
+    monkeypatch.setattr(schedule, "_CGROUP_V2_CPU_MAX", tmp_path / "cpu.max")
+    monkeypatch.setattr(schedule, "_CGROUP_V1_CPU_DIR", tmp_path / "cpu")
+    monkeypatch.setattr(os, "sched_getaffinity", lambda _: set(range(8)), raising=False)
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    ("cpu_max", "expected"),
+    [(None, 8), ("max 100000\n", 8), ("200000 100000\n", 2), ("150000 100000\n", 2)],
+)
+def test_available_cpus_cgroup_v2(
+    cgroup: Path, cpu_max: str | None, expected: int
+) -> None:
+    """Test a container's CPU quota limits the CPUs available, rounding up."""
+    if cpu_max is not None:
+        (cgroup / "cpu.max").write_text(cpu_max)
+
+    assert schedule.available_cpus() == expected
+    assert schedule.default_jobs() == expected // 2
+
+
+@pytest.mark.parametrize(("quota", "expected"), [("-1", 8), ("50000", 1)])
+def test_available_cpus_cgroup_v1(cgroup: Path, quota: str, expected: int) -> None:
+    """Test a CPU quota is also read from cgroup v1."""
+    (cgroup / "cpu").mkdir()
+    (cgroup / "cpu" / "cpu.cfs_quota_us").write_text(f"{quota}\n")
+    (cgroup / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+
+    assert schedule.available_cpus() == expected
+    assert schedule.default_jobs() == max(1, expected // 2)
+
+
+def test_longest_first(tmp_path: Path) -> None:
+    """Test tasks with the most pages go first, then tasks of larger files."""
+    small = tmp_path / "small.pdf"
+    small.write_bytes(b"x")
+    large = tmp_path / "large.pdf"
+    large.write_bytes(b"x" * 100)
+    tasks = [
+        ExtractionTask(small, "network", "5"),
+        ExtractionTask(small, "network", "1-4"),
+        ExtractionTask(large, "network", "5"),
+        ExtractionTask(large, "stream", "all"),
+        ExtractionTask(small, "stream", "all"),
+        ExtractionTask(large, "network", "1-4"),
+    ]
+
+    assert schedule.longest_first(tasks) == [3, 4, 5, 1, 2, 0]
@@ -0,0 +1,66 @@
+"""Test timing the stages of extracting statements."""
+
+import json
+from pathlib import Path
+
+from statements2csv import timings
+
+
+def _span(stage: str, fil: str, wall_ns: int) -> timings.Span:
+    return timings.Span(stage, fil, {}, 1, 0, wall_ns, wall_ns // 2, 1024)
+
+
+def test_span_records_only_while_recording() -> None:
+    """Test spans go to the innermost recording, and nowhere outside one."""
+    with timings.span("ignored"):
+        pass
+
+    with timings.recording("outer.pdf") as outer:
+        with timings.span("read_pdf", flavor="stream"):
+            pass
+        with timings.recording("inner.pdf") as inner:
+            with timings.span("parse_dates"):
+                pass
+        with timings.span("to_csv", "other.pdf"):
+            pass
+
+    assert [(span.stage, span.fil, span.args) for span in outer] == [
+        ("read_pdf", "outer.pdf", {"flavor": "stream"}),
+        ("to_csv", "other.pdf", {}),
+    ]
+    assert [(span.stage, span.fil) for span in inner] == [("parse_dates", "inner.pdf")]
+
+
+def test_summarize() -> None:
+    """Test spans are totaled per stage, slowest stage first, with each stage's slowest file."""
+    spans = [
+        _span("extract_table", "a.pdf", 10),
+        _span("read_pdf", "a.pdf", 100),
+        _span("read_pdf", "b.pdf", 300),
+        _span("extract_table", "b.pdf", 5),
+    ]
+
+    assert timings.summarize(spans) == [
+        timings.StageSummary("read_pdf", 2, 400, 200, 300, "b.pdf", 1024),
+        timings.StageSummary("extract_table", 2, 15, 7, 10, "a.pdf", 1024),
+    ]
+
+
+def test_write_trace(tmp_path: Path) -> None:
+    """Test spans are written as Chrome trace complete events, in microseconds."""
+    path = tmp_path / "trace.json"
+
+    timings.write_trace(path, [_span("read_pdf", "a.pdf", 2000)])
+
+    assert json.loads(path.read_text())["traceEvents"] == [
+        {
+            "name": "read_pdf",
+            "cat": "statements2csv",
+            "ph": "X",
+            "ts": 0,
+            "dur": 2,
+            "pid": 1,
+            "tid": 1,
+            "args": {"file": "a.pdf", "cpu_ms": 0.001, "peak_rss_kb": 1024},
+        }
+    ]
@@ -0,0 +1,40 @@
+"""Tests for transaction amount helpers."""
+
+from decimal import Decimal
+
+import pytest
+
+from taxes.amounts import amount_cents, parse_amount
+
+
+@pytest.mark.parametrize(
+    ("amount", "expected"),
+    [
+        ("35.99", Decimal("35.99")),
+        ("$35.99", Decimal("35.99")),
+        ("+ $7,500.00", Decimal("7500.00")),
+        ("- $72.23", Decimal("-72.23")),
+        ("-1,814.83", Decimal("-1814.83")),
+    ],
+)
+def test_parse_amount_normalizes_supported_formats(
+    amount: str,
+    expected: Decimal,
+) -> None:
+    """Amount parsing should preserve signs while ignoring presentation marks."""
+    assert parse_amount(amount) == expected
+
+
+@pytest.mark.parametrize(
+    ("amount", "expected"),
+    [
+        ("35.99", 3599),
+        ("+ $7,500.00", 750000),
+        ("- $72.23", -7223),
+        ("-1,814.8", -181480),
+        ("12", 1200),
+    ],
+)
+def test_amount_cents(amount: str, expected: int) -> None:
+    """Amount cents should be exact, whatever the number of decimal places."""
+    assert amount_cents(amount) == expected
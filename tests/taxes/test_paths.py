@@ -29,3 +29,26 @@ def test_decrypted_root_uses_environment_override(
 
     assert paths.decrypted_root() == tmp_path
     assert paths.decrypted_path("tests", "secrets") == tmp_path / "tests" / "secrets"
+
+
+def test_cache_root_defaults_to_xdg_cache_home(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Keep caches in the user's cache directory, outside the checkout."""
+    monkeypatch.delenv(paths.CACHE_ROOT_ENV_VAR, raising=False)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    assert paths.cache_root() == tmp_path / "taxes"
+    assert paths.cache_path("tables") == tmp_path / "taxes" / "tables"
+
+
+def test_cache_root_uses_environment_override(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    """Use the configured cache directory over the user's default."""
+    monkeypatch.setenv(paths.CACHE_ROOT_ENV_VAR, str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "elsewhere"))
+
+    assert paths.cache_root() == tmp_path
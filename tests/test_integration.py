@@ -105,7 +105,6 @@ def test_statements2csv_all_files(
 @freezegun.freeze_time(datetime.datetime(2022, 4, 20))
 def test_greptransactions_default_year(
     all_pdfs_input: list[str] | None,
-    capfd: pytest.CaptureFixture[str],
     secret_snapshot: SnapshotAssertion,
 ) -> None:
     """Test the `greptransactions` command.
@@ -119,15 +118,15 @@ def test_greptransactions_default_year(
 
     pattern = "(output|tulip)"
     result1 = CliRunner().invoke(greptransactions, pattern)
-    output1, err1 = capfd.readouterr()
+    output1, err1 = result1.stdout, result1.stderr
 
     result2 = CliRunner().invoke(greptransactions, ["--year", "2022", pattern])
-    output2, err2 = capfd.readouterr()
+    output2, err2 = result2.stdout, result2.stderr
 
     result3 = CliRunner().invoke(
         greptransactions, ["--year", "2021", "--year", "2022", pattern]
     )
-    output3, err3 = capfd.readouterr()
+    output3, err3 = result3.stdout, result3.stderr
 
     assert output1 == secret_snapshot
     assert output2 == secret_snapshot
@@ -148,7 +147,6 @@ def test_greptransactions_default_year(
 
 def test_greptransactions_sort_amount(
     all_pdfs_input: list[str] | None,
-    capfd: pytest.CaptureFixture[str],
 ) -> None:
     """Test amount sorting in the `greptransactions` command."""
     if all_pdfs_input is None:
@@ -159,13 +157,13 @@ def test_greptransactions_sort_amount(
     result1 = CliRunner().invoke(
         greptransactions, ["--year", "2021", "--sort", "amount", pattern]
     )
-    output1, err1 = capfd.readouterr()
+    output1, err1 = result1.stdout, result1.stderr
 
     result2 = CliRunner().invoke(
         greptransactions,
         ["--year", "2021", "--sort", "amount", "--reverse", pattern],
     )
-    output2, err2 = capfd.readouterr()
+    output2, err2 = result2.stdout, result2.stderr
 
     amounts1 = [_amount_value(line) for line in output1.splitlines()]
     amounts2 = [_amount_value(line) for line in output2.splitlines()]